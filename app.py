@@ -37,39 +37,14 @@ def create_app():
         logger.info("✓ Bot blueprint registered")
     except Exception as e:
         logger.error(f"✗ Bot blueprint failed: {e}")
-    
-    # WhatsApp webhook routes (simplified, no dependencies)
-    @app.route('/webhook', methods=['GET'])
-    def verify_webhook():
-        """Verify webhook for WhatsApp"""
-        verify_token = os.environ.get('WHATSAPP_VERIFY_TOKEN', 'token123')
-        
-        mode = request.args.get('hub.mode')
-        token = request.args.get('hub.verify_token')
-        challenge = request.args.get('hub.challenge')
-        
-        logger.info(f"Webhook verification: mode={mode}, token_match={token == verify_token}")
-        
-        if mode and token:
-            if mode == 'subscribe' and token == verify_token:
-                logger.info('WEBHOOK_VERIFIED')
-                return challenge, 200
-            else:
-                return 'Forbidden', 403
-        
-        return 'Bad Request', 400
-    
-    @app.route('/webhook', methods=['POST'])
-    def webhook():
-        """Handle incoming WhatsApp messages"""
-        try:
-            data = request.get_json()
-            logger.info(f"Received webhook data: {data}")
-            return jsonify({'status': 'ok'}), 200
-        except Exception as e:
-            logger.error(f"Webhook error: {e}")
-            return jsonify({'status': 'error'}), 200
-    
+
+    try:
+        from blueprints.whatsapp import whatsapp_bp
+        app.register_blueprint(whatsapp_bp)
+        logger.info("✓ WhatsApp blueprint registered")
+    except Exception as e:
+        logger.error(f"✗ WhatsApp blueprint failed: {e}")
+
     # Root route
     @app.route('/')
     def index():
@@ -122,7 +97,23 @@ def create_app():
     
     return app
 
-# Create app instance for Gunicorn
+def start_workers(app):
+    """Start the webhook's background consumers; called by the server, not on import"""
+    try:
+        from blueprints.whatsapp import start_background_workers
+        start_background_workers(app)
+        logger.info("✓ Background workers started")
+    except Exception as e:
+        logger.error(f"✗ Background workers failed: {e}")
+    
+    try:
+        from services.broadcast import reset_stale_jobs
+        with app.app_context():
+            reset_stale_jobs()
+    except Exception as e:
+        logger.error(f"✗ Broadcast recovery failed: {e}")
+
+# Create app instance for Gunicorn (workers start in gunicorn.conf.py)
 try:
     application = create_app()
     logger.info("✓ Application created successfully")
@@ -142,4 +133,5 @@ except Exception as e:
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
+    start_workers(application)
     application.run(debug=debug, host='0.0.0.0', port=port)
\ No newline at end of file
@@ -0,0 +1,305 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for the bot's per-message hot path.
+
+Runs against a throwaway in-memory database seeded with a demo studio:
+
+    python benchmark.py responses --iterations 20000
+    python benchmark.py intents
+    python benchmark.py services --services 500
+    python benchmark.py classifier --batch 5000
+    python benchmark.py engines
+"""
+
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Never touch the real database
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from app import create_app
+from config import Config
+from models import db, BusinessConfig, Service, OperatingHours
+
+DEMO_SERVICES = [
+    ("Design de Sobrancelhas", 50.0, 60, "Design personalizado com pinça e linha"),
+    ("Henna", 30.0, 45, None),
+    ("Micropigmentação", 200.0, 120, "Técnica fio a fio"),
+    ("Lash Lifting", 120.0, 60, None),
+    ("Brow Lamination", 150.0, 60, None),
+]
+
+def seed(app, extra_services=0):
+    """Create the demo studio (plus extra_services filler services) and return its id"""
+    with app.app_context():
+        db.create_all()
+        business = BusinessConfig(studio_name="Studio Demo", address="Rua das Flores, 123",
+                                  phone="(11) 3333-4444", whatsapp="(11) 99999-8888",
+                                  website="https://studio.example.com", bot_tone="Simpática")
+        db.session.add(business)
+        db.session.flush()
+        for name, price, duration, description in DEMO_SERVICES:
+            db.session.add(Service(business_id=business.id, name=name, price=price,
+                                   duration_minutes=duration, description=description))
+        for i in range(extra_services):
+            db.session.add(Service(business_id=business.id, name=f"Pacote {i}", price=10.0 + i,
+                                   duration_minutes=30))
+        for day in range(7):
+            db.session.add(OperatingHours(business_id=business.id, day_of_week=day, open_time="09:00",
+                                          close_time="18:00", is_closed=(day == 6)))
+        db.session.commit()
+        return business.id
+
+def timed(fn, iterations):
+    """Average microseconds per call"""
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+def bench_responses(args):
+    from bot_logic import catalog
+    from bot_logic.chatbot import BrowStudioBot
+
+    app = create_app()
+    business_id = seed(app, args.extra_services)
+    intents = ['hours', 'services', 'price', 'contact', 'location', 'booking']
+
+    with app.app_context():
+        bot = BrowStudioBot(business_id)
+        engine = bot.engine
+        info = engine._get_business_info()
+
+        print(f"Fixed-intent reply cost ({len(info['services'])} services, {args.iterations} iterations, µs/message)")
+        print(f"{'intent':<10} {'render':>10} {'catalog':>10} {'speedup':>9}")
+        for intent in intents:
+            before = timed(lambda: engine._render_response(intent, info), args.iterations)
+            catalog.get_response(engine, intent, info)
+            after = timed(lambda: catalog.get_response(engine, intent, info), args.iterations)
+            print(f"{intent:<10} {before:>10.2f} {after:>10.2f} {before / after:>8.1f}x")
+
+        messages = ["qual o horário?", "quais serviços vocês fazem", "quanto custa?", "telefone pra contato",
+                    "onde fica?", "quero agendar"]
+        end_to_end = timed(lambda: [bot.get_response(m) for m in messages], max(1, args.iterations // 10))
+        print(f"\nget_response end to end: {end_to_end / len(messages):.2f} µs/message")
+
+INTENT_MESSAGES = [
+    "oi", "qual o horário de funcionamento?", "quanto custa a henna?", "vocês fazem micropigmentação?",
+    "me passa o telefone", "onde fica o studio?", "quero agendar pra sábado", "aceitam cartão de crédito?",
+    "boa tarde, queria saber se vocês atendem aos domingos e qual o endereço certinho do studio",
+]
+
+def bench_intents(args):
+    from bot_logic.chatbot import BrowStudioBot
+    from bot_logic.intents import intent_matcher
+    from test_intents import legacy_detect_intent
+
+    bot = BrowStudioBot()
+    print(f"Intent detection ({args.iterations} iterations, µs/message)")
+    print(f"{'message':<40} {'scans':>8} {'matcher':>8}")
+    for message in INTENT_MESSAGES:
+        assert bot._detect_intent(message) == legacy_detect_intent(message)
+        before = timed(lambda: legacy_detect_intent(message), args.iterations)
+        after = timed(lambda: intent_matcher.match(message), args.iterations)
+        print(f"{message[:40]:<40} {before:>8.2f} {after:>8.2f}")
+
+    # The scans cost grows with the keyword count, the compiled matcher's does not
+    from bot_logic.intents import IntentMatcher, CORE_INTENTS, fold
+    table = CORE_INTENTS + [(f"intent{i}", [f"palavra{i}x", f"termo{i}y"]) for i in range(args.extra_keywords // 2)]
+    matcher = IntentMatcher(table, whole_words={'greeting'})
+    folded_table = [(intent, [fold(keyword) for keyword in keywords]) for intent, keywords in table[1:]]
+    # Unmatched messages (the LLM fallback path) are the scans' worst case
+    message = "obrigada, vou pensar e depois te falo certinho"
+
+    def scan():
+        folded = fold(message)
+        return next((intent for intent, keywords in folded_table if any(k in folded for k in keywords)), 'unknown')
+
+    before = timed(scan, args.iterations)
+    after = timed(lambda: matcher.match(message), args.iterations)
+    print(f"\nUnmatched message with {args.extra_keywords} extra keywords: scans {before:.2f} µs, matcher {after:.2f} µs")
+
+def legacy_extract_service(message, services):
+    """chatbot_v1's linear service scan before the index"""
+    message_lower = message.lower()
+    for service in services:
+        service_name_lower = service.name.lower()
+        if service_name_lower in message_lower or any(word in message_lower for word in service_name_lower.split()):
+            return service
+    return None
+
+def bench_services(args):
+    import random
+    from bot_logic.service_index import ServiceIndex
+    from bot_logic.snapshot import ServiceInfo
+
+    rng = random.Random(42)
+    areas = ["Sobrancelhas", "Cílios", "Buço", "Rosto", "Axilas", "Pernas", "Virilha", "Lábios"]
+    techniques = ["Design", "Henna", "Micropigmentação", "Lifting", "Lamination", "Depilação", "Tintura",
+                  "Extensão", "Manutenção", "Remoção", "Nanoblading", "Microblading", "Brow", "Lash", "Peeling"]
+    names = [name for name, *_ in DEMO_SERVICES]
+    while len(names) < args.services:
+        name = f"{rng.choice(techniques)} de {rng.choice(areas)}"
+        if rng.random() < 0.4:
+            name += f" {rng.choice(['Premium', 'Express', 'Masculino', 'com Henna', 'Plus'])}"
+        if name not in names:
+            names.append(name)
+    services = [ServiceInfo(i, name, 50.0, 60, None) for i, name in enumerate(names[:args.services])]
+
+    started = time.perf_counter()
+    index = ServiceIndex(services)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    messages = ["quanto custa a henna?", "vocês fazem micropigmentacao?", "desing de sobrancelha",
+                "tem lash lifitng?", "onde fica o studio?", "qual o horário de sábado?",
+                "quero fazer depilação de buço masculino"]
+    print(f"Service lookup in a {len(services)}-service catalog (index built in {build_ms:.1f} ms, µs/message)")
+    print(f"{'message':<40} {'scan':>8} {'index':>8}  scan -> index")
+    for message in messages:
+        before = timed(lambda: legacy_extract_service(message, services), args.iterations)
+        after = timed(lambda: index.find(message), args.iterations)
+        old, new = legacy_extract_service(message, services), index.find(message)
+        print(f"{message[:40]:<40} {before:>8.2f} {after:>8.2f}  {old and old.name} -> {new and new.name}")
+
+# Paraphrases the keyword matcher misses, and messages that need the LLM
+CLASSIFIER_EXAMPLES = [
+    ("hours", "vocês atendem sábado?"), ("hours", "até que horas vocês ficam?"), ("hours", "atendem domingo"),
+    ("hours", "que horas vocês começam?"), ("hours", "vocês abrem feriado?"), ("hours", "atendem à noite?"),
+    ("hours", "qual o expediente de vocês"), ("hours", "estão atendendo agora?"), ("hours", "vocês trabalham aos sábados?"),
+    ("price", "quanto sai a henna"), ("price", "quanto cobram"), ("price", "me passa os valores"),
+    ("price", "qual o investimento do design"), ("price", "tá quanto o lash lifting?"), ("price", "quanto fica a micro"),
+    ("price", "é caro o design?"), ("price", "quanto sai o combo"), ("price", "qual a tabela de vocês"),
+    ("booking", "queria reservar um horário"), ("booking", "tem vaga amanhã?"), ("booking", "consigo encaixe hoje?"),
+    ("booking", "quero reservar pra sexta"), ("booking", "tem horário livre sábado?"), ("booking", "dá pra encaixar hoje à tarde?"),
+    ("booking", "queria marcar com a Ana"), ("booking", "posso reservar pra semana que vem?"),
+    ("location", "qual a rua de vocês"), ("location", "como chego aí"), ("location", "fica em qual bairro"),
+    ("location", "me manda a localização"), ("location", "vocês ficam perto do metrô?"), ("location", "qual o ponto de referência"),
+    ("contact", "me passa o número"), ("contact", "tem instagram?"), ("contact", "qual o insta de vocês"),
+    ("contact", "tem email?"), ("contact", "como falo com vocês"), ("contact", "me passa o celular"),
+    ("services", "quais tratamentos tem"), ("services", "vocês trabalham com cílios?"), ("services", "o que vocês fazem?"),
+    ("services", "tem alguma coisa pra sobrancelha falha?"), ("services", "fazem depilação?"),
+    ("unknown", "obrigada"), ("unknown", "aceitam cartão?"), ("unknown", "dá pra parcelar?"),
+    ("unknown", "tem estacionamento?"), ("unknown", "dói muito?"), ("unknown", "posso levar minha filha"),
+    ("unknown", "quanto tempo dura o efeito?"), ("unknown", "posso molhar depois?"), ("unknown", "grávida pode fazer?"),
+    ("unknown", "ok, valeu"), ("unknown", "vou pensar e te falo"),
+]
+
+# Not trained on: how the model does on new phrasings at INTENT_MIN_CONFIDENCE
+CLASSIFIER_HELD_OUT = [
+    ("hours", "vocês atendem no sábado de manhã?"), ("hours", "até que horas ficam abertas?"),
+    ("price", "quanto sai o design com henna"), ("price", "quanto custa a sobrancelha"),
+    ("booking", "tem vaga pra amanhã cedo?"), ("booking", "consigo horário sexta?"),
+    ("location", "qual o bairro?"), ("contact", "vocês tem insta?"),
+    ("unknown", "aceita pix?"), ("unknown", "obrigada, vou pensar e depois te falo certinho"), ("unknown", "tem wifi?"),
+]
+
+def bench_classifier(args):
+    import random
+    from bot_logic.classifier import IntentModel, IntentClassifier, training_examples, evaluate, print_evaluation
+    from bot_logic.intents import intent_matcher_v1
+
+    examples = training_examples() + CLASSIFIER_EXAMPLES
+    started = time.perf_counter()
+    model = IntentModel.train(examples)
+    print(f"Trained on {len(examples)} examples in {(time.perf_counter() - started) * 1000:.0f} ms")
+    print_evaluation(evaluate(model, CLASSIFIER_HELD_OUT, Config.INTENT_MIN_CONFIDENCE))
+
+    classifier = IntentClassifier(path='')
+    classifier.set_model(model)
+    messages = [message for _, message in CLASSIFIER_HELD_OUT]
+    print(f"\n{'message':<40} {'keywords':>9} {'+model':>8}  prediction")
+    for message in messages:
+        before = timed(lambda: intent_matcher_v1.match(message), args.iterations)
+        after = timed(lambda: classifier.classify(message, ('hours', 'price', 'booking', 'contact', 'location')), args.iterations)
+        label, confidence = model.predict(message)
+        print(f"{message[:40]:<40} {before:>9.2f} {after:>8.2f}  {label} ({confidence:.2f})")
+
+    # Replay-style batch scoring
+    rng = random.Random(42)
+    batch = [rng.choice(messages) + f" {i}" for i in range(args.batch)]
+    started = time.perf_counter()
+    model.predict_batch(batch)
+    elapsed = time.perf_counter() - started
+    print(f"\nBatch of {args.batch}: {elapsed * 1000:.1f} ms ({elapsed / args.batch * 1e6:.1f} µs/message)")
+
+# Imports one engine in a fresh interpreter and prints what it cost
+ENGINE_PROBE = """
+import json, os, sys, time, tracemalloc
+name, traced = sys.argv[1], sys.argv[2] == 'memory'
+
+def rss_kb():
+    # Resident set size (Linux); 0 where /proc is not available
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+    except OSError:
+        return 0
+
+if traced:
+    tracemalloc.start()
+rss = rss_kb()
+started = time.perf_counter()
+import bot_logic
+if name != 'none':
+    bot_logic.engine_module(name)
+result = {'ms': (time.perf_counter() - started) * 1000,
+          'rss_kb': rss_kb() - rss,
+          'openai': 'openai' in sys.modules, 'numpy': 'numpy' in sys.modules}
+if traced:
+    result['allocated_kb'] = tracemalloc.get_traced_memory()[0] / 1024
+print(json.dumps(result))
+"""
+
+def bench_engines(args):
+    import json
+    import statistics
+    import subprocess
+    from bot_logic import ENGINES
+
+    def probe(name, mode):
+        output = subprocess.run([sys.executable, '-c', ENGINE_PROBE, name, mode], check=True, capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    print(f"Engine import cost in a fresh interpreter (median of {args.repeat} runs; 'none' is the bot_logic package alone)")
+    print(f"{'engine':<8} {'import ms':>10} {'alloc KB':>9} {'RSS KB':>8}  heavy modules")
+    for name in ['none'] + list(ENGINES):
+        runs = [probe(name, 'time') for _ in range(args.repeat)]
+        memory = probe(name, 'memory')
+        heavy = [module for module in ('openai', 'numpy') if memory[module]] or ['-']
+        print(f"{name:<8} {statistics.median(r['ms'] for r in runs):>10.1f} {memory['allocated_kb']:>9.0f} "
+              f"{statistics.median(r['rss_kb'] for r in runs):>8.0f}  {', '.join(heavy)}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bot hot path micro-benchmarks")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    responses = subparsers.add_parser('responses', help='Fixed-intent replies: render per message vs response catalog')
+    responses.add_argument('--iterations', type=int, default=20000)
+    responses.add_argument('--extra-services', type=int, default=0, help='Filler services added to the catalog')
+    responses.set_defaults(func=bench_responses)
+
+    intents = subparsers.add_parser('intents', help='Intent detection: keyword scans vs compiled matcher')
+    intents.add_argument('--iterations', type=int, default=20000)
+    intents.add_argument('--extra-keywords', type=int, default=500, help='Synthetic keywords for the scaling comparison')
+    intents.set_defaults(func=bench_intents)
+
+    services = subparsers.add_parser('services', help='Service lookup: linear scan vs inverted index')
+    services.add_argument('--iterations', type=int, default=2000)
+    services.add_argument('--services', type=int, default=300, help='Catalog size')
+    services.set_defaults(func=bench_services)
+
+    classifier = subparsers.add_parser('classifier', help='Local intent classifier: per-message cost and batch scoring')
+    classifier.add_argument('--iterations', type=int, default=2000)
+    classifier.add_argument('--batch', type=int, default=5000, help='Messages scored in one replay batch')
+    classifier.set_defaults(func=bench_classifier)
+
+    engines = subparsers.add_parser('engines', help='Bot engines: import time and memory of each')
+    engines.add_argument('--repeat', type=int, default=5)
+    engines.set_defaults(func=bench_engines)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,4 +1,6 @@
-from flask import Blueprint, render_template_string, request, jsonify
+from flask import Blueprint, render_template_string, request, jsonify, current_app
+from config import Config
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -143,15 +145,17 @@ ADMIN_TEMPLATE = """
 def index():
     """Admin panel home page"""
     try:
-        # Try to get business info from database
+        # Try to get business info from database (?business_id=, else the deployment's own studio)
         from models import BusinessConfig, Service, OperatingHours
-        business = BusinessConfig.query.first()
-        services = Service.query.filter_by(business_id=1).all() if business else []
-        hours = OperatingHours.query.filter_by(business_id=1).order_by(OperatingHours.day_of_week).all() if business else []
+        business_id = int(request.args.get('business_id') or Config.DEFAULT_BUSINESS_ID)
+        business = BusinessConfig.query.get(business_id)
+        services = Service.query.filter_by(business_id=business.id).all() if business else []
+        hours = OperatingHours.query.filter_by(business_id=business.id).order_by(OperatingHours.day_of_week).all() if business else []
         
-        # Create default business if none exists
-        if not business:
+        # Create the default business if it does not exist yet
+        if not business and business_id == Config.DEFAULT_BUSINESS_ID:
             business = BusinessConfig(
+                id=business_id,
                 studio_name="Meu Studio de Sobrancelhas",
                 address="",
                 phone="",
@@ -177,7 +181,7 @@ def update_business():
     try:
         data = request.json
         from models import BusinessConfig, db
-        business = BusinessConfig.query.first()
+        business = BusinessConfig.query.get(int(data.get('business_id') or Config.DEFAULT_BUSINESS_ID))
         
         if business:
             business.studio_name = data.get('studio_name', business.studio_name)
@@ -189,9 +193,128 @@ def update_business():
             business.bot_intro_message = data.get('bot_intro_message', business.bot_intro_message)
             
             db.session.commit()
+            
+            # Other workers notice the new updated_at on their next version check
+            from bot_logic.snapshot import invalidate
+            invalidate(business.id)
             return jsonify({'success': True, 'message': 'Informações atualizadas com sucesso!'})
         
     except Exception as e:
         logger.error(f"Error updating business: {e}")
     
-    return jsonify({'success': False, 'message': 'Erro ao atualizar informações'})
\ No newline at end of file
+    return jsonify({'success': False, 'message': 'Erro ao atualizar informações'})
+
+@admin_bp.route('/broadcasts', methods=['GET'])
+def list_broadcasts():
+    """List template broadcast jobs with their progress"""
+    try:
+        from models import BroadcastJob
+        from services.broadcast import job_progress
+        jobs = BroadcastJob.query.order_by(BroadcastJob.id.desc()).limit(50).all()
+        return jsonify({'success': True, 'broadcasts': [job_progress(job) for job in jobs]})
+    except Exception as e:
+        logger.error(f"Error listing broadcasts: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao listar envios'}), 500
+
+@admin_bp.route('/broadcasts', methods=['POST'])
+def create_broadcast():
+    """Start a template broadcast from a CSV/JSON recipient list"""
+    try:
+        from services.broadcast import parse_recipients, create_job, job_progress, broadcast_runner
+        
+        # Either a file upload (form fields + 'recipients' file) or a JSON body
+        upload = request.files.get('recipients')
+        if upload:
+            data = request.form
+            phones = parse_recipients(upload.read().decode('utf-8'), upload.filename or '')
+        else:
+            data = request.json or {}
+            recipients = data.get('recipients', [])
+            if isinstance(recipients, str):
+                phones = parse_recipients(recipients)
+            else:
+                phones = parse_recipients(json.dumps(recipients))
+        
+        template_name = data.get('template_name')
+        if not template_name or not phones:
+            return jsonify({'success': False, 'message': 'Informe o template e os destinatários'}), 400
+        
+        job = create_job(
+            template_name,
+            phones,
+            name=data.get('name'),
+            language_code=data.get('language_code', 'pt_BR')
+        )
+        broadcast_runner.start(current_app._get_current_object(), job.id)
+        return jsonify({'success': True, 'broadcast': job_progress(job)}), 201
+        
+    except Exception as e:
+        logger.error(f"Error creating broadcast: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao criar envio'}), 500
+
+@admin_bp.route('/broadcasts/<int:job_id>', methods=['GET'])
+def broadcast_status(job_id):
+    """Progress, throughput and failures of one broadcast"""
+    from models import BroadcastJob
+    from services.broadcast import job_progress
+    job = BroadcastJob.query.get_or_404(job_id)
+    return jsonify({'success': True, 'broadcast': job_progress(job)})
+
+@admin_bp.route('/broadcasts/<int:job_id>/stop', methods=['POST'])
+def stop_broadcast(job_id):
+    """Stop a broadcast after its current batch"""
+    from services.broadcast import broadcast_runner
+    if broadcast_runner.stop(job_id):
+        return jsonify({'success': True, 'message': 'Envio será pausado'})
+    return jsonify({'success': False, 'message': 'Envio não está em andamento'})
+
+@admin_bp.route('/broadcasts/<int:job_id>/resume', methods=['POST'])
+def resume_broadcast(job_id):
+    """Resume a stopped (or interrupted) broadcast with its pending recipients"""
+    from models import BroadcastJob
+    from services.broadcast import broadcast_runner
+    job = BroadcastJob.query.get_or_404(job_id)
+    if job.status == 'completed':
+        return jsonify({'success': False, 'message': 'Envio já concluído'})
+    if broadcast_runner.start(current_app._get_current_object(), job.id):
+        return jsonify({'success': True, 'message': 'Envio retomado'})
+    return jsonify({'success': False, 'message': 'Envio já está em andamento'})
+
+@admin_bp.route('/tenants', methods=['GET'])
+def list_tenants():
+    """WhatsApp numbers and the studios they answer for"""
+    from models import WhatsAppNumber
+    numbers = WhatsAppNumber.query.order_by(WhatsAppNumber.id).all()
+    return jsonify({'success': True, 'tenants': [
+        {'phone_number_id': n.phone_number_id, 'business_id': n.business_id, 'active': n.active}
+        for n in numbers
+    ]})
+
+@admin_bp.route('/tenants', methods=['POST'])
+def save_tenant():
+    """Route a WhatsApp phone_number_id to a studio (created or updated)"""
+    try:
+        data = request.json or {}
+        from models import WhatsAppNumber, BusinessConfig, db
+        phone_number_id = str(data.get('phone_number_id') or '').strip()
+        business = BusinessConfig.query.get(data.get('business_id') or 0)
+        if not phone_number_id or not business:
+            return jsonify({'success': False, 'message': 'Informe o phone_number_id e um studio existente'}), 400
+        
+        number = WhatsAppNumber.query.filter_by(phone_number_id=phone_number_id).first()
+        if not number:
+            number = WhatsAppNumber(phone_number_id=phone_number_id)
+            db.session.add(number)
+        number.business_id = business.id
+        number.access_token = data.get('access_token', number.access_token)
+        number.active = bool(data.get('active', True))
+        db.session.commit()
+        
+        # Other workers pick it up on their next tenant refresh
+        from services.tenants import tenant_index
+        tenant_index.invalidate()
+        return jsonify({'success': True, 'message': 'Número salvo'})
+        
+    except Exception as e:
+        logger.error(f"Error saving tenant: {e}")
+        return jsonify({'success': False, 'message': 'Erro ao salvar número'}), 500
@@ -1,4 +1,8 @@
 from flask import Blueprint, request, jsonify, session
+from config import Config
+from services.session_store import SessionStore
+from bot_logic import SessionState
+from operator import itemgetter
 import uuid
 import logging
 
@@ -6,8 +10,8 @@ logger = logging.getLogger(__name__)
 
 bot_bp = Blueprint('bot', __name__, url_prefix='/bot')
 
-# Store bot instances for each session
-bot_instances = {}
+# Conversation state per web chat session, capped (per studio too) and expired when idle
+bot_instances = SessionStore(SessionState, sizeof=SessionState.footprint, partition=itemgetter(0))
 
 @bot_bp.route('/chat', methods=['POST'])
 def chat():
@@ -15,6 +19,7 @@ def chat():
     try:
         data = request.json
         message = data.get('message', '')
+        business_id = int(data.get('business_id') or Config.DEFAULT_BUSINESS_ID)
         
         # Get or create session ID
         session_id = session.get('bot_session_id')
@@ -22,15 +27,12 @@ def chat():
             session_id = str(uuid.uuid4())
             session['bot_session_id'] = session_id
         
-        # Get or create bot instance for this session
-        if session_id not in bot_instances:
-            from bot_logic import BrowStudioBot
-            bot_instances[session_id] = BrowStudioBot()
-        
-        bot = bot_instances[session_id]
+        # Get or create the state for this session and studio
+        state = bot_instances.get((business_id, session_id))
         
         # Get response
-        response = bot.get_response(message)
+        from bot_logic import get_engine
+        response = get_engine(business_id).respond(state, message)
         
         return jsonify({
             'success': True,
@@ -51,10 +53,10 @@ def reset():
     try:
         session_id = session.get('bot_session_id')
         
-        if session_id and session_id in bot_instances:
-            # Create new bot instance
-            from bot_logic import BrowStudioBot
-            bot_instances[session_id] = BrowStudioBot()
+        data = request.get_json(silent=True) or {}
+        business_id = int(data.get('business_id') or Config.DEFAULT_BUSINESS_ID)
+        if session_id and bot_instances.reset((business_id, session_id)):
+            # A fresh state is created on the next message
             return jsonify({'success': True, 'message': 'Sessão reiniciada'})
         
         return jsonify({'success': False, 'message': 'Nenhuma sessão ativa'})
@@ -67,12 +69,11 @@ def reset():
 def test():
     """Test endpoint to verify bot is working"""
     try:
-        from bot_logic import BrowStudioBot
-        bot = BrowStudioBot()
+        from bot_logic import get_engine
         return jsonify({
             'success': True,
             'message': 'Bot está funcionando!',
-            'test_response': bot.get_response('Olá')
+            'test_response': get_engine(Config.DEFAULT_BUSINESS_ID).respond(SessionState(), 'Olá')
         })
     except Exception as e:
         logger.error(f"Error in bot test: {e}")
@@ -1,19 +1,59 @@
 from flask import Blueprint, request, jsonify
 from config import Config
-from bot_logic import BrowStudioBot
+from bot_logic import SessionState, get_engine, component_stats
 from services.whatsapp import WhatsAppService
+from services.inbound_queue import InboundQueue
+from services.coalescer import BurstCoalescer
+from services.dedup import MessageDeduplicator
+from services.status_buffer import StatusBuffer
+from services.rate_limiter import rate_limiter
+from services.side_calls import SideCallDispatcher
+from services.metrics import LatencyRecorder
+from services.session_store import SessionStore
+from services.tenants import tenant_index
+from bot_logic.snapshot import cache_stats
+from operator import itemgetter
 import json
 import time
 
 whatsapp_bp = Blueprint('whatsapp', __name__, url_prefix='/webhook')
 
-# Store bot instances per phone number
-bot_sessions = {}
+# Conversation state per (business, customer number), capped (per studio too) and expired when idle
+bot_sessions = SessionStore(SessionState, sizeof=SessionState.footprint, partition=itemgetter(0))
 
-# Initialize WhatsApp service
+# WhatsApp service for the deployment's own number (tenants get theirs from tenant_index)
 wa_service = WhatsAppService()
 
-@whatsapp_bp.route('/', methods=['GET'])
+# Durable inbound queue drained by background consumers
+inbound_queue = InboundQueue()
+
+# Recently answered message ids, so Meta redeliveries are answered only once
+dedup = MessageDeduplicator()
+
+# Delivery statuses, written to the database in batches
+status_buffer = StatusBuffer()
+
+# Read receipts and typing indicators, sent off the reply path
+side_calls = SideCallDispatcher()
+
+# Where the time of a bot turn goes (ms)
+turn_latency = {
+    'bot': LatencyRecorder(),
+    'send': LatencyRecorder(),
+    'total': LatencyRecorder()
+}
+
+# Per-sender debounce window for bursts of short messages
+coalescer = BurstCoalescer()
+
+def start_background_workers(app):
+    """Start draining the inbound queue and status buffer (once per serving process)"""
+    coalescer.start(app, reply_to_burst)
+    status_buffer.start(app)
+    inbound_queue.start(app, process_payload)
+
+# /webhook is the URL given to Meta; /webhook/ is accepted too, without a redirect
+@whatsapp_bp.route('/', methods=['GET'], strict_slashes=False)
 def verify_webhook():
     """Verify webhook for WhatsApp Business API"""
     verify_token = Config.WHATSAPP_VERIFY_TOKEN
@@ -36,37 +76,59 @@ def verify_webhook():
     
     return 'Bad Request', 400
 
-@whatsapp_bp.route('/', methods=['POST'])
+@whatsapp_bp.route('/', methods=['POST'], strict_slashes=False)
 def webhook():
-    """Handle incoming WhatsApp messages"""
+    """Queue incoming WhatsApp webhooks and acknowledge right away"""
     try:
-        # Get the webhook data
-        data = request.get_json()
+        raw = request.get_data()
         
-        # Extract the message details
-        if 'entry' in data:
-            for entry in data['entry']:
-                for change in entry.get('changes', []):
-                    value = change.get('value', {})
-                    
-                    # Check if it's a message
-                    if 'messages' in value:
-                        for message in value['messages']:
-                            handle_message(message, value.get('metadata', {}))
-                    
-                    # Check if it's a status update
-                    elif 'statuses' in value:
-                        for status in value['statuses']:
-                            handle_status(status)
+        # Status-only callbacks (most of the traffic) skip the queue entirely
+        if b'"statuses"' in raw and b'"messages"' not in raw:
+            try:
+                process_statuses(json.loads(raw))
+                return jsonify({'status': 'ok'}), 200
+            except ValueError:
+                pass
         
+        inbound_queue.enqueue(raw.decode('utf-8'))
         return jsonify({'status': 'ok'}), 200
         
     except Exception as e:
-        print(f"Error processing webhook: {e}")
-        return jsonify({'status': 'error'}), 200
+        print(f"Error queueing webhook: {e}")
+        # Not stored, so let Meta redeliver it
+        return jsonify({'status': 'error'}), 500
+
+def process_payload(payload):
+    """Process a queued webhook payload (runs in a consumer thread)"""
+    data = json.loads(payload)
+    
+    # Extract the message details
+    if 'entry' in data:
+        for entry in data['entry']:
+            for change in entry.get('changes', []):
+                value = change.get('value', {})
+                
+                # Check if it's a message
+                if 'messages' in value:
+                    for message in value['messages']:
+                        handle_message(message, value.get('metadata', {}))
+                
+                # Check if it's a status update
+                elif 'statuses' in value:
+                    for status in value['statuses']:
+                        handle_status(status)
+
+def process_statuses(data):
+    """Buffer every status in a status-only payload"""
+    for entry in data.get('entry', []):
+        for change in entry.get('changes', []):
+            for status in change.get('value', {}).get('statuses', []):
+                handle_status(status)
 
 def handle_message(message, metadata):
     """Process incoming WhatsApp message"""
+    wa = wa_service
+    done = None
     try:
         # Extract message details
         from_number = message.get('from')
@@ -74,72 +136,139 @@ def handle_message(message, metadata):
         timestamp = message.get('timestamp')
         message_type = message.get('type')
         
-        # Mark message as read
-        wa_service.mark_as_read(message_id)
+        # Drop redeliveries before any outbound call or DB query
+        if message_id and not dedup.begin(message_id):
+            return
+        done = answered_callback(message_id)
+        
+        # The studio this number belongs to (in-memory routing, no query per message)
+        tenant = tenant_index.resolve(metadata.get('phone_number_id'))
+        if tenant is None:
+            print(f"No tenant for phone_number_id {metadata.get('phone_number_id')}, dropping message")
+            done(True)
+            return
+        wa = tenant_index.whatsapp(tenant)
+        
+        # Mark message as read (in the background)
+        side_calls.dispatch((tenant, from_number), lambda: wa.client.mark_as_read(message_id))
         
         # Handle different message types
         if message_type == 'text':
             text = message.get('text', {}).get('body', '')
             
-            # Show typing indicator
-            wa_service.send_typing_indicator(from_number)
-            
-            # Get or create bot session for this user
-            if from_number not in bot_sessions:
-                bot_sessions[from_number] = BrowStudioBot()
-            
-            bot = bot_sessions[from_number]
-            
-            # Get bot response
-            response = bot.get_response(text)
-            
-            # Send response
-            wa_service.send_message(from_number, response)
+            # Merge consecutive messages from this sender into one bot turn
+            coalescer.add((tenant, from_number), text, on_done=done, order=int(timestamp or 0))
+            done = None  # now called once the burst is answered
             
         elif message_type == 'button':
             # Handle button responses
             button_text = message.get('button', {}).get('text', '')
-            handle_button_response(from_number, button_text)
+            done(handle_button_response(tenant, from_number, button_text))
             
         else:
             # Handle other message types (image, audio, etc.)
-            wa_service.send_message(
+            sent = wa.send_message(
                 from_number, 
                 "Desculpe, no momento só consigo processar mensagens de texto. Por favor, digite sua pergunta! 😊"
             )
+            done(bool(sent))
             
     except Exception as e:
         print(f"Error handling message: {e}")
         # Send error message to user
         try:
-            wa_service.send_message(
+            wa.send_message(
                 from_number,
                 "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente!"
             )
         except:
             pass
+        # An apology is not an answer: let the redelivery try again
+        if done:
+            done(False)
+
+def answered_callback(message_id):
+    """done(ok) for a message being handled: once its reply is sent, records the
+    id as answered and then acks its queue entry (kept leased until then, so
+    a crash in between gets the message redelivered and answered)"""
+    release = inbound_queue.hold()
+    
+    def done(ok):
+        if message_id:
+            dedup.finish(message_id, handled=ok)
+        if release:
+            release(ok)
+    return done
+
+def reply_to_burst(key, parts):
+    """Answer a burst of text messages from one sender with a single reply.
+    
+    Returns True once the reply was sent; False (the messages are not
+    answered and get redelivered) if the bot or the send failed.
+    """
+    tenant, from_number = key
+    wa = tenant_index.whatsapp(tenant)
+    try:
+        started = time.perf_counter()
+        
+        # Show typing indicator while the bot works on the reply
+        side_calls.dispatch(key, lambda: wa.client.send_typing_indicator(from_number))
+        
+        # Get or create the session for this user at this studio
+        state = bot_sessions.get((tenant.business_id, from_number))
+        engine = get_engine(tenant.business_id)
+        text = "\n".join(parts)
+        
+        # Get bot response
+        response = engine.respond(state, text)
+        
+        # Parts that would each have reached the LLM on their own, less the call the merged turn made
+        if len(parts) > 1:
+            coalescer.record_llm_calls_saved(sum(map(engine.reaches_llm, parts)) - state.used_llm)
+        
+        # Send response
+        answered = time.perf_counter()
+        if not wa.send_message(from_number, response):
+            print(f"Reply to {from_number} was not sent")
+            return False
+        side_calls.reply_sent(key)
+        
+        sent = time.perf_counter()
+        turn_latency['bot'].record((answered - started) * 1000)
+        turn_latency['send'].record((sent - answered) * 1000)
+        turn_latency['total'].record((sent - started) * 1000)
+        return True
+        
+    except Exception as e:
+        print(f"Error replying to {from_number}: {e}")
+        try:
+            wa.send_message(
+                from_number,
+                "Desculpe, ocorreu um erro ao processar sua mensagem. Por favor, tente novamente!"
+            )
+        except:
+            pass
+        return False
 
 def handle_status(status):
     """Handle message status updates"""
-    status_type = status.get('status')
-    message_id = status.get('id')
-    recipient_id = status.get('recipient_id')
     timestamp = status.get('timestamp')
     
-    # Log status updates (you can store these in database if needed)
-    print(f"Message {message_id} to {recipient_id} is {status_type} at {timestamp}")
+    status_buffer.add({
+        'message_id': status.get('id'),
+        'recipient_id': status.get('recipient_id'),
+        'status': status.get('status'),
+        'timestamp': int(timestamp) if timestamp else None
+    })
 
-def handle_button_response(from_number, button_text):
-    """Handle button click responses"""
+def handle_button_response(tenant, from_number, button_text):
+    """Handle button click responses; returns True if the reply was sent"""
     # Get bot session
-    if from_number not in bot_sessions:
-        bot_sessions[from_number] = BrowStudioBot()
-    
-    bot = bot_sessions[from_number]
+    state = bot_sessions.get((tenant.business_id, from_number))
     
     # Process button as regular text
-    response = bot.get_response(button_text)
-    wa_service.send_message(from_number, response)
+    response = get_engine(tenant.business_id).respond(state, button_text)
+    return bool(tenant_index.whatsapp(tenant).send_message(from_number, response))
 
 @whatsapp_bp.route('/send-test', methods=['POST'])
 def send_test_message():
@@ -156,4 +285,22 @@ def send_test_message():
     if result:
         return jsonify({'success': True, 'result': result}), 200
     else:
-        return jsonify({'success': False, 'error': 'Failed to send message'}), 500
\ No newline at end of file
+        return jsonify({'success': False, 'error': 'Failed to send message'}), 500
+
+@whatsapp_bp.route('/stats', methods=['GET'])
+def stats():
+    """Processing pipeline statistics"""
+    return jsonify({
+        'inbound_queue': inbound_queue.stats(),
+        'bursts': coalescer.stats(),
+        'dedup': dedup.stats(),
+        'statuses': status_buffer.stats(),
+        'outbound': wa_service.pool_stats(),
+        'rate_limits': rate_limiter.stats(),
+        'side_calls': side_calls.stats(),
+        'business_cache': cache_stats(),
+        'tenants': tenant_index.stats(),
+        'sessions': bot_sessions.stats(),
+        **component_stats(),
+        'latency_ms': {name: recorder.summary() for name, recorder in turn_latency.items()}
+    })
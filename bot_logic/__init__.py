@@ -1 +1,61 @@
-from .chatbot import BrowStudioBot
\ No newline at end of file
+import importlib
+import sys
+from config import Config
+from .session import SessionState
+
+# Engine name -> module. A module (and what it depends on, e.g. openai for
+# 'llm' and 'legacy') is imported the first time its engine is used.
+ENGINES = {
+    'rules': '.chatbot',
+    'llm': '.chatbot_v1',
+    'legacy': '.chatbot_v0',
+}
+
+def parse_engines(value):
+    """Parse 'business_id:engine,...' into a dict"""
+    engines = {}
+    for item in (value or '').split(','):
+        if ':' in item:
+            business_id, name = item.split(':', 1)
+            engines[int(business_id)] = name.strip()
+    return engines
+
+_overrides = parse_engines(Config.BOT_ENGINES)
+
+def engine_name(business_id):
+    """The engine configured for a business: its BOT_ENGINES entry or BOT_ENGINE"""
+    return _overrides.get(business_id, Config.BOT_ENGINE)
+
+def engine_module(name=None):
+    """The module implementing an engine (BOT_ENGINE by default), imported on first use"""
+    name = name or Config.BOT_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown bot engine {name!r}, expected one of {', '.join(ENGINES)}")
+    return importlib.import_module(ENGINES[name], __name__)
+
+def get_engine(business_id=None):
+    """The shared engine for a business, of the kind configured for it"""
+    business_id = business_id or Config.DEFAULT_BUSINESS_ID
+    return engine_module(engine_name(business_id)).BrowStudioEngine.for_business(business_id)
+
+# Stats of the LLM-side components, reported only once an engine has loaded them
+_COMPONENT_STATS = {
+    'llm': ('llm', None),
+    'llm_cache': ('answer_cache', 'answer_cache'),
+    'llm_single_flight': ('single_flight', 'single_flight'),
+    'intent_classifier': ('classifier', 'intent_classifier'),
+}
+
+def component_stats():
+    stats = {}
+    for key, (module_name, instance) in _COMPONENT_STATS.items():
+        module = sys.modules.get(f"{__name__}.{module_name}")
+        if module is not None:
+            stats[key] = (getattr(module, instance) if instance else module).stats()
+    return stats
+
+def __getattr__(name):
+    # "from bot_logic import BrowStudioBot" gets the configured engine's classes
+    if name in ('BrowStudioBot', 'BrowStudioEngine'):
+        return getattr(engine_module(), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,159 @@
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from config import Config
+from .intents import fold
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# Words that point back at earlier turns ("e esse?", "quanto custa ele?")
+REFERENCE_WORDS = frozenset("""
+isso isto esse essa esses essas este esta aquele aquela aquilo ele ela eles elas dele dela deles
+delas disso desse dessa nele nela mesmo mesma tambem outro outra outros outras ai entao
+""".split())
+CONTINUATIONS = ('e ', 'mas ', 'entao ', 'tipo ')
+
+def normalize(message):
+    """Folded message without punctuation or emoji, as the cache key"""
+    return ' '.join(_PUNCTUATION.sub(' ', fold(message)).split())
+
+def depends_on_context(message, state):
+    """True if earlier turns could change the answer to message"""
+    if len(state.history) <= 1:
+        return False  # first message: there is no context
+    normalized = normalize(message)
+    words = normalized.split()
+    return (len(words) < 2 or normalized.startswith(CONTINUATIONS)
+            or not REFERENCE_WORDS.isdisjoint(words))
+
+class AnswerCache:
+    """LLM answers keyed by business version, day and normalized question.
+
+    An in-memory LRU with a TTL answers repeats within a worker; when
+    AI_CACHE_PATH is set, misses fall through to a SQLite table shared by
+    all workers and kept across restarts.
+    """
+
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None):
+        self.path = path if path is not None else Config.AI_CACHE_PATH
+        self.ttl = ttl_seconds or Config.AI_CACHE_TTL_SECONDS
+        self.max_entries = max_entries or Config.AI_CACHE_MAX_ENTRIES
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (answer, stored_at, llm latency ms)
+        self._conn = None
+        self._stats = {"lookups": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0,
+                       "skipped_context": 0, "stored": 0}
+        self._saved_ms = 0.0
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS llm_answers (
+                    cache_key TEXT PRIMARY KEY,
+                    answer TEXT NOT NULL,
+                    latency_ms REAL NOT NULL,
+                    stored_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    @staticmethod
+    def key(business_id, version, message, day=None):
+        # The prompt names today's date, so answers are only reused the same day
+        day = day or date.today().isoformat()
+        return f"{business_id}|{version}|{day}|{normalize(message)}"
+
+    @staticmethod
+    def parse_key(key):
+        """(business_id, version, day, normalized question) of a key made by key()"""
+        business_id, version, day, question = key.split('|', 3)
+        return business_id, version, day, question
+
+    def skip(self):
+        """Count a lookup that was not attempted because the answer depends on context"""
+        with self._lock:
+            self._stats["skipped_context"] += 1
+
+    def get(self, key):
+        """Cached answer for key, or None"""
+        now = time.time()
+        with self._lock:
+            self._stats["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                self._saved_ms += entry[2]
+                return entry[0]
+
+            if self.path:
+                try:
+                    row = self._connect().execute(
+                        "SELECT answer, stored_at, latency_ms FROM llm_answers WHERE cache_key = ? AND stored_at >= ?",
+                        (key, now - self.ttl)
+                    ).fetchone()
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not read LLM answer cache: {e}")
+                    row = None
+                if row:
+                    self._remember(key, row)
+                    self._stats["disk_hits"] += 1
+                    self._saved_ms += row[2]
+                    return row[0]
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key, answer, latency_ms):
+        """Store an LLM answer and how long the LLM took to produce it"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, (answer, now, latency_ms))
+            self._stats["stored"] += 1
+            if self.path:
+                try:
+                    self._connect().execute(
+                        "INSERT OR REPLACE INTO llm_answers (cache_key, answer, latency_ms, stored_at) VALUES (?, ?, ?, ?)",
+                        (key, answer, latency_ms, now)
+                    )
+                    if self._stats["stored"] % 1000 == 0:
+                        self._conn.execute("DELETE FROM llm_answers WHERE stored_at < ?", (now - self.ttl,))
+                except sqlite3.Error as e:
+                    logger.warning(f"Could not write LLM answer cache: {e}")
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            hits = stats["memory_hits"] + stats["disk_hits"]
+            stats.update({
+                "in_memory": len(self._entries),
+                "persistent": bool(self.path),
+                "hit_ratio": round(hits / stats["lookups"], 3) if stats["lookups"] else None,
+                "latency_saved_ms": round(self._saved_ms, 1)
+            })
+            return stats
+
+answer_cache = AnswerCache()
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from .session import SessionState
+from .snapshot import get_snapshot
+
+class BaseEngine:
+    """Interface shared by the bot engines: reply logic for one business.
+
+    Engines hold no conversation state; the SessionState passed to
+    respond() carries it. Subclasses set intent_matcher and implement
+    _reply() and _render_response() (used by the response catalog).
+    """
+
+    intent_matcher = None
+
+    # Replies the response catalog caches (costly to render or dated), and the ones that change daily
+    catalog_intents = ()
+    daily_intents = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._instances = {}
+        cls._instances_lock = threading.Lock()
+
+    def __init__(self, business_id=1):
+        self.business_id = business_id
+
+    @classmethod
+    def for_business(cls, business_id=1):
+        """The shared engine of this kind for a business"""
+        engine = cls._instances.get(business_id)
+        if engine is None:
+            with cls._instances_lock:
+                engine = cls._instances.setdefault(business_id, cls(business_id))
+        return engine
+
+    def _get_business_info(self):
+        """Retrieve current business configuration (cached per version)"""
+        snapshot = get_snapshot(self.business_id)
+        return snapshot.info if snapshot else None
+
+    def _detect_intent(self, message):
+        """Detect user intent from message"""
+        return self.intent_matcher.match(message)
+
+    def _default_deadline(self):
+        """Deadline for a reply starting now; engines that call the LLM set one"""
+        return None
+
+    def reaches_llm(self, message):
+        """True if a turn of just this message would be answered by the LLM
+        (checked without touching any session); engines without one never are"""
+        return False
+
+    def respond(self, state, user_message, deadline=None):
+        """Generate response to user message, recording both turns in the session state.
+
+        deadline (time.monotonic()) bounds any LLM call made for the reply;
+        afterwards state.used_llm tells whether one was made.
+        """
+        state.remember(user_message)
+        state.used_llm = False
+        response = self._reply(state, user_message, deadline or self._default_deadline())
+        if response:
+            state.remember_reply(response)
+        return response
+
+    async def respond_async(self, state, user_message, deadline=None):
+        """respond() for async handlers and the background event loop"""
+        state.remember(user_message)
+        state.used_llm = False
+        response = await self._reply_async(state, user_message, deadline or self._default_deadline())
+        if response:
+            state.remember_reply(response)
+        return response
+
+    def _reply(self, state, user_message, deadline):
+        raise NotImplementedError
+
+    async def _reply_async(self, state, user_message, deadline):
+        # Run _reply on a worker thread so a blocking engine never stalls the loop;
+        # engines that wait on the network override this to await instead
+        return await asyncio.to_thread(self._reply, state, user_message, deadline)
+
+    def _render_response(self, intent, info):
+        raise NotImplementedError
+
+class BaseBot:
+    """One conversation: a session state driven by the shared engine"""
+
+    engine_class = None
+
+    def __init__(self, business_id=1):
+        self.engine = self.engine_class.for_business(business_id)
+        self.session_state = SessionState()
+
+    def _detect_intent(self, message):
+        return self.engine._detect_intent(message)
+
+    def get_response(self, user_message):
+        """Generate response to user message"""
+        return self.engine.respond(self.session_state, user_message)
+
+    async def get_response_async(self, user_message):
+        """Awaitable get_response() for async handlers and the background event loop"""
+        return await self.engine.respond_async(self.session_state, user_message)
+
+def bot_class(engine_class):
+    """The BaseBot subclass (an engine module's BrowStudioBot) for an engine class"""
+    return type('BrowStudioBot', (BaseBot,), {
+        'engine_class': engine_class,
+        '__module__': engine_class.__module__,
+        '__doc__': BaseBot.__doc__,
+    })
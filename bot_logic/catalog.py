@@ -0,0 +1,41 @@
+import threading
+from datetime import date
+from config import Config
+
+_lock = threading.Lock()
+_catalogs = {}  # (engine module, business_id) -> {intent: ((version, day), reply)}, oldest filled first
+
+def get_response(engine, intent, info):
+    """Fixed reply for intent, rendered once per business version (and day, for daily intents).
+
+    Only the engine's catalog_intents are cached: replies that are costly
+    to build or that change with the date (daily_intents, e.g. the "(HOJE)"
+    marker). Cheap ones are rendered by engine._render_response(intent, info)
+    every time, which is faster than any lookup. Reads take no lock; only
+    filling an entry does.
+    """
+    if intent not in engine.catalog_intents:
+        return engine._render_response(intent, info)
+
+    # The date is only read for the one daily reply a turn may need
+    stamp = (info.get('version'), date.today() if intent in engine.daily_intents else None)
+    key = (type(engine).__module__, engine.business_id)
+    replies = _catalogs.get(key)
+    entry = replies.get(intent) if replies else None
+    if entry and entry[0] == stamp:
+        return entry[1]
+
+    reply = engine._render_response(intent, info)
+
+    with _lock:
+        replies = _catalogs.get(key)
+        if replies is None:
+            while len(_catalogs) >= Config.BUSINESS_CACHE_MAX:
+                del _catalogs[next(iter(_catalogs))]
+            replies = _catalogs[key] = {}
+        replies[intent] = (stamp, reply)
+    return reply
+
+def clear():
+    with _lock:
+        _catalogs.clear()
@@ -1,20 +1,19 @@
-from datetime import datetime
 import logging
+from .base import BaseEngine, bot_class
+from .snapshot import get_snapshot
+from . import catalog
+from .intents import intent_matcher
 
 logger = logging.getLogger(__name__)
 
-class BrowStudioBot:
+class BrowStudioEngine(BaseEngine):
+    """Keyword rules only: every reply comes from the response catalog"""
+    
+    intent_matcher = intent_matcher
+    catalog_intents = ('hours', 'services', 'price')
+    
     def __init__(self, business_id=1):
-        self.business_id = business_id
-        
-        # Enhanced session state
-        self.session_state = {
-            "greeted": False,
-            "greeting_count": 0,
-            "services_discussed": [],
-            "last_intent": None,
-            "conversation_history": []
-        }
+        super().__init__(business_id)
         
         # Default business info (fallback)
         self.default_info = {
@@ -34,24 +33,10 @@ class BrowStudioBot:
     def _get_business_info(self):
         """Retrieve business configuration with fallback"""
         try:
-            # Try to get from database
-            from models import BusinessConfig, Service, OperatingHours
-            business = BusinessConfig.query.get(self.business_id)
-            
-            if business:
-                services = Service.query.filter_by(business_id=self.business_id, active=True).all()
-                hours = OperatingHours.query.filter_by(business_id=self.business_id).order_by(OperatingHours.day_of_week).all()
-                
-                return {
-                    "name": business.studio_name,
-                    "address": business.address,
-                    "phone": business.phone,
-                    "whatsapp": business.whatsapp,
-                    "website": business.website,
-                    "services": services,
-                    "hours": hours,
-                    "bot_intro": business.bot_intro_message
-                }
+            # Try to get from database (cached per business version)
+            snapshot = get_snapshot(self.business_id)
+            if snapshot:
+                return snapshot.info
         except Exception as e:
             logger.warning(f"Could not access database, using defaults: {e}")
         
@@ -63,78 +48,19 @@ class BrowStudioBot:
         if not services:
             return "Ainda não temos serviços cadastrados."
         
-        text = ""
+        lines = []
         for service in services:
             if hasattr(service, 'name'):  # Database object
-                text += f"• {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)\n"
+                lines.append(f"• {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)")
                 if hasattr(service, 'description') and service.description:
-                    text += f"  {service.description}\n"
+                    lines.append(f"  {service.description}")
             else:  # Default dict
-                text += f"• {service['name']}: R$ {service['price']:.2f} (duração: {service['duration']}min)\n"
-        
-        return text.strip()
-    
-    def _detect_intent(self, message):
-        """Detect user intent from message"""
-        message_lower = message.lower()
-        
-        # Greetings
-        greetings = ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hello', 'hi', 'hey']
-        if any(greeting in message_lower.split() for greeting in greetings):
-            return 'greeting'
-        
-        # Hours/Schedule
-        if any(word in message_lower for word in ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento', 'aberto']):
-            return 'hours'
-        
-        # Price inquiry
-        if any(word in message_lower for word in ['quanto custa', 'preço', 'valor', 'precos', 'quanto é']):
-            return 'price'
-        
-        # Service inquiry
-        if any(word in message_lower for word in ['serviço', 'servico', 'procedimento', 'oferece', 'fazem', 'disponível']):
-            return 'services'
+                lines.append(f"• {service['name']}: R$ {service['price']:.2f} (duração: {service['duration']}min)")
         
-        # Contact
-        if any(word in message_lower for word in ['contato', 'telefone', 'whatsapp', 'ligar', 'zap']):
-            return 'contact'
-        
-        # Location
-        if any(word in message_lower for word in ['onde', 'endereço', 'endereco', 'localização', 'localizacao', 'fica']):
-            return 'location'
-        
-        # Booking
-        if any(word in message_lower for word in ['agendar', 'agendamento', 'marcar', 'horário disponível']):
-            return 'booking'
-        
-        return 'unknown'
+        return "\n".join(lines)
     
-    def get_response(self, user_message):
-        """Generate response to user message"""
-        info = self._get_business_info()
-        
-        # Add to conversation history
-        self.session_state['conversation_history'].append({
-            'user': user_message,
-            'timestamp': datetime.now()
-        })
-        
-        # Detect intent
-        intent = self._detect_intent(user_message)
-        
-        # Handle greetings specially
-        if intent == 'greeting':
-            self.session_state['greeting_count'] += 1
-            
-            if not self.session_state['greeted']:
-                self.session_state['greeted'] = True
-                return info.get('bot_intro', f"Olá! Seja bem-vinda ao {info['name']}! 😊 Como posso ajudar você hoje?")
-            elif self.session_state['greeting_count'] == 2:
-                return "Oi novamente! 😊 Em que posso ajudar? Temos diversos serviços de sobrancelhas disponíveis."
-            else:
-                return "Olá! Posso te ajudar com informações sobre nossos serviços, preços ou agendamento? 😊"
-        
-        # Handle specific intents
+    def _render_response(self, intent, info):
+        """Render the fixed reply for an intent (cached by the response catalog)"""
         if intent == 'hours':
             hours_text = info.get('hours', 'Horários não configurados')
             if isinstance(hours_text, str):
@@ -142,13 +68,14 @@ class BrowStudioBot:
             else:
                 # Format database hours
                 days = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-                formatted_hours = ""
+                lines = []
                 for hour in hours_text:
                     day_name = days[hour.day_of_week]
                     if not hour.is_closed:
-                        formatted_hours += f"{day_name}: {hour.open_time} - {hour.close_time}\n"
+                        lines.append(f"{day_name}: {hour.open_time} - {hour.close_time}\n")
                     else:
-                        formatted_hours += f"{day_name}: Fechado\n"
+                        lines.append(f"{day_name}: Fechado\n")
+                formatted_hours = "".join(lines)
                 return f"Nossos horários de funcionamento:\n\n{formatted_hours}\n\nPara agendar, entre em contato pelo WhatsApp: {info['whatsapp']} 📱"
         
         elif intent == 'services':
@@ -160,9 +87,10 @@ class BrowStudioBot:
             return f"Aqui estão nossos preços:\n\n{services_text}\n\nQual serviço você gostaria de saber mais detalhes?"
         
         elif intent == 'contact':
-            contact_info = f"📱 WhatsApp: {info['whatsapp']}\n📞 Telefone: {info['phone']}"
+            contact_lines = [f"📱 WhatsApp: {info['whatsapp']}", f"📞 Telefone: {info['phone']}"]
             if info.get('website'):
-                contact_info += f"\n🌐 Site: {info['website']}"
+                contact_lines.append(f"🌐 Site: {info['website']}")
+            contact_info = "\n".join(contact_lines)
             return f"Entre em contato conosco:\n\n{contact_info}\n\nPrefere agendar por WhatsApp para atendimento mais rápido!"
         
         elif intent == 'location':
@@ -170,6 +98,31 @@ class BrowStudioBot:
         
         elif intent == 'booking':
             return f"Para agendar seu horário, entre em contato pelo WhatsApp: {info['whatsapp']} 📱\n\nNosso atendimento é rápido e personalizado!"
+    
+    def _reply(self, state, user_message, deadline):
+        info = self._get_business_info()
+        
+        # Detect intent
+        intent = self._detect_intent(user_message)
+        
+        # Handle greetings specially
+        if intent == 'greeting':
+            state.greeting_count += 1
+            
+            if not state.greeted:
+                state.greeted = True
+                return info.get('bot_intro', f"Olá! Seja bem-vinda ao {info['name']}! 😊 Como posso ajudar você hoje?")
+            elif state.greeting_count == 2:
+                return "Oi novamente! 😊 Em que posso ajudar? Temos diversos serviços de sobrancelhas disponíveis."
+            else:
+                return "Olá! Posso te ajudar com informações sobre nossos serviços, preços ou agendamento? 😊"
+        
+        # Fixed replies come from the response catalog
+        if intent in ('hours', 'services', 'price', 'contact', 'location', 'booking'):
+            return catalog.get_response(self, intent, info)
         
         # Default response
-        return "Posso te ajudar com:\n• Informações sobre serviços e preços\n• Horários de funcionamento\n• Localização do studio\n• Contato para agendamento\n\nO que você gostaria de saber? 😊"
\ No newline at end of file
+        return "Posso te ajudar com:\n• Informações sobre serviços e preços\n• Horários de funcionamento\n• Localização do studio\n• Contato para agendamento\n\nO que você gostaria de saber? 😊"
+
+# One conversation driven by the shared engine (engines per business come from BrowStudioEngine.for_business)
+BrowStudioBot = bot_class(BrowStudioEngine)
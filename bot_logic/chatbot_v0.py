@@ -1,66 +1,29 @@
-import openai
-from models import BusinessConfig, Service, OperatingHours
-from config import Config
+from .base import BaseEngine, bot_class
+from . import catalog
+from .intents import intent_matcher_v0
+from . import llm
 
-class BrowStudioBot:
-    def __init__(self, business_id=1):
-        self.business_id = business_id
-        self.business = BusinessConfig.query.get(business_id)
-        
-        # Initialize OpenAI client
-        self.client = openai.OpenAI(
-            api_key=Config.AI_API_KEY,
-            base_url=Config.AI_BASE_URL,
-        )
-        
-        # Session state
-        self.session_state = {
-            "greeted": False,
-            "services_discussed": [],
-            "context": []
-        }
-        
-    def _get_business_info(self):
-        """Retrieve current business configuration from database"""
-        self.business = BusinessConfig.query.get(self.business_id)
-        if not self.business:
-            return None
-        
-        # Get services
-        services = Service.query.filter_by(business_id=self.business_id, active=True).all()
-        
-        # Get operating hours
-        hours = OperatingHours.query.filter_by(business_id=self.business_id).order_by(OperatingHours.day_of_week).all()
-        
-        return {
-            "name": self.business.studio_name,
-            "address": self.business.address,
-            "phone": self.business.phone,
-            "whatsapp": self.business.whatsapp,
-            "website": self.business.website,
-            "services": services,
-            "hours": hours,
-            "bot_tone": self.business.bot_tone,
-            "bot_intro": self.business.bot_intro_message
-        }
+class BrowStudioEngine(BaseEngine):
+    """The first engine: substring rules with the LLM for everything else"""
+    
+    intent_matcher = intent_matcher_v0
+    catalog_intents = ('hours', 'price', 'system_prompt')
     
     def _format_services_text(self, services):
         """Format services for display"""
-        text = ""
-        for service in services:
-            text += f"- {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)\n"
-        return text
+        return "".join(f"- {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)\n"
+                       for service in services)
     
     def _format_hours_text(self, hours):
         """Format operating hours for display"""
         days = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-        text = ""
+        lines = []
         for hour in hours:
             if not hour.is_closed:
-                text += f"{days[hour.day_of_week]}: {hour.open_time} - {hour.close_time}\n"
+                lines.append(f"{days[hour.day_of_week]}: {hour.open_time} - {hour.close_time}\n")
             else:
-                text += f"{days[hour.day_of_week]}: Fechado\n"
-        return text
+                lines.append(f"{days[hour.day_of_week]}: Fechado\n")
+        return "".join(lines)
     
     def _extract_service_from_message(self, message, services):
         """Find service mentioned in message"""
@@ -99,17 +62,33 @@ INSTRUÇÕES:
         
         return prompt
     
-    def get_response(self, user_message):
-        """Generate response to user message"""
+    def _render_response(self, intent, info):
+        """Render the fixed reply for an intent (cached by the response catalog)"""
+        if intent == 'hours':
+            return f"Nossos horários de funcionamento:\n\n{self._format_hours_text(info['hours'])}\n\nQuer agendar um horário?"
+        elif intent == 'price':
+            return f"Temos vários serviços! Aqui estão nossos preços:\n\n{self._format_services_text(info['services'])}\n\nQual serviço te interessou?"
+        elif intent == 'contact':
+            return f"Entre em contato conosco:\n📱 WhatsApp: {info['whatsapp']}\n📞 Telefone: {info['phone']}"
+        elif intent == 'location':
+            return f"Estamos localizados em:\n📍 {info['address']}"
+        elif intent == 'system_prompt':
+            return self._generate_system_prompt(info)
+    
+    def _default_deadline(self):
+        return llm.reply_deadline()
+    
+    def _reply(self, state, user_message, deadline):
         info = self._get_business_info()
         if not info:
             return "Desculpe, não consegui acessar as informações do studio."
         
+        intents = intent_matcher_v0.match_all(user_message)
+        
         # Check for greetings
-        greetings = ['oi', 'olá', 'bom dia', 'boa tarde', 'boa noite', 'ola']
-        if any(greeting in user_message.lower() for greeting in greetings):
-            if not self.session_state['greeted']:
-                self.session_state['greeted'] = True
+        if 'greeting' in intents:
+            if not state.greeted:
+                state.greeted = True
                 if info['bot_intro']:
                     return info['bot_intro']
                 else:
@@ -118,10 +97,10 @@ INSTRUÇÕES:
         # Check for service questions
         service = self._extract_service_from_message(user_message, info['services'])
         if service:
-            if service.id in self.session_state['services_discussed']:
+            if service.id in state.services_discussed:
                 return f"Já conversamos sobre {service.name}! Gostaria de agendar ou conhecer outro serviço? ✨"
             else:
-                self.session_state['services_discussed'].append(service.id)
+                state.services_discussed.append(service.id)
                 response = f"{service.name}: R$ {service.price:.2f} - Duração: {service.duration_minutes} minutos"
                 if service.description:
                     response += f"\n{service.description}"
@@ -129,28 +108,27 @@ INSTRUÇÕES:
                 return response
         
         # Check for hours question
-        hours_keywords = ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento']
-        if any(keyword in user_message.lower() for keyword in hours_keywords):
-            return f"Nossos horários de funcionamento:\n\n{self._format_hours_text(info['hours'])}\n\nQuer agendar um horário?"
+        if 'hours' in intents:
+            return catalog.get_response(self, 'hours', info)
         
         # Check for price questions without specific service
-        price_keywords = ['quanto custa', 'preço', 'valor', 'precos']
-        if any(keyword in user_message.lower() for keyword in price_keywords) and not service:
-            return f"Temos vários serviços! Aqui estão nossos preços:\n\n{self._format_services_text(info['services'])}\n\nQual serviço te interessou?"
+        if 'price' in intents and not service:
+            return catalog.get_response(self, 'price', info)
         
         # For other questions, use AI if available
         try:
-            if Config.AI_API_KEY and Config.AI_API_KEY != 'your-api-key-here':
-                response = self.client.chat.completions.create(
-                    model=Config.AI_MODEL,
-                    messages=[
-                        {"role": "system", "content": self._generate_system_prompt(info)},
+            client = llm.get_client()
+            if client and llm.is_configured():
+                state.used_llm = True
+                return llm.complete(
+                    [
+                        {"role": "system", "content": catalog.get_response(self, 'system_prompt', info)},
                         {"role": "user", "content": user_message}
                     ],
+                    deadline,
                     temperature=0.7,
                     max_tokens=300
                 )
-                return response.choices[0].message.content
             else:
                 # Fallback response when AI is not configured
                 return self._get_fallback_response(user_message, info)
@@ -158,17 +136,29 @@ INSTRUÇÕES:
             print(f"AI Error: {e}")
             return self._get_fallback_response(user_message, info)
     
+    def reaches_llm(self, message):
+        """True if no greeting, service, hours or price rule answers the message"""
+        info = self._get_business_info()
+        if not info or not llm.is_configured():
+            return False
+        if intent_matcher_v0.match_all(message) & {'greeting', 'hours', 'price'}:
+            return False
+        return self._extract_service_from_message(message, info['services']) is None
+    
     def _get_fallback_response(self, message, info):
         """Fallback responses when AI is not available"""
-        message_lower = message.lower()
+        intents = intent_matcher_v0.match_all(message)
         
         # Contact questions
-        if any(word in message_lower for word in ['contato', 'telefone', 'whatsapp', 'ligar']):
-            return f"Entre em contato conosco:\n📱 WhatsApp: {info['whatsapp']}\n📞 Telefone: {info['phone']}"
+        if 'contact' in intents:
+            return catalog.get_response(self, 'contact', info)
         
         # Location questions
-        if any(word in message_lower for word in ['onde', 'endereço', 'endereco', 'localização']):
-            return f"Estamos localizados em:\n📍 {info['address']}"
+        if 'location' in intents:
+            return catalog.get_response(self, 'location', info)
         
         # Default response
-        return "Posso te ajudar com informações sobre nossos serviços, preços, horários ou agendamento. O que gostaria de saber? 😊"
\ No newline at end of file
+        return "Posso te ajudar com informações sobre nossos serviços, preços, horários ou agendamento. O que gostaria de saber? 😊"
+
+# One conversation driven by the shared engine (engines per business come from BrowStudioEngine.for_business)
+BrowStudioBot = bot_class(BrowStudioEngine)
@@ -1,74 +1,54 @@
-import openai
-from models import BusinessConfig, Service, OperatingHours
 from config import Config
+from .base import BaseEngine, bot_class
+from . import catalog
+from .intents import intent_matcher_v1
+from .service_index import find_service, get_index
+from . import llm
+from .context import build_messages, estimate_tokens
+from .answer_cache import answer_cache, depends_on_context
+from .single_flight import single_flight
+from .classifier import intent_classifier
 from datetime import datetime
+import logging
+import time
 
-class BrowStudioBot:
-    def __init__(self, business_id=1):
-        self.business_id = business_id
-        self.business = BusinessConfig.query.get(business_id)
-        
-        # Initialize OpenAI client with error handling
-        try:
-            self.client = openai.OpenAI(
-                api_key=Config.AI_API_KEY,
-                base_url=Config.AI_BASE_URL,
-            )
-        except Exception as e:
-            print(f"Warning: Could not initialize AI client: {e}")
-            print("Bot will work with fallback responses only.")
-            self.client = None
-        
-        # Enhanced session state
-        self.session_state = {
-            "greeted": False,
-            "greeting_count": 0,
-            "services_discussed": [],
-            "last_intent": None,
-            "conversation_history": []
-        }
-        
-    def _get_business_info(self):
-        """Retrieve current business configuration from database"""
-        self.business = BusinessConfig.query.get(self.business_id)
-        if not self.business:
-            return None
-        
-        # Get services
-        services = Service.query.filter_by(business_id=self.business_id, active=True).all()
-        
-        # Get operating hours
-        hours = OperatingHours.query.filter_by(business_id=self.business_id).order_by(OperatingHours.day_of_week).all()
-        
-        return {
-            "name": self.business.studio_name,
-            "address": self.business.address,
-            "phone": self.business.phone,
-            "whatsapp": self.business.whatsapp,
-            "website": self.business.website,
-            "services": services,
-            "hours": hours,
-            "bot_tone": self.business.bot_tone,
-            "bot_intro": self.business.bot_intro_message
-        }
+logger = logging.getLogger(__name__)
+
+# Intents answered with a fixed reply from the response catalog
+CATALOG_INTENTS = ('hours', 'services', 'price', 'contact', 'location', 'booking', 'help', 'date')
+
+# Ends the services section of the prompt prefix when the services are ranked into the suffix instead
+RANKED_SERVICES_NOTE = "Os mais relevantes para a mensagem estão listados no final."
+
+# Room kept in AI_PROMPT_MAX_TOKENS for the suffix's date line
+SUFFIX_RESERVE_TOKENS = 20
+
+FALLBACK_REPLY = "Não entendi sua pergunta. 🤔 Posso te ajudar com:\n• Nossos serviços e preços\n• Horários de funcionamento\n• Agendamento via WhatsApp\n• Localização\n\nO que você gostaria de saber?"
+
+class BrowStudioEngine(BaseEngine):
+    """Keyword rules and service lookup, then the local classifier, then the LLM"""
+    
+    intent_matcher = intent_matcher_v1
+    catalog_intents = ('hours', 'services', 'price', 'date', 'system_prompt')
+    daily_intents = ('hours', 'date')  # "(HOJE)" and today's date
     
     def _format_services_text(self, services):
         """Format services for display"""
         if not services:
             return "Ainda não temos serviços cadastrados."
         
-        text = ""
+        lines = []
         for service in services:
-            text += f"• {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)\n"
+            lines.append(f"• {service.name}: R$ {service.price:.2f} (duração: {service.duration_minutes}min)")
             if service.description:
-                text += f"  {service.description}\n"
-        return text.strip()
+                lines.append(f"  {service.description}")
+        return "\n".join(lines)
     
-    def _format_hours_text(self, hours):
+    def _format_hours_text(self, hours, mark_today=True):
         """Format operating hours for display"""
         days = ['Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo']
-        today = datetime.now().weekday()
-        text = ""
+        today = datetime.now().weekday() if mark_today else None
+        lines = []
         
         for hour in hours:
             day_name = days[hour.day_of_week]
@@ -76,68 +56,30 @@ class BrowStudioBot:
                 day_name += " (HOJE)"
             
             if not hour.is_closed:
-                text += f"{day_name}: {hour.open_time} - {hour.close_time}\n"
+                lines.append(f"{day_name}: {hour.open_time} - {hour.close_time}")
             else:
-                text += f"{day_name}: Fechado\n"
-        return text.strip()
+                lines.append(f"{day_name}: Fechado")
+        return "\n".join(lines)
     
-    def _extract_service_from_message(self, message, services):
+    def _extract_service_from_message(self, message, info):
         """Find service mentioned in message"""
-        message_lower = message.lower()
-        for service in services:
-            service_name_lower = service.name.lower()
-            # Check for exact or partial matches
-            if service_name_lower in message_lower or any(word in message_lower for word in service_name_lower.split()):
-                return service
-        return None
-    
-    def _detect_intent(self, message):
-        """Detect user intent from message"""
-        message_lower = message.lower()
-        
-        # Greetings
-        greetings = ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hello', 'hi', 'hey']
-        if any(greeting in message_lower.split() for greeting in greetings):
-            return 'greeting'
-        
-        # Hours/Schedule
-        if any(word in message_lower for word in ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento', 'aberto']):
-            return 'hours'
-        
-        # Price inquiry
-        if any(word in message_lower for word in ['quanto custa', 'preço', 'valor', 'precos', 'quanto é']):
-            return 'price'
-        
-        # Service inquiry
-        if any(word in message_lower for word in ['serviço', 'servico', 'procedimento', 'oferece', 'fazem', 'disponível']):
-            return 'services'
-        
-        # Contact
-        if any(word in message_lower for word in ['contato', 'telefone', 'whatsapp', 'ligar', 'zap']):
-            return 'contact'
-        
-        # Location
-        if any(word in message_lower for word in ['onde', 'endereço', 'endereco', 'localização', 'localizacao', 'fica']):
-            return 'location'
-        
-        # Booking
-        if any(word in message_lower for word in ['agendar', 'agendamento', 'marcar', 'horário disponível']):
-            return 'booking'
-        
-        # Help
-        if any(word in message_lower for word in ['ajuda', 'ajudar', 'help', 'dúvida', 'duvida']):
-            return 'help'
-        
-        # Date/Day
-        if any(word in message_lower for word in ['que dia', 'hoje', 'data']):
-            return 'date'
-        
-        return 'unknown'
+        return find_service(self.business_id, info, message)
     
     def _generate_system_prompt(self, info):
-        """Generate system prompt based on business configuration"""
-        services_list = "\n".join([f"- {s.name}: R$ {s.price:.2f} ({s.duration_minutes}min)" for s in info['services']])
-        
+        """Stable system prompt prefix: identical for every call within a business version"""
+        services = info['services']
+        if len(services) <= Config.AI_PROMPT_MAX_SERVICES:
+            services_list = "\n".join([f"- {s.name}: R$ {s.price:.2f} ({s.duration_minutes}min)" for s in services])
+            prompt = self._prompt_text(info, services_list)
+            if estimate_tokens(prompt) + SUFFIX_RESERVE_TOKENS <= Config.AI_PROMPT_MAX_TOKENS:
+                return prompt
+        
+        # Large catalogs, or lists that would not fit AI_PROMPT_MAX_TOKENS: only the
+        # services relevant to each message go in the suffix, as many as fit
+        return self._prompt_text(info, f"O studio tem {len(services)} serviços. {RANKED_SERVICES_NOTE}")
+    
+    def _prompt_text(self, info, services_list):
+        """The prompt prefix around a given services section"""
         prompt = f"""Você é uma atendente virtual do {info['name']}.
 
 REGRAS IMPORTANTES:
@@ -157,7 +99,7 @@ SERVIÇOS DISPONÍVEIS (USE APENAS ESTES):
 {services_list}
 
 HORÁRIOS:
-{self._format_hours_text(info['hours'])}
+{self._format_hours_text(info['hours'], mark_today=False)}
 
 TOM: {info['bot_tone'] or 'Profissional e amigável'}
 
@@ -165,37 +107,37 @@ Para agendamentos, sempre direcione para o WhatsApp."""
         
         return prompt
     
-    def get_response(self, user_message):
-        """Generate response to user message"""
-        info = self._get_business_info()
-        if not info:
-            return "Desculpe, não consegui acessar as informações do studio."
-        
-        # Add to conversation history
-        self.session_state['conversation_history'].append({
-            'user': user_message,
-            'timestamp': datetime.now()
-        })
-        
-        # Detect intent
-        intent = self._detect_intent(user_message)
-        
-        # Handle greetings specially
-        if intent == 'greeting':
-            self.session_state['greeting_count'] += 1
-            
-            if not self.session_state['greeted']:
-                self.session_state['greeted'] = True
-                if info['bot_intro']:
-                    return info['bot_intro']
-                else:
-                    return f"Olá! Seja bem-vinda ao {info['name']}! 😊 Como posso ajudar você hoje?"
-            elif self.session_state['greeting_count'] == 2:
-                return "Oi novamente! 😊 Em que posso ajudar? Temos diversos serviços de sobrancelhas e cílios disponíveis."
-            elif self.session_state['greeting_count'] >= 3:
-                return "Olá! Vejo que está tentando cumprimentar várias vezes. Posso te ajudar com informações sobre nossos serviços, preços ou agendamento? 😊"
-        
-        # Handle specific intents with fallback responses
+    def _system_prompt(self, info, message):
+        """Cached stable prefix plus a small per-call suffix, capped at AI_PROMPT_MAX_TOKENS"""
+        prefix = catalog.get_response(self, 'system_prompt', info)
+        
+        days = ['segunda-feira', 'terça-feira', 'quarta-feira', 'quinta-feira', 'sexta-feira', 'sábado', 'domingo']
+        today = datetime.now()
+        suffix = [f"HOJE: {days[today.weekday()]}, {today.strftime('%d/%m/%Y')}"]
+        
+        services = []
+        limit = Config.AI_PROMPT_MAX_SERVICES
+        if RANKED_SERVICES_NOTE in prefix:
+            # Services the message hints at, topped up with the first ones in the catalog
+            relevant = get_index(self.business_id, info).rank(message, limit)
+            relevant += [s for s in info['services'][:limit] if s not in relevant][:limit - len(relevant)]
+            services = [f"- {s.name}: R$ {s.price:.2f} ({s.duration_minutes}min)" for s in relevant]
+        
+        # Relevant services go first when the prompt is over the cap
+        budget = Config.AI_PROMPT_MAX_TOKENS - estimate_tokens(prefix)
+        while services and estimate_tokens("\n".join(suffix + ["SERVIÇOS RELEVANTES:"] + services)) > budget:
+            services.pop()
+        if services:
+            suffix += ["SERVIÇOS RELEVANTES:"] + services
+        suffix = "\n".join(suffix)
+        
+        if budget < estimate_tokens(suffix):
+            # Only the studio details themselves are left; sending them whole beats cutting them mid-text
+            logger.warning(f"System prompt over AI_PROMPT_MAX_TOKENS ({Config.AI_PROMPT_MAX_TOKENS}) without any services")
+        return f"{prefix}\n\n{suffix}"
+    
+    def _render_response(self, intent, info):
+        """Render the fixed reply for an intent (cached by the response catalog)"""
         if intent == 'hours':
             return f"Nossos horários de funcionamento:\n\n{self._format_hours_text(info['hours'])}\n\nPara agendar, entre em contato pelo WhatsApp: {info['whatsapp']} 📱"
         
@@ -204,18 +146,14 @@ Para agendamentos, sempre direcione para o WhatsApp."""
             return f"Nossos serviços:\n\n{services_text}\n\nQual serviço te interessou? 😊"
         
         elif intent == 'price':
-            # Check if asking about specific service
-            service = self._extract_service_from_message(user_message, info['services'])
-            if service:
-                return f"{service.name}: R$ {service.price:.2f}\nDuração: {service.duration_minutes} minutos\n\nGostaria de agendar este serviço? Entre em contato pelo WhatsApp: {info['whatsapp']}"
-            else:
-                services_text = self._format_services_text(info['services'])
-                return f"Aqui estão nossos preços:\n\n{services_text}\n\nQual serviço você gostaria de saber mais detalhes?"
+            services_text = self._format_services_text(info['services'])
+            return f"Aqui estão nossos preços:\n\n{services_text}\n\nQual serviço você gostaria de saber mais detalhes?"
         
         elif intent == 'contact':
-            contact_info = f"📱 WhatsApp: {info['whatsapp']}\n📞 Telefone: {info['phone']}"
+            contact_lines = [f"📱 WhatsApp: {info['whatsapp']}", f"📞 Telefone: {info['phone']}"]
             if info['website']:
-                contact_info += f"\n🌐 Site: {info['website']}"
+                contact_lines.append(f"🌐 Site: {info['website']}")
+            contact_info = "\n".join(contact_lines)
             return f"Entre em contato conosco:\n\n{contact_info}\n\nPrefere agendar por WhatsApp para atendimento mais rápido!"
         
         elif intent == 'location':
@@ -233,37 +171,172 @@ Para agendamentos, sempre direcione para o WhatsApp."""
             day_name = days[today.weekday()]
             return f"Hoje é {day_name}, {today.strftime('%d/%m/%Y')}. Confira nossos horários de funcionamento acima! Estamos prontas para te atender. 💅"
         
+        elif intent == 'system_prompt':
+            return self._generate_system_prompt(info)
+    
+    def _default_deadline(self):
+        # The LLM fallback gets AI_REPLY_BUDGET_MS from the start of the reply
+        return llm.reply_deadline()
+    
+    def _reply(self, state, user_message, deadline):
+        info = self._get_business_info()
+        response = self._rule_reply(state, user_message, info)
+        if response is not None:
+            return response
+        
+        # For unknown intents, use AI if available
+        client = llm.get_client()
+        if client and llm.is_configured():
+            cache_key, cached, messages = self._llm_request(state, user_message, info)
+            if cached:
+                return cached
+            
+            state.used_llm = True
+            try:
+                started = time.perf_counter()
+                call = lambda: llm.complete(messages, deadline, temperature=0.7, max_tokens=300)
+                # Identical standalone questions already on their way to the LLM share that call
+                answer = single_flight.run(cache_key, call, deadline) if self._shareable(cache_key, messages) else call()
+                self._llm_answered(cache_key, answer, started)
+                return answer
+            except llm.DeadlineExceeded:
+                print(f"AI Error: no answer within the {Config.AI_REPLY_BUDGET_MS}ms reply budget")
+            except Exception as e:
+                print(f"AI Error: {e}")
+        
+        # Final fallback
+        return FALLBACK_REPLY
+    
+    async def _reply_async(self, state, user_message, deadline):
+        # Same as _reply, but the LLM call is awaited so one event loop serves many conversations
+        info = self._get_business_info()
+        response = self._rule_reply(state, user_message, info)
+        if response is not None:
+            return response
+        
+        client = llm.get_async_client()
+        if client and llm.is_configured():
+            cache_key, cached, messages = self._llm_request(state, user_message, info)
+            if cached:
+                return cached
+            
+            state.used_llm = True
+            try:
+                started = time.perf_counter()
+                call = lambda: llm.complete_async(messages, deadline, temperature=0.7, max_tokens=300)
+                shared = self._shareable(cache_key, messages)
+                answer = await (single_flight.run_async(cache_key, call, deadline) if shared else call())
+                self._llm_answered(cache_key, answer, started)
+                return answer
+            except llm.DeadlineExceeded:
+                print(f"AI Error: no answer within the {Config.AI_REPLY_BUDGET_MS}ms reply budget")
+            except Exception as e:
+                print(f"AI Error: {e}")
+        
+        return FALLBACK_REPLY
+    
+    def reaches_llm(self, message):
+        """True if no keyword rule, service lookup or classifier prediction answers the message"""
+        info = self._get_business_info()
+        if not info or not llm.is_configured() or self._detect_intent(message) != 'unknown':
+            return False
+        if self._extract_service_from_message(message, info):
+            return False
+        return intent_classifier.classify(message, CATALOG_INTENTS, record=False) is None
+    
+    def _rule_reply(self, state, user_message, info):
+        """Reply from the intent rules and service catalog, or None if the LLM should answer"""
+        if not info:
+            return "Desculpe, não consegui acessar as informações do studio."
+        
+        # Detect intent
+        intent = self._detect_intent(user_message)
+        
+        # Handle greetings specially
+        if intent == 'greeting':
+            state.greeting_count += 1
+            
+            if not state.greeted:
+                state.greeted = True
+                if info['bot_intro']:
+                    return info['bot_intro']
+                else:
+                    return f"Olá! Seja bem-vinda ao {info['name']}! 😊 Como posso ajudar você hoje?"
+            elif state.greeting_count == 2:
+                return "Oi novamente! 😊 Em que posso ajudar? Temos diversos serviços de sobrancelhas e cílios disponíveis."
+            elif state.greeting_count >= 3:
+                return "Olá! Vejo que está tentando cumprimentar várias vezes. Posso te ajudar com informações sobre nossos serviços, preços ou agendamento? 😊"
+        
+        # Fixed replies come from the response catalog
+        if intent in ('hours', 'services', 'contact', 'location', 'booking', 'help', 'date'):
+            return catalog.get_response(self, intent, info)
+        
+        elif intent == 'price':
+            # Check if asking about specific service
+            service = self._extract_service_from_message(user_message, info)
+            if service:
+                return f"{service.name}: R$ {service.price:.2f}\nDuração: {service.duration_minutes} minutos\n\nGostaria de agendar este serviço? Entre em contato pelo WhatsApp: {info['whatsapp']}"
+            else:
+                return catalog.get_response(self, 'price', info)
+        
         # Check for specific service mention
-        service = self._extract_service_from_message(user_message, info['services'])
+        service = self._extract_service_from_message(user_message, info)
         if service:
-            if service.id in self.session_state['services_discussed']:
+            if service.id in state.services_discussed:
                 return f"Já conversamos sobre {service.name}! 😊\nR$ {service.price:.2f} - {service.duration_minutes} minutos\n\nQuer agendar ou conhecer outro serviço?"
             else:
-                self.session_state['services_discussed'].append(service.id)
+                state.services_discussed.append(service.id)
                 response = f"✨ {service.name} ✨\n💰 R$ {service.price:.2f}\n⏱️ Duração: {service.duration_minutes} minutos"
                 if service.description:
                     response += f"\n\n{service.description}"
                 response += f"\n\nPara agendar, chame no WhatsApp: {info['whatsapp']}"
                 return response
         
-        # For unknown intents, use AI if available
-        if self.client and Config.AI_API_KEY != 'your-api-key-here':
-            try:
-                # Include conversation context
-                context = "\n".join([f"User: {h['user']}" for h in self.session_state['conversation_history'][-3:]])
-                
-                response = self.client.chat.completions.create(
-                    model=Config.AI_MODEL,
-                    messages=[
-                        {"role": "system", "content": self._generate_system_prompt(info)},
-                        {"role": "user", "content": f"Contexto da conversa:\n{context}\n\nMensagem atual: {user_message}"}
-                    ],
-                    temperature=0.7,
-                    max_tokens=300
-                )
-                return response.choices[0].message.content
-            except Exception as e:
-                print(f"AI Error: {e}")
+        # Paraphrases of known intents the keywords missed are answered locally, not by the LLM
+        intent = intent_classifier.classify(user_message, CATALOG_INTENTS)
+        if intent:
+            return catalog.get_response(self, intent, info)
         
-        # Final fallback
-        return "Não entendi sua pergunta. 🤔 Posso te ajudar com:\n• Nossos serviços e preços\n• Horários de funcionamento\n• Agendamento via WhatsApp\n• Localização\n\nO que você gostaria de saber?"
\ No newline at end of file
+        return None
+    
+    def _llm_request(self, state, user_message, info):
+        """(cache key, cached answer, chat messages) for an LLM fallback call.
+        
+        Only standalone questions get a cache key, and they are sent as just
+        the system prompt and the question, so a cached or shared answer
+        never carries anything from one customer's conversation.
+        """
+        if depends_on_context(user_message, state):
+            # Recent turns (both sides) within the token budget, older ones summarized
+            answer_cache.skip()
+            cache_key = None
+            system_prompt = self._system_prompt(info, user_message)
+            messages = build_messages(system_prompt, state)
+        else:
+            cache_key = answer_cache.key(self.business_id, info['version'], user_message)
+            cached = answer_cache.get(cache_key)
+            if cached:
+                return cache_key, cached, None
+            system_prompt = self._system_prompt(info, user_message)
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_message}
+            ]
+        prompt_tokens = sum(estimate_tokens(m['content']) for m in messages)
+        logger.info(f"LLM prompt ~{prompt_tokens} tokens (system {estimate_tokens(system_prompt)}, "
+                    f"conversation {prompt_tokens - estimate_tokens(system_prompt)})")
+        return cache_key, None, messages
+    
+    @staticmethod
+    def _shareable(cache_key, messages):
+        """True if concurrent callers may share this call's answer: a standalone
+        question sent as only the system prompt and the question"""
+        return bool(cache_key) and [m['role'] for m in messages] == ['system', 'user']
+    
+    def _llm_answered(self, cache_key, answer, started):
+        """Cache an LLM answer along with how long it took (started: time.perf_counter())"""
+        if cache_key and answer:
+            answer_cache.put(cache_key, answer, (time.perf_counter() - started) * 1000)
+
+# One conversation driven by the shared engine (engines per business come from BrowStudioEngine.for_business)
+BrowStudioBot = bot_class(BrowStudioEngine)
@@ -0,0 +1,335 @@
+"""
+Local intent classifier for messages the keyword matcher misses.
+
+Hashed word and character n-grams feed a softmax (multinomial logistic
+regression) model trained offline with NumPy. At runtime it sits between
+the keyword matcher and the LLM fallback: a confident prediction is
+answered from the response catalog instead of going to the LLM.
+
+Train and replay from the command line:
+
+    python -m bot_logic.classifier train labeled.tsv --messages messages.txt
+    python -m bot_logic.classifier replay messages.txt
+
+labeled.tsv has one "intent<TAB>message" per line; label messages that
+really need the LLM as "unknown". messages.txt (one message per line, or an
+AI_CACHE_PATH database) adds messages the keyword matcher already labels.
+"""
+
+import logging
+import os
+import threading
+import time
+import zlib
+from config import Config
+from services.metrics import LatencyRecorder
+from .answer_cache import AnswerCache, normalize
+from .intents import V1_INTENTS, intent_matcher_v1
+
+logger = logging.getLogger(__name__)
+
+FEATURE_BITS = 15
+
+def _numpy():
+    # Imported on first use: the bot runs without NumPy when no model is deployed
+    import numpy
+    return numpy
+
+def features(message, bits=FEATURE_BITS):
+    """Hashed feature indices: words, word bigrams and character trigrams of the normalized message"""
+    words = normalize(message).split()
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        grams += [padded[i:i + 3] for i in range(len(padded) - 2)]
+    mask = (1 << bits) - 1
+    return [zlib.crc32(gram.encode()) & mask for gram in grams]
+
+class IntentModel:
+    """Trained weights: one column per label over 2**bits hashed features"""
+
+    def __init__(self, labels, weights, bias, bits=FEATURE_BITS):
+        self.labels = list(labels)
+        self.weights = weights
+        self.bias = bias
+        self.bits = bits
+
+    @staticmethod
+    def _encode(messages, bits):
+        """Flat feature indices, per-message offsets and per-feature values (1/sqrt(count))"""
+        np = _numpy()
+        rows = [features(message, bits) or [0] for message in messages]
+        lengths = np.array([len(row) for row in rows])
+        indices = np.fromiter((i for row in rows for i in row), dtype=np.int64, count=int(lengths.sum()))
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        values = np.repeat(1 / np.sqrt(lengths), lengths).astype(np.float32)
+        return indices, offsets, values
+
+    def _scores(self, indices, offsets, values):
+        np = _numpy()
+        return np.add.reduceat(self.weights[indices] * values[:, None], offsets, axis=0) + self.bias
+
+    def predict_batch(self, messages):
+        """(labels, confidences) for a list of messages, scored in one pass"""
+        np = _numpy()
+        if not messages:
+            return [], np.zeros(0)
+        scores = self._scores(*self._encode(messages, self.bits))
+        scores -= scores.max(axis=1, keepdims=True)
+        probabilities = np.exp(scores)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+        return [self.labels[i] for i in best], probabilities[np.arange(len(best)), best]
+
+    def predict(self, message):
+        """(label, confidence) for one message"""
+        labels, confidences = self.predict_batch([message])
+        return labels[0], float(confidences[0])
+
+    @classmethod
+    def train(cls, examples, bits=FEATURE_BITS, epochs=500, learning_rate=2.0, l2=1e-4):
+        """Fit on (intent, message) pairs with full-batch gradient descent"""
+        np = _numpy()
+        labels = sorted({intent for intent, _ in examples})
+        targets = np.array([labels.index(intent) for intent, _ in examples])
+        indices, offsets, values = cls._encode([message for _, message in examples], bits)
+        lengths = np.diff(np.append(offsets, len(indices)))
+
+        model = cls(labels, np.zeros((1 << bits, len(labels)), dtype=np.float32),
+                    np.zeros(len(labels), dtype=np.float32), bits)
+        onehot = np.eye(len(labels), dtype=np.float32)[targets]
+        for _ in range(epochs):
+            scores = model._scores(indices, offsets, values)
+            scores -= scores.max(axis=1, keepdims=True)
+            probabilities = np.exp(scores)
+            probabilities /= probabilities.sum(axis=1, keepdims=True)
+            error = (probabilities - onehot) / len(examples)
+
+            gradient = np.zeros_like(model.weights)
+            np.add.at(gradient, indices, np.repeat(error, lengths, axis=0) * values[:, None])
+            model.weights -= learning_rate * (gradient + l2 * model.weights)
+            model.bias -= learning_rate * error.sum(axis=0)
+        return model
+
+    def save(self, path):
+        np = _numpy()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        np.savez_compressed(path, labels=np.array(self.labels), weights=self.weights, bias=self.bias,
+                            bits=np.array(self.bits))
+
+    @classmethod
+    def load(cls, path):
+        np = _numpy()
+        with np.load(path) as data:
+            return cls(data['labels'].tolist(), data['weights'], data['bias'], int(data['bits']))
+
+class IntentClassifier:
+    """The deployed model (loaded lazily from INTENT_MODEL_PATH) and what it absorbed.
+
+    Disabled, and costing nothing, when the model file or NumPy is missing.
+    """
+
+    def __init__(self, path=None, min_confidence=None):
+        self.path = path if path is not None else Config.INTENT_MODEL_PATH
+        self.min_confidence = min_confidence or Config.INTENT_MIN_CONFIDENCE
+        self._lock = threading.Lock()
+        self._model = None
+        self._loaded = False
+        self.latency = LatencyRecorder()
+        self._stats = {"checked": 0, "absorbed": 0, "below_threshold": 0}
+        self._absorbed_by_intent = {}
+
+    def _get_model(self):
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if not self.path or not os.path.exists(self.path):
+                        logger.info(f"No intent model at {self.path!r}, local classifier disabled")
+                    else:
+                        try:
+                            self._model = IntentModel.load(self.path)
+                        except Exception as e:
+                            logger.warning(f"Could not load intent model {self.path}: {e}")
+                    self._loaded = True
+        return self._model
+
+    def set_model(self, model):
+        with self._lock:
+            self._model = model
+            self._loaded = True
+
+    def classify(self, message, intents, record=True):
+        """Confident prediction among intents for a message the keywords missed, or None to fall back to the LLM.
+
+        record=False leaves the stats alone (for checks that answer nothing).
+        """
+        model = self._get_model()
+        if model is None:
+            return None
+
+        started = time.perf_counter()
+        intent, confidence = model.predict(message)
+        if not record:
+            return intent if intent in intents and confidence >= self.min_confidence else None
+        self.latency.record((time.perf_counter() - started) * 1000)
+
+        with self._lock:
+            self._stats["checked"] += 1
+            if intent not in intents or confidence < self.min_confidence:
+                self._stats["below_threshold"] += 1
+                return None
+            self._stats["absorbed"] += 1
+            self._absorbed_by_intent[intent] = self._absorbed_by_intent.get(intent, 0) + 1
+        return intent
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["by_intent"] = dict(self._absorbed_by_intent)
+        stats["enabled"] = self._model is not None
+        stats["min_confidence"] = self.min_confidence
+        # Share of would-be LLM fallbacks answered locally
+        stats["absorbed_ratio"] = round(stats["absorbed"] / stats["checked"], 3) if stats["checked"] else None
+        stats["latency_ms"] = self.latency.summary()
+        return stats
+
+intent_classifier = IntentClassifier()
+
+def read_messages(path):
+    """Messages from a text file (one per line) or the questions stored in an AI_CACHE_PATH database"""
+    if path.endswith('.db'):
+        import sqlite3
+        with sqlite3.connect(path) as conn:
+            return [AnswerCache.parse_key(key)[3] for key, in conn.execute("SELECT cache_key FROM llm_answers")]
+    with open(path, encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def training_examples(labeled_path=None, messages_path=None):
+    """(intent, message) pairs: the keyword tables, labeled examples and matcher-labeled messages"""
+    examples = [(intent, keyword) for intent, keywords in V1_INTENTS for keyword in keywords]
+    if labeled_path:
+        with open(labeled_path, encoding='utf-8') as f:
+            for line in f:
+                if '\t' in line:
+                    intent, message = line.rstrip('\n').split('\t', 1)
+                    examples.append((intent.strip(), message.strip()))
+    if messages_path:
+        for message in read_messages(messages_path):
+            intent = intent_matcher_v1.match(message)
+            if intent != 'unknown':
+                examples.append((intent, message))
+    return examples
+
+def split_examples(examples, holdout=0.2, seed=0):
+    """(train, held out): a seeded random holdout fraction of each intent's examples"""
+    import random
+
+    rng = random.Random(seed)
+    by_intent = {}
+    for example in examples:
+        by_intent.setdefault(example[0], []).append(example)
+    train, held_out = [], []
+    for group in by_intent.values():
+        rng.shuffle(group)
+        count = int(len(group) * holdout)
+        held_out += group[:count]
+        train += group[count:]
+    return train, held_out
+
+def evaluate(model, examples, min_confidence=None):
+    """How the model does on (intent, message) pairs it was not trained on.
+
+    absorbed: answered locally (a known intent at min_confidence or more)
+    and right; misrouted: answered locally but wrong, i.e. a reply the LLM
+    should have given.
+    """
+    min_confidence = min_confidence or Config.INTENT_MIN_CONFIDENCE
+    labels, confidences = model.predict_batch([message for _, message in examples])
+    report = {"examples": len(examples), "correct": 0, "absorbed": 0, "misrouted": 0}
+    for label, confidence, (intent, _) in zip(labels, confidences, examples):
+        report["correct"] += label == intent
+        if label != 'unknown' and confidence >= min_confidence:
+            report["absorbed" if label == intent else "misrouted"] += 1
+    known = sum(intent != 'unknown' for intent, _ in examples)
+    report.update({
+        "min_confidence": min_confidence,
+        "accuracy": report["correct"] / len(examples) if examples else None,
+        "absorbed_ratio": report["absorbed"] / known if known else None,
+    })
+    return report
+
+def print_evaluation(report):
+    print(f"Held-out accuracy: {report['accuracy']:.1%} of {report['examples']} examples")
+    ratio = f"{report['absorbed_ratio']:.1%}" if report['absorbed_ratio'] is not None else "-"
+    print(f"At confidence >= {report['min_confidence']}: {report['absorbed']} absorbed "
+          f"({ratio} of known intents), {report['misrouted']} misrouted")
+
+def _train(args):
+    examples = training_examples(args.labeled, args.messages)
+    if not any(intent == 'unknown' for intent, _ in examples):
+        print("Warning: no 'unknown' examples; the model will never defer to the LLM on its own")
+
+    # Score a model trained without some of the labeled and logged messages on those
+    # (keyword-table entries always train); the saved model then trains on everything
+    keywords = training_examples()
+    train, held_out = split_examples(examples[len(keywords):], args.holdout)
+    if held_out:
+        model = IntentModel.train(keywords + train, epochs=args.epochs)
+        print_evaluation(evaluate(model, held_out, args.min_confidence))
+    else:
+        print("Not enough labeled messages for a held-out evaluation")
+
+    started = time.perf_counter()
+    model = IntentModel.train(examples, epochs=args.epochs)
+    print(f"Trained on {len(examples)} examples, {len(model.labels)} intents "
+          f"in {time.perf_counter() - started:.1f}s")
+
+    labels, _ = model.predict_batch([message for _, message in examples])
+    accuracy = sum(label == intent for label, (intent, _) in zip(labels, examples)) / len(examples)
+    print(f"Training accuracy (all examples): {accuracy:.1%}")
+    model.save(args.out)
+    print(f"Saved to {args.out}")
+
+def _replay(args):
+    model = IntentModel.load(args.model)
+    messages = [m for m in read_messages(args.messages) if intent_matcher_v1.match(m) == 'unknown']
+    started = time.perf_counter()
+    labels, confidences = model.predict_batch(messages)
+    elapsed = time.perf_counter() - started
+
+    absorbed = {}
+    for label, confidence in zip(labels, confidences):
+        if label != 'unknown' and confidence >= args.min_confidence:
+            absorbed[label] = absorbed.get(label, 0) + 1
+    total = sum(absorbed.values())
+    print(f"{len(messages)} messages the keywords miss, scored in {elapsed * 1000:.1f} ms "
+          f"({elapsed / max(len(messages), 1) * 1e6:.1f} µs/message)")
+    print(f"Absorbed at confidence >= {args.min_confidence}: {total} ({total / max(len(messages), 1):.1%} of LLM fallbacks)")
+    for label, count in sorted(absorbed.items(), key=lambda item: -item[1]):
+        print(f"  {label:<12} {count}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train or replay the local intent classifier")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    train = subparsers.add_parser('train', help='Train a model and save it')
+    train.add_argument('labeled', nargs='?', help='TSV of intent<TAB>message')
+    train.add_argument('--messages', help='Logged messages (text file or AI_CACHE_PATH database)')
+    train.add_argument('--epochs', type=int, default=500)
+    train.add_argument('--holdout', type=float, default=0.2, help='Fraction of labeled messages held out for evaluation')
+    train.add_argument('--min-confidence', type=float, default=Config.INTENT_MIN_CONFIDENCE)
+    train.add_argument('--out', default=Config.INTENT_MODEL_PATH)
+    train.set_defaults(func=_train)
+
+    replay = subparsers.add_parser('replay', help='Batch-score logged messages the keyword matcher misses')
+    replay.add_argument('messages', help='Logged messages (text file or AI_CACHE_PATH database)')
+    replay.add_argument('--model', default=Config.INTENT_MODEL_PATH)
+    replay.add_argument('--min-confidence', type=float, default=Config.INTENT_MIN_CONFIDENCE)
+    replay.set_defaults(func=_replay)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -0,0 +1,51 @@
+from config import Config
+
+def estimate_tokens(text):
+    """Cheap local token estimate (~4 characters per token, as for Portuguese on Llama/GPT tokenizers)"""
+    return len(text) // 4 + 1
+
+def summarize_turn(role, text):
+    """One summary line for a turn that leaves the prompt"""
+    line = " ".join(text.split())
+    if role == 'user':
+        return f"Cliente: {line[:160]}"
+    # Bot replies are long and mostly fixed texts; their opening says what was answered
+    return f"Atendente: {line[:80]}"
+
+def append_summary(summary, line, max_chars=None):
+    """Fold line into summary, dropping the oldest lines beyond max_chars"""
+    max_chars = max_chars or Config.SESSION_SUMMARY_CHARS
+    summary = f"{summary}\n{line}" if summary else line
+    while len(summary) > max_chars and "\n" in summary:
+        summary = summary.split("\n", 1)[1]
+    return summary[-max_chars:]
+
+def build_messages(system_prompt, state, budget=None):
+    """Chat messages for the LLM: system prompt, summary, then the newest turns that fit.
+
+    The current user message is the last turn of state.history and is always
+    included. Older turns are added newest first until budget (estimated
+    tokens, AI_CONTEXT_TOKENS by default) is spent; whatever does not fit is
+    folded into the summary along with the turns already evicted from the ring.
+    """
+    budget = budget or Config.AI_CONTEXT_TOKENS
+    turns = list(state.history)
+
+    recent = []
+    used = 0
+    for _, role, text in reversed(turns):
+        cost = estimate_tokens(text) + 4  # per-message overhead
+        if recent and used + cost > budget:
+            break
+        recent.append({"role": role, "content": text})
+        used += cost
+    recent.reverse()
+
+    summary = state.summary
+    for _, role, text in turns[:len(turns) - len(recent)]:
+        summary = append_summary(summary, summarize_turn(role, text))
+
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"Resumo da conversa até aqui:\n{summary}"})
+    return messages + recent
@@ -0,0 +1,140 @@
+import re
+import unicodedata
+
+def _accent_table():
+    """Latin letters with diacritics mapped to their base letters, combining marks dropped"""
+    table = {}
+    for codepoint in range(0x80, 0x250):
+        char = chr(codepoint)
+        base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        if base != char:
+            table[char] = base
+    for codepoint in range(0x300, 0x370):
+        table[chr(codepoint)] = ''
+    return table
+
+_ACCENTS = _accent_table()
+_ACCENTED = re.compile('[' + ''.join(_ACCENTS) + ']')
+
+def fold(text):
+    """Lowercase, strip accents and collapse whitespace ("Preço  ok" -> "preco ok")"""
+    text = text.lower()
+    if not text.isascii():
+        text = _ACCENTED.sub(lambda match: _ACCENTS[match.group()], text)
+    return ' '.join(text.split())
+
+def _trie_pattern(words):
+    """Regex matching any of words, shaped as a trie so each position costs O(longest word)"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        end = node.get('', False)
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # Greedy optional: a longer keyword is preferred over its prefix
+        return f'(?:{body})?' if end else body
+
+    return build(trie)
+
+def _compile(by_keyword):
+    """(hits per longest keyword, search pattern) for a {keyword: priorities} dict"""
+    # The regex reports the longest keyword starting at each position; every
+    # shorter keyword found there is one of its prefixes, so fold those in up front
+    hits = {
+        keyword: frozenset().union(*(found for other, found in by_keyword.items() if keyword.startswith(other)))
+        for keyword in by_keyword
+    }
+    return hits, (re.compile(_trie_pattern(by_keyword)) if by_keyword else None)
+
+def _scan(pattern, hits, text, found):
+    # Restart one character after each hit so overlapping keywords are seen too
+    search = pattern.search
+    match = search(text)
+    while match:
+        found.update(hits[match.group()])
+        match = search(text, match.start() + 1)
+
+class IntentMatcher:
+    """Keyword intents compiled into a single pass over the folded message.
+
+    table is a list of (intent, keywords) in priority order. Keywords match
+    anywhere in the message (as the original `word in message_lower` checks
+    did), except for intents in whole_words, whose keywords must be whole
+    whitespace-separated tokens (as `greeting in message_lower.split()`).
+    Message and keywords are accent-folded, so "preco" finds "preço",
+    except for intents in unfolded, whose keywords are substrings of the
+    lowercased message as written (so "oi" is not found in "dói").
+    """
+
+    def __init__(self, table, whole_words=(), unfolded=()):
+        self.intents = [intent for intent, _ in table]
+        self._tokens = {}
+        by_keyword = {}
+        by_raw_keyword = {}
+        for priority, (intent, keywords) in enumerate(table):
+            for keyword in keywords:
+                if intent in whole_words:
+                    self._tokens.setdefault(fold(keyword), set()).add(priority)
+                elif intent in unfolded:
+                    by_raw_keyword.setdefault(keyword.lower(), set()).add(priority)
+                else:
+                    by_keyword.setdefault(fold(keyword), set()).add(priority)
+
+        self._hits, self._pattern = _compile(by_keyword)
+        self._raw_hits, self._raw_pattern = _compile(by_raw_keyword)
+
+    def _priorities(self, message):
+        folded = fold(message)
+        found = set()
+        if self._tokens:
+            for token in folded.split():
+                found.update(self._tokens.get(token, ()))
+        if self._pattern:
+            _scan(self._pattern, self._hits, folded, found)
+        if self._raw_pattern:
+            _scan(self._raw_pattern, self._raw_hits, message.lower(), found)
+        return found
+
+    def match(self, message, default='unknown'):
+        """Highest-priority intent in message"""
+        found = self._priorities(message)
+        return self.intents[min(found)] if found else default
+
+    def match_all(self, message):
+        """Every intent with a keyword in message"""
+        return {self.intents[priority] for priority in self._priorities(message)}
+
+# Keyword tables, in the priority order the bots check them
+GREETINGS = ('greeting', ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hello', 'hi', 'hey'])
+CORE_INTENTS = [
+    GREETINGS,
+    ('hours', ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento', 'aberto']),
+    ('price', ['quanto custa', 'preço', 'valor', 'precos', 'quanto é']),
+    ('services', ['serviço', 'servico', 'procedimento', 'oferece', 'fazem', 'disponível']),
+    ('contact', ['contato', 'telefone', 'whatsapp', 'ligar', 'zap']),
+    ('location', ['onde', 'endereço', 'endereco', 'localização', 'localizacao', 'fica']),
+    ('booking', ['agendar', 'agendamento', 'marcar', 'horário disponível']),
+]
+V1_INTENTS = CORE_INTENTS + [
+    ('help', ['ajuda', 'ajudar', 'help', 'dúvida', 'duvida']),
+    ('date', ['que dia', 'hoje', 'data']),
+]
+# chatbot_v0 matches greetings as substrings of the message as written and checks each intent separately
+V0_INTENTS = [
+    ('greeting', ['oi', 'olá', 'bom dia', 'boa tarde', 'boa noite', 'ola']),
+    ('hours', ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento']),
+    ('price', ['quanto custa', 'preço', 'valor', 'precos']),
+    ('contact', ['contato', 'telefone', 'whatsapp', 'ligar']),
+    ('location', ['onde', 'endereço', 'endereco', 'localização']),
+]
+
+intent_matcher = IntentMatcher(CORE_INTENTS, whole_words={'greeting'})
+intent_matcher_v1 = IntentMatcher(V1_INTENTS, whole_words={'greeting'})
+intent_matcher_v0 = IntentMatcher(V0_INTENTS, unfolded={'greeting'})
@@ -0,0 +1,258 @@
+import asyncio
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED, TimeoutError as FutureTimeout
+import openai
+from config import Config
+from services.metrics import LatencyRecorder
+
+# Not worth starting a completion with less time than this left
+MIN_CALL_SECONDS = 0.25
+
+_lock = threading.Lock()
+_client = None
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncOpenAI
+_failed = False
+_pool = None
+
+latency = LatencyRecorder()
+_stats = {"calls": 0, "completed": 0, "deadline_exceeded": 0, "no_budget": 0, "errors": 0,
+          "hedged": 0, "hedge_wins": 0}
+
+class DeadlineExceeded(Exception):
+    """The reply's latency budget ran out before the LLM answered"""
+
+def is_configured():
+    """True if an API key for the LLM provider has been set"""
+    return bool(Config.AI_API_KEY) and Config.AI_API_KEY != 'your-api-key-here'
+
+def get_client():
+    """The worker's shared OpenAI-compatible client, or None if it can't be built.
+
+    The client is thread-safe and keeps one connection pool, so every
+    conversation uses the same instance instead of building its own.
+    """
+    global _client, _failed
+    if _client is not None or _failed:
+        return _client
+
+    with _lock:
+        if _client is None and not _failed:
+            try:
+                _client = openai.OpenAI(
+                    api_key=Config.AI_API_KEY,
+                    base_url=Config.AI_BASE_URL,
+                )
+            except Exception as e:
+                print(f"Warning: Could not initialize AI client: {e}")
+                print("Bot will work with fallback responses only.")
+                _failed = True
+    return _client
+
+def get_async_client():
+    """The worker's shared AsyncOpenAI client for the running event loop, or None if it can't be built.
+
+    Like the WhatsApp async client, each loop gets its own instance (its
+    connections belong to that loop), dropped when the loop is.
+    """
+    global _failed
+    loop = asyncio.get_running_loop()
+    if _failed:
+        return None
+    client = _async_clients.get(loop)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _async_clients.get(loop)
+        if client is None and not _failed:
+            try:
+                client = _async_clients[loop] = openai.AsyncOpenAI(
+                    api_key=Config.AI_API_KEY,
+                    base_url=Config.AI_BASE_URL,
+                )
+            except Exception as e:
+                print(f"Warning: Could not initialize AI client: {e}")
+                print("Bot will work with fallback responses only.")
+                _failed = True
+    return client
+
+def reply_deadline():
+    """Deadline (time.monotonic()) for a reply starting now"""
+    return time.monotonic() + Config.AI_REPLY_BUDGET_MS / 1000
+
+def _count(name):
+    with _lock:
+        _stats[name] += 1
+
+def _hedge_delay():
+    """Seconds to wait before hedging: the AI_HEDGE_PERCENTILE latency, once there are enough samples"""
+    if not Config.AI_HEDGE_PERCENTILE or latency.count < 20:
+        return None
+    return latency.percentile(Config.AI_HEDGE_PERCENTILE) / 1000
+
+def _request(client, messages, timeout, params):
+    # No retries: a retry would not fit in the budget anyway
+    response = client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+        model=Config.AI_MODEL,
+        messages=messages,
+        **params
+    )
+    return response.choices[0].message.content
+
+def _executor():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix='llm-call')
+        return _pool
+
+def _bounded(client, messages, deadline, params):
+    """One request that gives up at deadline however the response trickles in.
+
+    The httpx timeout applies per phase (connect, each read), so the request
+    runs on the pool and the caller stops waiting at the deadline; the
+    abandoned request ends on its own timeout.
+    """
+    future = _executor().submit(_request, client, messages, deadline - time.monotonic(), params)
+    try:
+        return future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeout:
+        raise DeadlineExceeded()
+
+def _hedged(client, messages, deadline, delay, params):
+    """Send a second identical request if the first is slower than delay; first answer wins"""
+    pool = _executor()
+    first = pool.submit(_request, client, messages, deadline - time.monotonic(), params)
+    done, _ = wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    pending = {first}
+    remaining = deadline - time.monotonic()
+    if remaining >= MIN_CALL_SECONDS:
+        hedge = pool.submit(_request, client, messages, remaining, params)
+        pending.add(hedge)
+        _count("hedged")
+
+    error = None
+    while pending:
+        done, pending = wait(pending, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            raise DeadlineExceeded()
+        for future in done:
+            if future.exception() is None:
+                if future is not first:
+                    _count("hedge_wins")
+                return future.result()
+            error = future.exception()
+    raise error
+
+def complete(messages, deadline=None, **params):
+    """Chat completion that is abandoned when deadline (time.monotonic()) passes.
+
+    The caller waits at most until the deadline, then gets DeadlineExceeded.
+    With AI_HEDGE_PERCENTILE set, a second request goes out if the first is
+    slower than that percentile of recent completions.
+    """
+    client = get_client()
+    deadline = deadline or reply_deadline()
+    remaining = deadline - time.monotonic()
+    if remaining < MIN_CALL_SECONDS:
+        _count("no_budget")
+        raise DeadlineExceeded()
+
+    _count("calls")
+    started = time.perf_counter()
+    try:
+        delay = _hedge_delay()
+        if delay is not None and delay < remaining:
+            content = _hedged(client, messages, deadline, delay, params)
+        else:
+            content = _bounded(client, messages, deadline, params)
+    except (DeadlineExceeded, openai.APITimeoutError):
+        _count("deadline_exceeded")
+        raise DeadlineExceeded()
+    except Exception:
+        _count("errors")
+        raise
+
+    latency.record((time.perf_counter() - started) * 1000)
+    _count("completed")
+    return content
+
+async def _request_async(client, messages, timeout, params):
+    response = await client.with_options(timeout=timeout, max_retries=0).chat.completions.create(
+        model=Config.AI_MODEL,
+        messages=messages,
+        **params
+    )
+    return response.choices[0].message.content
+
+async def _hedged_async(client, messages, deadline, delay, params):
+    """_hedged() on the event loop; the losing request is cancelled"""
+    first = asyncio.ensure_future(_request_async(client, messages, deadline - time.monotonic(), params))
+    done, _ = await asyncio.wait([first], timeout=delay)
+    if done:
+        return first.result()
+
+    pending = {first}
+    remaining = deadline - time.monotonic()
+    if remaining >= MIN_CALL_SECONDS:
+        pending.add(asyncio.ensure_future(_request_async(client, messages, remaining, params)))
+        _count("hedged")
+
+    error = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=max(0, deadline - time.monotonic()),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                raise DeadlineExceeded()
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        _count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+        raise error
+    finally:
+        for future in pending:
+            future.cancel()
+
+async def complete_async(messages, deadline=None, **params):
+    """complete() on the async client: awaiting the LLM does not hold a thread"""
+    client = get_async_client()
+    deadline = deadline or reply_deadline()
+    remaining = deadline - time.monotonic()
+    if remaining < MIN_CALL_SECONDS:
+        _count("no_budget")
+        raise DeadlineExceeded()
+
+    _count("calls")
+    started = time.perf_counter()
+    try:
+        delay = _hedge_delay()
+        if delay is not None and delay < remaining:
+            content = await asyncio.wait_for(_hedged_async(client, messages, deadline, delay, params), remaining)
+        else:
+            content = await asyncio.wait_for(_request_async(client, messages, remaining, params), remaining)
+    except (DeadlineExceeded, asyncio.TimeoutError, openai.APITimeoutError):
+        _count("deadline_exceeded")
+        raise DeadlineExceeded()
+    except Exception:
+        _count("errors")
+        raise
+
+    latency.record((time.perf_counter() - started) * 1000)
+    _count("completed")
+    return content
+
+def stats():
+    with _lock:
+        stats = dict(_stats)
+    stats["deadline_rate"] = round(stats["deadline_exceeded"] / stats["calls"], 3) if stats["calls"] else None
+    stats["budget_ms"] = Config.AI_REPLY_BUDGET_MS
+    stats["latency_ms"] = latency.summary()
+    return stats
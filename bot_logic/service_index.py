@@ -0,0 +1,153 @@
+import math
+import re
+import threading
+from collections import OrderedDict
+from config import Config
+from .intents import fold
+
+# Words that say nothing about which service is meant
+STOP_WORDS = frozenset("""
+a o as os de da do das dos e em no na nos nas um uma uns umas com sem para pra pro por
+que qual quais quanto quanta custa valor preco fazer faz fazem voce voces tem ter eu me
+meu minha seu sua quero queria gostaria saber sobre ai la isso esse essa
+""".split())  # accent-folded
+
+_WORD = re.compile(r'\w+')
+_lock = threading.Lock()
+_indexes = OrderedDict()  # business_id -> ServiceIndex for the current catalog version, LRU
+
+def _stem(token):
+    # Plural folding is enough for service names ("sobrancelhas" / "sobrancelha")
+    return token[:-1] if len(token) > 3 and token.endswith('s') else token
+
+def tokenize(text):
+    """Accent-folded, stemmed content words of text"""
+    return [_stem(token) for token in _WORD.findall(fold(text)) if token not in STOP_WORDS and len(token) > 1]
+
+def _trigrams(token):
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _max_edits(token):
+    """Typos tolerated for a word of this length"""
+    if len(token) < 4:
+        return 0
+    return 1 if len(token) < 8 else 2
+
+def _within_distance(a, b, limit):
+    """True if a and b are at most limit edits apart (adjacent swaps count as one)"""
+    if abs(len(a) - len(b)) > limit:
+        return False
+    before, previous = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i]
+        for j in range(1, len(b) + 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] != b[j - 1]))
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return False
+        before, previous = previous, current
+    return previous[-1] <= limit
+
+class ServiceIndex:
+    """Inverted index over service-name tokens of one catalog version.
+
+    Each service is scored by the IDF weight of its name tokens found in the
+    message, so a word shared by many services counts for less than a
+    distinctive one; ties go to the service whose name is best covered
+    ("henna" is Henna, not "Design com Henna"). Message words not in the vocabulary are matched to
+    vocabulary words sharing trigrams and within a small edit distance.
+    """
+
+    def __init__(self, services):
+        self.services = list(services)
+        self._postings = {}
+        for position, service in enumerate(self.services):
+            for token in set(tokenize(service.name)):
+                self._postings.setdefault(token, []).append(position)
+
+        count = len(self.services)
+        self._idf = {token: math.log(1 + count / len(postings)) for token, postings in self._postings.items()}
+        self._name_weight = [sum(self._idf[token] for token in set(tokenize(service.name))) for service in self.services]
+        self._trigram_index = {}
+        for token in self._postings:
+            for trigram in _trigrams(token):
+                self._trigram_index.setdefault(trigram, set()).add(token)
+        self._fuzzy_cache = {}
+
+    def _fuzzy(self, token):
+        """Vocabulary word within the typo budget of token, or None"""
+        if token in self._fuzzy_cache:
+            return self._fuzzy_cache[token]
+        if len(self._fuzzy_cache) > 10000:
+            self._fuzzy_cache.clear()
+
+        best = None
+        limit = _max_edits(token)
+        if limit:
+            shared = {}
+            for trigram in _trigrams(token):
+                for candidate in self._trigram_index.get(trigram, ()):
+                    shared[candidate] = shared.get(candidate, 0) + 1
+            # Most shared trigrams first; a typo leaves at least a third of them intact
+            for candidate, count in sorted(shared.items(), key=lambda item: -item[1]):
+                if count * 3 < len(token):
+                    break
+                if _within_distance(token, candidate, limit):
+                    best = candidate
+                    break
+        self._fuzzy_cache[token] = best
+        return best
+
+    def _scores(self, message):
+        scores = {}
+        for token in set(tokenize(message)):
+            if token in self._postings:
+                weight = self._idf[token]
+            else:
+                token = self._fuzzy(token)
+                if token is None:
+                    continue
+                weight = self._idf[token] * 0.8
+            for position in self._postings[token]:
+                scores[position] = scores.get(position, 0) + weight
+        return scores
+
+    def _order(self, scores):
+        # Score, then name coverage; remaining ties go to the first service, as the old linear scan did
+        return lambda position: (-scores[position], -scores[position] / self._name_weight[position], position)
+
+    def find(self, message):
+        """Best service mentioned in message, or None"""
+        scores = self._scores(message)
+        if not scores:
+            return None
+        return self.services[min(scores, key=self._order(scores))]
+
+    def rank(self, message, limit):
+        """Up to limit services mentioned in message, best first"""
+        scores = self._scores(message)
+        return [self.services[position] for position in sorted(scores, key=self._order(scores))[:limit]]
+
+def get_index(business_id, info):
+    """ServiceIndex for the business, rebuilt when its catalog version changes"""
+    version = info.get('version')
+    with _lock:
+        entry = _indexes.get(business_id)
+        if entry and entry[0] == version:
+            _indexes.move_to_end(business_id)
+            return entry[1]
+
+    index = ServiceIndex(info['services'])
+    with _lock:
+        _indexes[business_id] = (version, index)
+        _indexes.move_to_end(business_id)
+        while len(_indexes) > Config.BUSINESS_CACHE_MAX:
+            _indexes.popitem(last=False)
+    return index
+
+def find_service(business_id, info, message):
+    """Service mentioned in message, looked up in the business's cached index"""
+    return get_index(business_id, info).find(message)
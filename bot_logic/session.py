@@ -0,0 +1,48 @@
+import sys
+import time
+from collections import deque
+from config import Config
+from .context import append_summary, summarize_turn
+
+class SessionState:
+    """What the bot remembers about one conversation.
+
+    Slots instead of a dict, and the history is a ring of the last
+    SESSION_HISTORY_SIZE (timestamp, role, text) turns; turns pushed out of
+    the ring are folded into a summary capped at SESSION_SUMMARY_CHARS, so a
+    session's size stays fixed however long the conversation runs.
+    used_llm tells whether the engine's last reply called the LLM.
+    """
+
+    __slots__ = ('greeted', 'greeting_count', 'services_discussed', 'last_intent', 'history', 'summary', 'used_llm')
+
+    def __init__(self, history_size=None):
+        self.greeted = False
+        self.greeting_count = 0
+        self.services_discussed = []
+        self.last_intent = None
+        self.history = deque(maxlen=history_size or Config.SESSION_HISTORY_SIZE)
+        self.summary = ""
+        self.used_llm = False
+
+    def _add(self, role, text):
+        if len(self.history) == self.history.maxlen:
+            _, old_role, old_text = self.history[0]
+            self.summary = append_summary(self.summary, summarize_turn(old_role, old_text))
+        self.history.append((time.time(), role, text))
+
+    def remember(self, text):
+        """Add a user message to the history ring"""
+        self._add('user', text)
+
+    def remember_reply(self, text):
+        """Add a bot reply to the history ring"""
+        self._add('assistant', text)
+
+    def footprint(self):
+        """Approximate size in bytes, history and summary included"""
+        size = (sys.getsizeof(self) + sys.getsizeof(self.history) + sys.getsizeof(self.services_discussed)
+                + sys.getsizeof(self.summary))
+        for entry in self.history:
+            size += sys.getsizeof(entry) + sum(sys.getsizeof(field) for field in entry)
+        return size
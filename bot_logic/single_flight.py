@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from .llm import DeadlineExceeded
+
+class SingleFlight:
+    """Collapse concurrent identical LLM calls into one upstream request.
+
+    The first caller for a key makes the call; callers arriving while it is
+    in flight, sync or async, wait for its result instead of sending their
+    own. Keys are answer cache keys (business version, day and normalized
+    question); callers only share requests made of the system prompt and
+    the question, never one that carries a customer's conversation.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> Future of the call in flight
+        self._stats = {"calls": 0, "absorbed": 0, "failed": 0}
+
+    def _join(self, key):
+        """(future, True if this caller makes the call)"""
+        with self._lock:
+            future = self._calls.get(key)
+            if future is None:
+                future = self._calls[key] = Future()
+                self._stats["calls"] += 1
+                return future, True
+            self._stats["absorbed"] += 1
+            return future, False
+
+    def _finish(self, key, future, result=None, error=None):
+        with self._lock:
+            del self._calls[key]
+            if error is not None:
+                self._stats["failed"] += 1
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def run(self, key, call, deadline=None):
+        """call() once per key at a time; others wait for it until deadline (time.monotonic())"""
+        future, leader = self._join(key)
+        if not leader:
+            try:
+                return future.result(None if deadline is None else max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                raise DeadlineExceeded()
+
+        try:
+            result = call()
+        except BaseException as e:
+            self._finish(key, future, error=e if isinstance(e, Exception) else DeadlineExceeded())
+            raise
+        self._finish(key, future, result)
+        return result
+
+    async def run_async(self, key, call, deadline=None):
+        """run() for coroutines: call() returns an awaitable"""
+        future, leader = self._join(key)
+        if not leader:
+            # shield: a follower giving up must not cancel the shared call
+            waiter = asyncio.shield(asyncio.wrap_future(future))
+            try:
+                return await asyncio.wait_for(waiter, None if deadline is None else max(0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded()
+
+        try:
+            result = await call()
+        except BaseException as e:
+            self._finish(key, future, error=e if isinstance(e, Exception) else DeadlineExceeded())
+            raise
+        self._finish(key, future, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
+
+single_flight = SingleFlight()
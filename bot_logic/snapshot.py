@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from config import Config
+
+# Detached, immutable copies of the ORM rows the bot reads
+ServiceInfo = namedtuple('ServiceInfo', 'id name price duration_minutes description')
+HoursInfo = namedtuple('HoursInfo', 'day_of_week open_time close_time is_closed')
+BusinessSnapshot = namedtuple('BusinessSnapshot', 'business_id version info')
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # business_id -> [snapshot or None, last version check (monotonic)], LRU up to BUSINESS_CACHE_MAX
+_stats = {"hits": 0, "version_checks": 0, "reloads": 0, "evicted": 0}
+
+def _load(business_id):
+    """Read the business, its active services and its hours (three queries)"""
+    from models import BusinessConfig, Service, OperatingHours
+
+    business = BusinessConfig.query.get(business_id)
+    if not business:
+        return None
+
+    services = Service.query.filter_by(business_id=business_id, active=True).order_by(Service.id).all()
+    hours = OperatingHours.query.filter_by(business_id=business_id).order_by(OperatingHours.day_of_week).all()
+
+    info = MappingProxyType({
+        "name": business.studio_name,
+        "address": business.address,
+        "phone": business.phone,
+        "whatsapp": business.whatsapp,
+        "website": business.website,
+        "services": tuple(ServiceInfo(s.id, s.name, s.price, s.duration_minutes, s.description) for s in services),
+        "hours": tuple(HoursInfo(h.day_of_week, h.open_time, h.close_time, h.is_closed) for h in hours),
+        "bot_tone": business.bot_tone,
+        "bot_intro": business.bot_intro_message,
+        "version": business.updated_at
+    })
+    return BusinessSnapshot(business_id, business.updated_at, info)
+
+def get_snapshot(business_id):
+    """Current snapshot of a business, or None if it does not exist.
+
+    Within BUSINESS_CACHE_CHECK_SECONDS the cached snapshot is returned
+    without touching the database; after that a single updated_at lookup
+    decides whether another worker changed it and a reload is needed.
+    A missing business is cached the same way (as None, version None), so
+    messages for it do not query the database each time.
+    """
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(business_id)
+        if entry:
+            _cache.move_to_end(business_id)
+        if entry and now - entry[1] < Config.BUSINESS_CACHE_CHECK_SECONDS:
+            _stats["hits"] += 1
+            return entry[0]
+
+    from models import db, BusinessConfig
+
+    if entry:
+        version = db.session.query(BusinessConfig.updated_at).filter_by(id=business_id).scalar()
+        with _lock:
+            _stats["version_checks"] += 1
+            if version == (entry[0].version if entry[0] else None):
+                entry[1] = now
+                return entry[0]
+
+    snapshot = _load(business_id)
+    with _lock:
+        _stats["reloads"] += 1
+        _cache[business_id] = [snapshot, now]
+        _cache.move_to_end(business_id)
+        while len(_cache) > Config.BUSINESS_CACHE_MAX:
+            _cache.popitem(last=False)
+            _stats["evicted"] += 1
+    return snapshot
+
+def invalidate(business_id=None):
+    """Drop cached snapshots (this worker) right after a local change"""
+    with _lock:
+        if business_id is None:
+            _cache.clear()
+        else:
+            _cache.pop(business_id, None)
+
+def cache_stats():
+    with _lock:
+        return {
+            "cached": len(_cache),
+            "max": Config.BUSINESS_CACHE_MAX,
+            "check_seconds": Config.BUSINESS_CACHE_CHECK_SECONDS,
+            **_stats
+        }
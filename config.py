@@ -17,4 +17,83 @@ class Config:
     WHATSAPP_TOKEN = os.environ.get('WHATSAPP_TOKEN')  # Your WhatsApp Business API Token
     WHATSAPP_PHONE_NUMBER_ID = os.environ.get('WHATSAPP_PHONE_NUMBER_ID')  # Phone number ID from Meta
     WHATSAPP_VERIFY_TOKEN = os.environ.get('WHATSAPP_VERIFY_TOKEN')  # For webhook verification
-    WHATSAPP_API_VERSION = os.environ.get('WHATSAPP_API_VERSION') or 'v18.0'
\ No newline at end of file
+    WHATSAPP_API_VERSION = os.environ.get('WHATSAPP_API_VERSION') or 'v18.0'
+    WHATSAPP_API_BASE = os.environ.get('WHATSAPP_API_BASE') or 'https://graph.facebook.com'  # Point at mock_server.py for load tests
+    
+    # Inbound webhook queue (durable, drained by background consumers)
+    INBOUND_QUEUE_PATH = os.environ.get('INBOUND_QUEUE_PATH') or 'instance/inbound_queue.db'
+    INBOUND_QUEUE_WORKERS = int(os.environ.get('INBOUND_QUEUE_WORKERS') or 4)
+    INBOUND_QUEUE_LEASE_SECONDS = int(os.environ.get('INBOUND_QUEUE_LEASE_SECONDS') or 180)
+    INBOUND_QUEUE_MAX_ATTEMPTS = int(os.environ.get('INBOUND_QUEUE_MAX_ATTEMPTS') or 3)
+    
+    # Burst coalescing: merge a sender's consecutive messages into one turn (0 disables)
+    WHATSAPP_BURST_WINDOW_MS = int(os.environ.get('WHATSAPP_BURST_WINDOW_MS') or 1500)
+    WHATSAPP_BURST_MAX_MESSAGES = int(os.environ.get('WHATSAPP_BURST_MAX_MESSAGES') or 8)
+    WHATSAPP_BURST_WORKERS = int(os.environ.get('WHATSAPP_BURST_WORKERS') or 8)  # threads answering closed bursts
+    
+    # Deduplication of redelivered webhook messages by message id
+    WHATSAPP_DEDUP_PATH = os.environ.get('WHATSAPP_DEDUP_PATH') or 'instance/seen_messages.db'
+    WHATSAPP_DEDUP_TTL_SECONDS = int(os.environ.get('WHATSAPP_DEDUP_TTL_SECONDS') or 86400)
+    WHATSAPP_DEDUP_MAX_ENTRIES = int(os.environ.get('WHATSAPP_DEDUP_MAX_ENTRIES') or 50000)
+    
+    # Delivery status callbacks are buffered and written in bulk
+    WHATSAPP_STATUS_BATCH_SIZE = int(os.environ.get('WHATSAPP_STATUS_BATCH_SIZE') or 200)
+    WHATSAPP_STATUS_FLUSH_MS = int(os.environ.get('WHATSAPP_STATUS_FLUSH_MS') or 1000)
+    
+    # Outbound Graph API connection pool, timeouts and retries
+    WHATSAPP_POOL_SIZE = int(os.environ.get('WHATSAPP_POOL_SIZE') or 20)
+    WHATSAPP_MAX_IN_FLIGHT = int(os.environ.get('WHATSAPP_MAX_IN_FLIGHT') or 200)
+    WHATSAPP_CONNECT_TIMEOUT = float(os.environ.get('WHATSAPP_CONNECT_TIMEOUT') or 3.05)
+    WHATSAPP_READ_TIMEOUT = float(os.environ.get('WHATSAPP_READ_TIMEOUT') or 10)
+    WHATSAPP_MAX_RETRIES = int(os.environ.get('WHATSAPP_MAX_RETRIES') or 3)
+    WHATSAPP_BACKOFF_BASE = float(os.environ.get('WHATSAPP_BACKOFF_BASE') or 0.5)
+    WHATSAPP_BACKOFF_MAX = float(os.environ.get('WHATSAPP_BACKOFF_MAX') or 8)
+    
+    # Outbound rate limits per phone_number_id (messages/second)
+    WHATSAPP_RATE_PER_SECOND = float(os.environ.get('WHATSAPP_RATE_PER_SECOND') or 20)
+    WHATSAPP_RATE_BURST = float(os.environ.get('WHATSAPP_RATE_BURST') or 20)
+    WHATSAPP_RATE_MIN = float(os.environ.get('WHATSAPP_RATE_MIN') or 1)
+    WHATSAPP_RATE_LIMITS = os.environ.get('WHATSAPP_RATE_LIMITS') or ''  # "phone_number_id:rate,..."
+    
+    # Template broadcasts: recipients sent (concurrently) per committed batch
+    BROADCAST_BATCH_SIZE = int(os.environ.get('BROADCAST_BATCH_SIZE') or 50)
+    BROADCAST_LEASE_SECONDS = int(os.environ.get('BROADCAST_LEASE_SECONDS') or 300)  # a running job with no batch for this long is stale
+    
+    # Business snapshot cache: seconds between cross-worker version checks
+    BUSINESS_CACHE_CHECK_SECONDS = float(os.environ.get('BUSINESS_CACHE_CHECK_SECONDS') or 2)
+    BUSINESS_CACHE_MAX = int(os.environ.get('BUSINESS_CACHE_MAX') or 500)  # businesses cached per worker (LRU)
+    
+    # Bot engine: 'rules' (keywords only), 'llm' (classifier and LLM fallback) or 'legacy'
+    BOT_ENGINE = os.environ.get('BOT_ENGINE') or 'rules'
+    BOT_ENGINES = os.environ.get('BOT_ENGINES') or ''  # per studio: "business_id:engine,..."
+    
+    # Multi-tenant routing: inbound phone_number_id -> business, re-read from the database at this interval
+    DEFAULT_BUSINESS_ID = int(os.environ.get('DEFAULT_BUSINESS_ID') or 1)  # Answers WHATSAPP_PHONE_NUMBER_ID
+    TENANT_REFRESH_SECONDS = float(os.environ.get('TENANT_REFRESH_SECONDS') or 30)
+    
+    # Conversation sessions: LRU cap, idle expiry and messages kept per session
+    SESSION_MAX = int(os.environ.get('SESSION_MAX') or 10000)
+    SESSION_MAX_PER_TENANT = int(os.environ.get('SESSION_MAX_PER_TENANT') or 2500)  # share of SESSION_MAX one studio can hold
+    SESSION_TTL_SECONDS = int(os.environ.get('SESSION_TTL_SECONDS') or 3600)
+    SESSION_HISTORY_SIZE = int(os.environ.get('SESSION_HISTORY_SIZE') or 12)  # turns, user and bot
+    SESSION_SUMMARY_CHARS = int(os.environ.get('SESSION_SUMMARY_CHARS') or 600)
+    
+    # LLM fallback: latency budget per reply, optional hedging at this latency percentile (0 disables)
+    AI_REPLY_BUDGET_MS = int(os.environ.get('AI_REPLY_BUDGET_MS') or 8000)
+    AI_HEDGE_PERCENTILE = float(os.environ.get('AI_HEDGE_PERCENTILE') or 0)
+    
+    # LLM system prompt: size cap (estimated tokens) and catalog size listed in full
+    AI_PROMPT_MAX_TOKENS = int(os.environ.get('AI_PROMPT_MAX_TOKENS') or 1200)
+    AI_PROMPT_MAX_SERVICES = int(os.environ.get('AI_PROMPT_MAX_SERVICES') or 30)
+    
+    # LLM fallback: estimated tokens of conversation turns sent with each question
+    AI_CONTEXT_TOKENS = int(os.environ.get('AI_CONTEXT_TOKENS') or 800)
+    
+    # LLM answer cache per business version and normalized question (set a path to persist it)
+    AI_CACHE_MAX_ENTRIES = int(os.environ.get('AI_CACHE_MAX_ENTRIES') or 2000)
+    AI_CACHE_TTL_SECONDS = int(os.environ.get('AI_CACHE_TTL_SECONDS') or 21600)
+    AI_CACHE_PATH = os.environ.get('AI_CACHE_PATH') or ''
+    
+    # Local intent classifier between the keyword matcher and the LLM (no model file disables it)
+    INTENT_MODEL_PATH = os.environ.get('INTENT_MODEL_PATH') or 'instance/intent_model.npz'
+    INTENT_MIN_CONFIDENCE = float(os.environ.get('INTENT_MIN_CONFIDENCE') or 0.8)
@@ -0,0 +1,6 @@
+# Read by gunicorn from the working directory (Procfile / railway.toml start commands)
+
+def post_worker_init(worker):
+    """Start the inbound queue consumers in each worker once the app is loaded"""
+    from app import start_workers
+    start_workers(worker.wsgi)
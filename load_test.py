@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+End-to-end load generator for the /webhook path.
+
+Posts realistic WhatsApp webhook payloads at a target rate and, using the
+replies recorded by mock_server.py, reports throughput, p50/p95/p99 reply
+latency and error counts.
+
+    python mock_server.py --port 9000 &
+    WHATSAPP_API_BASE=http://localhost:9000 AI_BASE_URL=http://localhost:9000/v1 AI_API_KEY=mock \\
+        WHATSAPP_BURST_WINDOW_MS=0 python app.py &
+    python load_test.py --url http://localhost:5000/webhook/ --mock http://localhost:9000 --rate 50 --duration 30
+"""
+
+import argparse
+import random
+import sys
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.metrics import LatencyRecorder
+
+# What customers actually send: keyword intents, service questions and LLM fallbacks
+MESSAGES = [
+    "oi", "olá, bom dia", "quanto custa a henna?", "qual o valor do design de sobrancelhas",
+    "vocês abrem sábado?", "qual o horário de funcionamento", "onde fica o studio?",
+    "quero agendar", "tem horário disponível amanhã?", "quais serviços vocês fazem",
+    "vocês fazem lash lifting?", "dói fazer micropigmentação?", "aceitam cartão?",
+    "quanto tempo dura a henna", "preciso levar alguma coisa?", "telefone pra contato",
+]
+
+def webhook_payload(from_number, text, phone_number_id):
+    """A WhatsApp Cloud API inbound text message webhook"""
+    return {
+        "object": "whatsapp_business_account",
+        "entry": [{
+            "id": "loadtest",
+            "changes": [{
+                "field": "messages",
+                "value": {
+                    "messaging_product": "whatsapp",
+                    "metadata": {"display_phone_number": "5511999999999", "phone_number_id": phone_number_id},
+                    "contacts": [{"profile": {"name": "Cliente Teste"}, "wa_id": from_number}],
+                    "messages": [{
+                        "from": from_number,
+                        "id": f"wamid.load.{uuid.uuid4().hex}",
+                        "timestamp": str(int(time.time())),
+                        "type": "text",
+                        "text": {"body": text}
+                    }]
+                }
+            }]
+        }]
+    }
+
+def run(args):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+
+    if args.mock:
+        session.post(f"{args.mock}/_mock/reset")
+
+    ack_latency = LatencyRecorder(size=1000000)
+    sent_at = {}
+    errors = {'http': 0, 'exceptions': 0}
+    lock = threading.Lock()
+    run_id = random.randint(100, 999)
+
+    def post_one(i):
+        # One sender per message, so every post expects exactly one reply
+        from_number = f"55{run_id}{i:07d}"
+        payload = webhook_payload(from_number, random.choice(MESSAGES), args.phone_number_id)
+        started = time.time()
+        try:
+            response = session.post(args.url, json=payload, timeout=30)
+            ack_latency.record((time.time() - started) * 1000)
+            with lock:
+                sent_at[from_number] = started
+                if response.status_code != 200:
+                    errors['http'] += 1
+        except requests.RequestException:
+            with lock:
+                errors['exceptions'] += 1
+
+    total = int(args.rate * args.duration)
+    print(f"Posting {total} messages at {args.rate}/s to {args.url}")
+    begin = time.time()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(total):
+            # Open loop: keep the schedule even if the server falls behind
+            delay = begin + i / args.rate - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(post_one, i)
+    posted_in = time.time() - begin
+
+    reply_latency = LatencyRecorder(size=1000000)
+    replied = {}
+    if args.mock:
+        print(f"Waiting up to {args.drain}s for replies...")
+        deadline = time.time() + args.drain
+        while time.time() < deadline:
+            for reply in session.get(f"{args.mock}/_mock/replies", params={'since': begin}).json():
+                if reply['to'] in sent_at and reply['to'] not in replied:
+                    replied[reply['to']] = reply['at']
+            if len(replied) >= len(sent_at):
+                break
+            time.sleep(0.5)
+        for number, at in replied.items():
+            reply_latency.record((at - sent_at[number]) * 1000)
+        mock_stats = session.get(f"{args.mock}/_mock/stats").json()
+    try:
+        # Outbound connection reuse as the bot (this worker) saw it
+        outbound = session.get(args.url.rstrip('/') + '/stats', timeout=5).json().get('outbound')
+    except Exception:
+        outbound = None
+    last_reply = max(replied.values(), default=begin)
+
+    print("\n=== Load test results ===")
+    print(f"Posted:          {len(sent_at)} in {posted_in:.1f}s ({len(sent_at) / posted_in:.1f}/s)")
+    print(f"Webhook ack ms:  {ack_latency.summary()}")
+    print(f"Errors:          {errors['http']} non-200 acks, {errors['exceptions']} request failures")
+    if args.mock:
+        print(f"Replies:         {len(replied)} ({len(sent_at) - len(replied)} missing)")
+        if replied:
+            print(f"Throughput:      {len(replied) / max(last_reply - begin, 1e-6):.1f} replies/s")
+        print(f"Reply ms:        {reply_latency.summary()}")
+        print(f"Mock upstream:   {mock_stats['completions']} LLM calls, {mock_stats['messages']} Graph calls, "
+              f"{mock_stats['errors']} injected errors, {mock_stats['rate_limited']} injected 429s")
+    if outbound:
+        print(f"Graph pool:      {outbound['requests']} requests over {outbound['connections_opened']} connections "
+              f"(reuse rate {outbound['reuse_rate']})")
+        if outbound['requests'] and not outbound['reuse_rate']:
+            print("                 no connection was reused: is the mock closing connections (dev server)?")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Load test the WhatsApp webhook")
+    parser.add_argument('--url', default='http://localhost:5000/webhook/', help='Webhook URL of the bot')
+    parser.add_argument('--mock', default='http://localhost:9000', help='mock_server.py base URL ("" to skip reply tracking)')
+    parser.add_argument('--rate', type=float, default=20, help='Messages per second')
+    parser.add_argument('--duration', type=float, default=10, help='Seconds to keep posting')
+    parser.add_argument('--concurrency', type=int, default=50, help='Maximum concurrent webhook posts')
+    parser.add_argument('--drain', type=float, default=30, help='Seconds to wait for outstanding replies')
+    parser.add_argument('--phone-number-id', default='123456789', help='metadata.phone_number_id to send')
+    run(parser.parse_args())
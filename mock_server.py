@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Local stand-in for the WhatsApp Graph API and the OpenAI-compatible LLM endpoint.
+
+Run it, then point the bot at it:
+
+    python mock_server.py --port 9000 --graph-latency 80 --llm-latency 900 --rate-limit 0.02
+    WHATSAPP_API_BASE=http://localhost:9000 AI_BASE_URL=http://localhost:9000/v1 AI_API_KEY=mock \\
+        gunicorn app:application --bind 0.0.0.0:8080
+
+Outbound text messages are recorded so load_test.py can measure reply latency.
+"""
+
+import argparse
+import itertools
+import os
+import random
+import threading
+import time
+from flask import Flask, request, jsonify
+
+app = Flask(__name__)
+
+settings = {
+    'graph_latency_ms': float(os.environ.get('MOCK_GRAPH_LATENCY_MS', 80)),
+    'llm_latency_ms': float(os.environ.get('MOCK_LLM_LATENCY_MS', 900)),
+    'jitter': float(os.environ.get('MOCK_JITTER', 0.3)),  # +/- fraction of the latency
+    'error_rate': float(os.environ.get('MOCK_ERROR_RATE', 0)),  # share of 500 responses
+    'rate_limit_rate': float(os.environ.get('MOCK_RATE_LIMIT_RATE', 0))  # share of 429 responses
+}
+
+message_ids = itertools.count(1)
+lock = threading.Lock()
+replies = []
+counters = {'messages': 0, 'completions': 0, 'errors': 0, 'rate_limited': 0}
+
+def simulate(latency_ms):
+    """Sleep for the configured latency, then maybe inject a failure"""
+    jitter = settings['jitter']
+    time.sleep(max(0, latency_ms * random.uniform(1 - jitter, 1 + jitter)) / 1000)
+
+    roll = random.random()
+    if roll < settings['rate_limit_rate']:
+        with lock:
+            counters['rate_limited'] += 1
+        return jsonify({'error': {'message': 'Rate limit hit', 'code': 130429}}), 429, {'Retry-After': '1'}
+    if roll < settings['rate_limit_rate'] + settings['error_rate']:
+        with lock:
+            counters['errors'] += 1
+        return jsonify({'error': {'message': 'Injected failure', 'code': 1}}), 500
+    return None
+
+@app.route('/<version>/<phone_number_id>/messages', methods=['POST'])
+def messages(version, phone_number_id):
+    """WhatsApp Cloud API /messages"""
+    failure = simulate(settings['graph_latency_ms'])
+    if failure:
+        return failure
+
+    data = request.get_json()
+    message_id = f"wamid.mock.{next(message_ids)}"
+    with lock:
+        counters['messages'] += 1
+        if data.get('type') in ('text', 'template'):
+            replies.append({
+                'to': data.get('to'),
+                'type': data.get('type'),
+                'phone_number_id': phone_number_id,
+                'at': time.time()
+            })
+
+    if 'status' in data or 'typing' in data:
+        return jsonify({'success': True})
+    return jsonify({
+        'messaging_product': 'whatsapp',
+        'contacts': [{'input': data.get('to'), 'wa_id': data.get('to')}],
+        'messages': [{'id': message_id}]
+    })
+
+@app.route('/v1/chat/completions', methods=['POST'])
+def chat_completions():
+    """OpenAI-compatible chat completions"""
+    failure = simulate(settings['llm_latency_ms'])
+    if failure:
+        return failure
+
+    data = request.get_json()
+    with lock:
+        counters['completions'] += 1
+    prompt_chars = sum(len(m.get('content') or '') for m in data.get('messages', []))
+    return jsonify({
+        'id': f"chatcmpl-mock-{counters['completions']}",
+        'object': 'chat.completion',
+        'created': int(time.time()),
+        'model': data.get('model', 'mock'),
+        'choices': [{
+            'index': 0,
+            'message': {'role': 'assistant', 'content': 'Resposta simulada do assistente. 😊'},
+            'finish_reason': 'stop'
+        }],
+        'usage': {'prompt_tokens': prompt_chars // 4, 'completion_tokens': 8, 'total_tokens': prompt_chars // 4 + 8}
+    })
+
+@app.route('/_mock/replies', methods=['GET'])
+def recorded_replies():
+    """Outbound messages recorded since ?since=<unix time>"""
+    since = float(request.args.get('since', 0))
+    with lock:
+        return jsonify([reply for reply in replies if reply['at'] >= since])
+
+@app.route('/_mock/stats', methods=['GET'])
+def stats():
+    with lock:
+        return jsonify({'settings': settings, **counters, 'recorded_replies': len(replies)})
+
+@app.route('/_mock/reset', methods=['POST'])
+def reset():
+    with lock:
+        replies.clear()
+        for name in counters:
+            counters[name] = 0
+    return jsonify({'success': True})
+
+def serve(port, threads):
+    """Serve with keep-alive, so the bot's pooled clients can reuse connections.
+
+    The werkzeug dev server closes the connection after every response,
+    which would hide connection pooling; gunicorn's threaded worker keeps
+    connections open. One worker, so the recorded replies and counters
+    stay in one process.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("gunicorn not installed: using the dev server (no keep-alive, reuse_rate will be 0)")
+        app.run(host='0.0.0.0', port=port, threaded=True)
+        return
+
+    class MockServer(BaseApplication):
+        def load_config(self):
+            for name, value in {'bind': f'0.0.0.0:{port}', 'workers': 1, 'worker_class': 'gthread',
+                                'threads': threads, 'keepalive': 75, 'accesslog': None}.items():
+                self.cfg.set(name, value)
+
+        def load(self):
+            return app
+
+    MockServer().run()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 9000)))
+    parser.add_argument('--graph-latency', type=float, help='Graph API latency in ms')
+    parser.add_argument('--llm-latency', type=float, help='LLM completion latency in ms')
+    parser.add_argument('--jitter', type=float, help='Latency jitter as a fraction (0.3 = +/-30%%)')
+    parser.add_argument('--error-rate', type=float, help='Share of requests answered with 500')
+    parser.add_argument('--rate-limit', type=float, help='Share of requests answered with 429')
+    parser.add_argument('--threads', type=int, default=64, help='Requests served concurrently')
+    args = parser.parse_args()
+
+    for name, value in [('graph_latency_ms', args.graph_latency), ('llm_latency_ms', args.llm_latency),
+                        ('jitter', args.jitter), ('error_rate', args.error_rate),
+                        ('rate_limit_rate', args.rate_limit)]:
+        if value is not None:
+            settings[name] = value
+
+    print(f"Mock Graph API + LLM on http://localhost:{args.port} {settings}")
+    serve(args.port, args.threads)
@@ -2,4 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 
 db = SQLAlchemy()
 
-from .business import BusinessConfig, Service, OperatingHours
\ No newline at end of file
+from .business import BusinessConfig, Service, OperatingHours
+from .message_status import MessageStatus
+from .broadcast import BroadcastJob, BroadcastRecipient
+from .tenant import WhatsAppNumber
\ No newline at end of file
@@ -0,0 +1,30 @@
+from . import db
+from datetime import datetime
+
+class BroadcastJob(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(200))
+    template_name = db.Column(db.String(100), nullable=False)
+    language_code = db.Column(db.String(10), default='pt_BR')
+    status = db.Column(db.String(20), default='pending')  # pending, running, stopped, completed
+    total = db.Column(db.Integer, default=0)
+    sent = db.Column(db.Integer, default=0)
+    failed = db.Column(db.Integer, default=0)
+    elapsed_seconds = db.Column(db.Float, default=0.0)  # Time spent sending, across resumes
+    heartbeat_at = db.Column(db.DateTime)  # Last claim or batch by the worker running it
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+    
+    # Relationships
+    recipients = db.relationship('BroadcastRecipient', backref='job', lazy=True, cascade='all, delete-orphan')
+
+class BroadcastRecipient(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('broadcast_job.id'), nullable=False)
+    phone = db.Column(db.String(20), nullable=False)
+    status = db.Column(db.String(20), default='pending')  # pending, sent, failed
+    message_id = db.Column(db.String(128))
+    error = db.Column(db.String(300))
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (db.Index('ix_broadcast_recipient_job_status', 'job_id', 'status'),)
@@ -1,5 +1,6 @@
 from . import db
 from datetime import datetime
+from sqlalchemy import event
 
 class BusinessConfig(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -32,4 +33,16 @@ class OperatingHours(db.Model):
     day_of_week = db.Column(db.Integer, nullable=False)  # 0=Monday, 6=Sunday
     open_time = db.Column(db.String(5))  # Format: "09:00"
     close_time = db.Column(db.String(5))  # Format: "18:00"
-    is_closed = db.Column(db.Boolean, default=False)
\ No newline at end of file
+    is_closed = db.Column(db.Boolean, default=False)
+
+def _touch_business(mapper, connection, target):
+    """Bump the owning business's updated_at, which versions cached snapshots"""
+    connection.execute(
+        BusinessConfig.__table__.update()
+        .where(BusinessConfig.__table__.c.id == target.business_id)
+        .values(updated_at=datetime.utcnow())
+    )
+
+for _model in (Service, OperatingHours):
+    for _event in ('after_insert', 'after_update', 'after_delete'):
+        event.listen(_model, _event, _touch_business)
@@ -0,0 +1,10 @@
+from . import db
+from datetime import datetime
+
+class MessageStatus(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.String(128), nullable=False, index=True)
+    recipient_id = db.Column(db.String(20))
+    status = db.Column(db.String(20), nullable=False)  # sent, delivered, read, failed
+    timestamp = db.Column(db.Integer)  # Unix time reported by Meta
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,12 @@
+from . import db
+from datetime import datetime
+
+class WhatsAppNumber(db.Model):
+    """A WhatsApp Business phone number and the studio (business) it answers for"""
+    id = db.Column(db.Integer, primary_key=True)
+    business_id = db.Column(db.Integer, db.ForeignKey('business_config.id'), nullable=False)
+    phone_number_id = db.Column(db.String(64), nullable=False, unique=True, index=True)  # From Meta
+    access_token = db.Column(db.Text)  # Falls back to WHATSAPP_TOKEN when empty
+    active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,227 @@
+import asyncio
+import csv
+import io
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from config import Config
+from services.event_loop import background_loop
+from services.whatsapp_async import AsyncWhatsAppService
+
+logger = logging.getLogger(__name__)
+
+
+def parse_recipients(content, filename=''):
+    """Read phone numbers from a JSON or CSV upload.
+
+    JSON may be a list of numbers or of objects with a 'phone' (or 'to')
+    key; CSV uses the 'phone' column if there is a header, otherwise the
+    first column. Duplicates are dropped, order is kept.
+    """
+    content = content.strip()
+    phones = []
+
+    if filename.endswith('.json') or content.startswith(('[', '{')):
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get('recipients', [])
+        for item in data:
+            if isinstance(item, dict):
+                item = item.get('phone') or item.get('to')
+            phones.append(str(item or ''))
+    else:
+        rows = list(csv.reader(io.StringIO(content)))
+        column = 0
+        if rows and rows[0] and not any(ch.isdigit() for ch in rows[0][0]):
+            header = [name.strip().lower() for name in rows[0]]
+            column = header.index('phone') if 'phone' in header else 0
+            rows = rows[1:]
+        phones = [row[column] for row in rows if len(row) > column]
+
+    cleaned = (''.join(ch for ch in phone if ch.isdigit()) for phone in phones)
+    return list(dict.fromkeys(phone for phone in cleaned if phone))
+
+
+def create_job(template_name, phones, name=None, language_code='pt_BR'):
+    """Persist a broadcast job and one pending row per recipient"""
+    from models import db, BroadcastJob, BroadcastRecipient
+
+    job = BroadcastJob(
+        name=name or template_name,
+        template_name=template_name,
+        language_code=language_code,
+        total=len(phones)
+    )
+    db.session.add(job)
+    db.session.flush()
+    db.session.bulk_insert_mappings(BroadcastRecipient, [
+        {'job_id': job.id, 'phone': phone, 'status': 'pending'} for phone in phones
+    ])
+    db.session.commit()
+    return job
+
+
+def job_progress(job):
+    """Progress, throughput and recent failures for a job"""
+    from models import BroadcastRecipient
+
+    processed = (job.sent or 0) + (job.failed or 0)
+    failures = BroadcastRecipient.query.filter_by(job_id=job.id, status='failed') \
+        .order_by(BroadcastRecipient.id.desc()).limit(20).all()
+    return {
+        'id': job.id,
+        'name': job.name,
+        'template_name': job.template_name,
+        'status': job.status,
+        'active': broadcast_runner.is_running(job.id),
+        'total': job.total,
+        'sent': job.sent,
+        'failed': job.failed,
+        'pending': job.total - processed,
+        'throughput_per_second': round(processed / job.elapsed_seconds, 2) if job.elapsed_seconds else None,
+        'recent_failures': [{'phone': r.phone, 'error': r.error} for r in failures]
+    }
+
+
+def _stale_before():
+    return datetime.utcnow() - timedelta(seconds=Config.BROADCAST_LEASE_SECONDS)
+
+
+def reset_stale_jobs():
+    """Mark jobs left 'running' by a process that died as stopped, so they can be resumed"""
+    from models import db, BroadcastJob
+
+    stale = BroadcastJob.query.filter(
+        BroadcastJob.status == 'running',
+        db.or_(BroadcastJob.heartbeat_at.is_(None), BroadcastJob.heartbeat_at < _stale_before())
+    ).update({'status': 'stopped'}, synchronize_session=False)
+    db.session.commit()
+    if stale:
+        logger.info(f"Reset {stale} interrupted broadcast(s) to stopped")
+    return stale
+
+
+class BroadcastRunner:
+    """Runs broadcast jobs in background threads.
+
+    Recipients are sent in batches, concurrently on the shared event loop
+    (so the outbound rate limiter applies); each batch's results are
+    committed before the next, so a stopped or interrupted job resumes
+    with the recipients still pending. A job is claimed in the database
+    before it runs and its heartbeat renewed with every batch, so two
+    workers never send the same job.
+    """
+
+    def __init__(self, batch_size=None):
+        self.batch_size = batch_size or Config.BROADCAST_BATCH_SIZE
+        self._lock = threading.Lock()
+        self._jobs = {}
+
+    def is_running(self, job_id):
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            return bool(entry and entry[0].is_alive())
+
+    def start(self, app, job_id):
+        """Start (or resume) a job; returns False if it is already running"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+            if entry and entry[0].is_alive():
+                return False
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=self._run,
+                args=(app, job_id, stop_event),
+                name=f"broadcast-{job_id}",
+                daemon=True
+            )
+            self._jobs[job_id] = (thread, stop_event)
+            thread.start()
+            return True
+
+    def stop(self, job_id):
+        """Ask a job to stop after its current batch"""
+        with self._lock:
+            entry = self._jobs.get(job_id)
+        if not entry or not entry[0].is_alive():
+            return False
+        entry[1].set()
+        return True
+
+    def _run(self, app, job_id, stop_event):
+        from models import db, BroadcastJob, BroadcastRecipient
+
+        with app.app_context():
+            if not self._claim(job_id):
+                logger.info(f"Broadcast {job_id} is completed or running in another worker")
+                return
+            job = BroadcastJob.query.get(job_id)
+            client = AsyncWhatsAppService()
+
+            try:
+                while not stop_event.is_set():
+                    batch = BroadcastRecipient.query.filter_by(job_id=job_id, status='pending') \
+                        .order_by(BroadcastRecipient.id).limit(self.batch_size).all()
+                    if not batch:
+                        job.status = 'completed'
+                        job.finished_at = datetime.utcnow()
+                        break
+
+                    started = time.perf_counter()
+                    results = background_loop.run(self._send_batch(
+                        client, job.template_name, job.language_code, [r.phone for r in batch]
+                    ))
+                    now = datetime.utcnow()
+
+                    for recipient, result in zip(batch, results):
+                        if isinstance(result, Exception):
+                            recipient.status = 'failed'
+                            recipient.error = str(result)[:300]
+                            job.failed += 1
+                        else:
+                            recipient.status = 'sent'
+                            recipient.sent_at = now
+                            recipient.message_id = (result.get('messages') or [{}])[0].get('id')
+                            job.sent += 1
+                    job.elapsed_seconds += time.perf_counter() - started
+                    job.heartbeat_at = now
+                    db.session.commit()
+                else:
+                    job.status = 'stopped'
+                db.session.commit()
+            except Exception as e:
+                logger.error(f"Broadcast {job_id} interrupted: {e}")
+                db.session.rollback()
+                job = BroadcastJob.query.get(job_id)
+                job.status = 'stopped'
+                db.session.commit()
+
+            logger.info(f"Broadcast {job_id} {job.status}: {job.sent} sent, {job.failed} failed")
+
+    def _claim(self, job_id):
+        """Atomically mark a job running unless it is completed or another worker holds it"""
+        from models import db, BroadcastJob
+
+        claimed = BroadcastJob.query.filter(
+            BroadcastJob.id == job_id,
+            db.or_(
+                BroadcastJob.status.in_(('pending', 'stopped')),
+                db.and_(BroadcastJob.status == 'running',
+                        db.or_(BroadcastJob.heartbeat_at.is_(None), BroadcastJob.heartbeat_at < _stale_before()))
+            )
+        ).update({'status': 'running', 'heartbeat_at': datetime.utcnow()}, synchronize_session=False)
+        db.session.commit()
+        return claimed == 1
+
+    async def _send_batch(self, client, template_name, language_code, phones):
+        """Per phone: the Graph API response, or the GraphAPIError it failed with"""
+        return await asyncio.gather(*[
+            client.send_template_message(phone, template_name, language_code, raise_errors=True)
+            for phone in phones
+        ], return_exceptions=True)
+
+
+# One runner per process
+broadcast_runner = BroadcastRunner()
@@ -0,0 +1,169 @@
+import heapq
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class BurstCoalescer:
+    """Debounce consecutive messages from the same sender into one bot turn.
+
+    Each message restarts the sender's window; when the window closes
+    (or the burst hits max_messages) the handler gets all parts at once.
+    One scheduler thread tracks every open window and hands closed bursts
+    to a small worker pool, so a burst costs no thread while it waits.
+    A sender's bursts are answered one at a time, in the order they closed.
+    """
+
+    def __init__(self, window_ms=None, max_messages=None, workers=None):
+        if window_ms is None:
+            window_ms = Config.WHATSAPP_BURST_WINDOW_MS
+        self.window = window_ms / 1000
+        self.max_messages = max_messages or Config.WHATSAPP_BURST_MAX_MESSAGES
+        self.workers = workers or Config.WHATSAPP_BURST_WORKERS
+
+        self._app = None
+        self._handler = None
+        self._lock = threading.Lock()
+        self._due = threading.Condition(self._lock)
+        self._bursts = {}
+        self._answering = {}  # key -> bursts closed while an earlier one is being answered
+        self._deadlines = []  # heap of (due, generation, key)
+        self._generation = 0
+        self._scheduler = None
+        self._pool = None
+        self._stats = {
+            "messages": 0,
+            "turns": 0,
+            "merged_messages": 0,
+            "sends_saved": 0,
+            "llm_calls_saved": 0
+        }
+
+    def start(self, app, handler):
+        """handler(key, parts) runs inside an app context once per burst and
+        returns True if the burst was answered (what on_done callbacks get as ok)"""
+        self._app = app
+        self._handler = handler
+        with self._lock:
+            if self._scheduler is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='burst')
+                self._scheduler = threading.Thread(target=self._schedule, name='burst-scheduler', daemon=True)
+                self._scheduler.start()
+
+    def add(self, key, text, on_done=None, order=0):
+        """Add a message to the sender's burst.
+
+        on_done(ok) is called once the burst holding this message has been
+        handled (ok=False if the handler raised or returned False), e.g. to ack the message's
+        inbound queue entry only after the reply went out.
+        order (e.g. the message timestamp) sorts the parts, since concurrent
+        consumers may add a sender's messages out of order; ties keep arrival order.
+        """
+        callbacks = [on_done] if on_done else []
+        part = (order, text)
+        with self._lock:
+            self._stats["messages"] += 1
+            if self.window <= 0:
+                burst = None
+            else:
+                burst = self._bursts.get(key)
+                if burst:
+                    burst["parts"].append(part)
+                    burst["callbacks"] += callbacks
+                else:
+                    burst = {"parts": [part], "callbacks": callbacks}
+                    self._bursts[key] = burst
+
+                if len(burst["parts"]) < self.max_messages:
+                    # A newer generation makes the sender's earlier deadline stale
+                    self._generation += 1
+                    burst["generation"] = self._generation
+                    heapq.heappush(self._deadlines, (time.monotonic() + self.window, self._generation, key))
+                    self._due.notify()
+                    return
+                del self._bursts[key]
+
+        if burst:
+            parts, callbacks = burst["parts"], burst["callbacks"]
+        else:
+            parts = [part]
+        self._dispatch(key, parts, callbacks)
+
+    def _schedule(self):
+        while True:
+            with self._lock:
+                while True:
+                    if not self._deadlines:
+                        self._due.wait()
+                        continue
+                    due, generation, key = self._deadlines[0]
+                    delay = due - time.monotonic()
+                    if delay > 0:
+                        self._due.wait(delay)
+                        continue
+                    heapq.heappop(self._deadlines)
+                    burst = self._bursts.get(key)
+                    # A newer message restarted the window after this deadline was set
+                    if burst and burst["generation"] == generation:
+                        del self._bursts[key]
+                        break
+
+            self._pool.submit(self._flush, key, burst)
+
+    def _flush(self, key, burst):
+        with self._app.app_context():
+            self._dispatch(key, burst["parts"], burst["callbacks"])
+
+    def _dispatch(self, key, parts, callbacks=()):
+        with self._lock:
+            waiting = self._answering.get(key)
+            if waiting is not None:
+                # The sender's previous burst is still being answered; its thread runs this one next
+                waiting.append((parts, callbacks))
+                return
+            self._answering[key] = []
+
+        while True:
+            self._answer(key, parts, callbacks)
+            with self._lock:
+                waiting = self._answering[key]
+                if not waiting:
+                    del self._answering[key]
+                    return
+                parts, callbacks = waiting.pop(0)
+
+    def _answer(self, key, parts, callbacks):
+        with self._lock:
+            self._stats["turns"] += 1
+            self._stats["merged_messages"] += len(parts) - 1
+            self._stats["sends_saved"] += len(parts) - 1
+        texts = [text for _, text in sorted(parts, key=lambda part: part[0])]
+        try:
+            ok = bool(self._handler(key, texts))
+        except Exception as e:
+            ok = False
+            logger.error(f"Burst handler failed for {key}: {e}")
+        for callback in callbacks:
+            try:
+                callback(ok)
+            except Exception as e:
+                logger.error(f"Burst completion callback failed for {key}: {e}")
+
+    def record_llm_calls_saved(self, count):
+        """Report LLM calls a merged turn avoided (computed by the handler)"""
+        if count > 0:
+            with self._lock:
+                self._stats["llm_calls_saved"] += count
+
+    def stats(self):
+        with self._lock:
+            return {
+                "window_ms": int(self.window * 1000),
+                "pending_bursts": len(self._bursts),
+                "queued_bursts": sum(len(waiting) for waiting in self._answering.values()),
+                **self._stats
+            }
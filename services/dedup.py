@@ -0,0 +1,124 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class MessageDeduplicator:
+    """Bounded index of recently handled WhatsApp message ids.
+
+    A small in-memory LRU answers most lookups; misses fall through to a
+    SQLite table so redeliveries are still caught after a restart. Entries
+    older than the TTL are forgotten in both tiers.
+    """
+
+    def __init__(self, path=None, ttl_seconds=None, max_entries=None):
+        self.path = path or Config.WHATSAPP_DEDUP_PATH
+        self.ttl = ttl_seconds or Config.WHATSAPP_DEDUP_TTL_SECONDS
+        self.max_entries = max_entries or Config.WHATSAPP_DEDUP_MAX_ENTRIES
+        self.prune_every = 1000
+
+        self._lock = threading.Lock()
+        self._recent = OrderedDict()
+        self._in_flight = set()
+        self._conn = None
+        self._writes = 0
+        self._stats = {"checked": 0, "duplicates": 0, "memory_hits": 0}
+
+    def _connect(self):
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA synchronous=NORMAL')
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS seen_messages (
+                    message_id TEXT PRIMARY KEY,
+                    seen_at REAL NOT NULL
+                )
+            """)
+        return self._conn
+
+    def begin(self, message_id):
+        """Start handling message_id; returns False if it was already handled
+        within the TTL or is being handled right now.
+
+        A message only counts as handled once finish(message_id) is called
+        after its reply went out, so one that was seen but never answered
+        (e.g. the worker crashed) is handled again when redelivered.
+        """
+        now = time.time()
+        with self._lock:
+            self._stats["checked"] += 1
+
+            if message_id in self._in_flight:
+                self._stats["duplicates"] += 1
+                return False
+
+            seen_at = self._recent.get(message_id)
+            if seen_at is not None and now - seen_at < self.ttl:
+                self._stats["memory_hits"] += 1
+                self._stats["duplicates"] += 1
+                return False
+
+            row = self._connect().execute(
+                "SELECT seen_at FROM seen_messages WHERE message_id = ?", (message_id,)
+            ).fetchone()
+            if row and now - row[0] < self.ttl:
+                self._remember(message_id, row[0])
+                self._stats["duplicates"] += 1
+                return False
+
+            self._in_flight.add(message_id)
+            return True
+
+    def finish(self, message_id, handled=True):
+        """Record message_id as handled (after its reply was sent), or, with
+        handled=False, let a redelivery of it be processed again"""
+        now = time.time()
+        with self._lock:
+            self._in_flight.discard(message_id)
+            if not handled:
+                return
+
+            # Insert, or refresh an expired row
+            self._connect().execute(
+                """INSERT INTO seen_messages (message_id, seen_at) VALUES (?, ?)
+                   ON CONFLICT(message_id) DO UPDATE SET seen_at = excluded.seen_at""",
+                (message_id, now)
+            )
+            self._remember(message_id, now)
+            self._writes += 1
+            if self._writes % self.prune_every == 0:
+                self._prune(now)
+
+    def _remember(self, message_id, now):
+        self._recent[message_id] = now
+        self._recent.move_to_end(message_id)
+        while self._recent:
+            oldest_id, oldest_at = next(iter(self._recent.items()))
+            if len(self._recent) <= self.max_entries and now - oldest_at < self.ttl:
+                break
+            del self._recent[oldest_id]
+
+    def _prune(self, now):
+        try:
+            self._connect().execute("DELETE FROM seen_messages WHERE seen_at < ?", (now - self.ttl,))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not prune seen messages: {e}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_memory": len(self._recent),
+                "in_flight": len(self._in_flight),
+                "ttl_seconds": self.ttl,
+                **self._stats
+            }
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+
+class BackgroundLoop:
+    """An asyncio event loop running in a daemon thread.
+
+    Lets sync code (Flask views, queue consumers) hand coroutines to a
+    single loop, so many outbound requests can be in flight at once
+    without a thread per request.
+    """
+
+    def __init__(self, name="background-loop"):
+        self.name = name
+        self._loop = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    thread = threading.Thread(target=loop.run_forever, name=self.name, daemon=True)
+                    thread.start()
+                    self._loop = loop
+        return self._loop
+
+    def submit(self, coro):
+        """Schedule a coroutine; returns a concurrent.futures.Future"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """Run a coroutine on the loop and block until it finishes"""
+        return self.submit(coro).result(timeout)
+
+
+# Shared by every service in the process
+background_loop = BackgroundLoop()
@@ -0,0 +1,230 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class InboundQueue:
+    """Durable SQLite queue for raw webhook payloads.
+
+    The webhook only appends the raw body and returns; a pool of consumer
+    threads claims entries with a lease, so anything left unfinished by a
+    crash or redeploy is claimed again once its lease expires.
+    """
+
+    def __init__(self, path=None, workers=None, lease_seconds=None, max_attempts=None):
+        self.path = path or Config.INBOUND_QUEUE_PATH
+        self.workers = workers or Config.INBOUND_QUEUE_WORKERS
+        self.lease_seconds = lease_seconds or Config.INBOUND_QUEUE_LEASE_SECONDS
+        self.max_attempts = max_attempts or Config.INBOUND_QUEUE_MAX_ATTEMPTS
+        self.poll_interval = 0.5
+
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._counters_lock = threading.Lock()
+        self._counters = {"enqueued": 0, "processed": 0, "retried": 0, "failed": 0}
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS inbound_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    received_at REAL NOT NULL,
+                    claimed_at REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_inbound_queue_status ON inbound_queue (status, id)")
+            self._schema_ready = True
+
+    def _count(self, name, amount=1):
+        with self._counters_lock:
+            self._counters[name] += amount
+
+    def enqueue(self, payload):
+        """Durably store a raw webhook body and wake a consumer"""
+        conn = self._connect()
+        conn.execute(
+            "INSERT INTO inbound_queue (payload, received_at) VALUES (?, ?)",
+            (payload, time.time())
+        )
+        self._count('enqueued')
+        self._wakeup.set()
+
+    def claim(self):
+        """Lease the oldest pending (or expired) entry; returns (id, payload) or None"""
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                """SELECT id, payload FROM inbound_queue
+                   WHERE status = 'pending' OR (status = 'processing' AND claimed_at < ?)
+                   ORDER BY id LIMIT 1""",
+                (now - self.lease_seconds,)
+            ).fetchone()
+            if row:
+                conn.execute(
+                    "UPDATE inbound_queue SET status = 'processing', claimed_at = ?, attempts = attempts + 1 WHERE id = ?",
+                    (now, row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def ack(self, entry_id):
+        """Remove a fully processed entry"""
+        self._connect().execute("DELETE FROM inbound_queue WHERE id = ?", (entry_id,))
+        self._count('processed')
+
+    def fail(self, entry_id):
+        """Release an entry for another attempt, or park it as failed"""
+        conn = self._connect()
+        row = conn.execute("SELECT attempts FROM inbound_queue WHERE id = ?", (entry_id,)).fetchone()
+        if row and row[0] >= self.max_attempts:
+            conn.execute("UPDATE inbound_queue SET status = 'failed' WHERE id = ?", (entry_id,))
+            self._count('failed')
+        else:
+            conn.execute("UPDATE inbound_queue SET status = 'pending', claimed_at = NULL WHERE id = ?", (entry_id,))
+            self._count('retried')
+
+    def start(self, app, handler):
+        """Start the consumer pool; handler(payload) runs inside an app context"""
+        if self._threads:
+            return
+        self._stopping.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._consume,
+                args=(app, handler),
+                name=f"inbound-consumer-{i}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Inbound queue started with {self.workers} consumers ({self.path})")
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _consume(self, app, handler):
+        while not self._stopping.is_set():
+            try:
+                entry = self.claim()
+            except Exception as e:
+                logger.error(f"Inbound queue claim failed: {e}")
+                entry = None
+
+            if not entry:
+                # Other workers (gunicorn processes) only show up through polling
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            entry_id, payload = entry
+            completion = _Completion(self, entry_id)
+            self._local.completion = completion
+            try:
+                with app.app_context():
+                    handler(payload)
+            except Exception as e:
+                logger.error(f"Inbound entry {entry_id} failed: {e}")
+                completion.close(ok=False)
+            else:
+                completion.close(ok=True)
+            finally:
+                self._local.completion = None
+
+    def hold(self):
+        """Keep the entry being handled leased past the handler's return.
+
+        Called from inside a handler, for work it hands off (e.g. a message
+        waiting in a burst window); returns release(ok), and the entry is
+        acked, or released for retry, once the handler and every hold are
+        done. Returns None outside a consumer.
+        """
+        completion = getattr(self._local, 'completion', None)
+        return completion.hold() if completion else None
+
+    def _finish(self, entry_id, ok):
+        try:
+            if ok:
+                self.ack(entry_id)
+            else:
+                self.fail(entry_id)
+        except Exception as e:
+            logger.error(f"Could not settle inbound entry {entry_id}: {e}")
+
+    def stats(self):
+        """Queue depth by status plus counters for this process"""
+        rows = self._connect().execute(
+            "SELECT status, COUNT(*) FROM inbound_queue GROUP BY status"
+        ).fetchall()
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            "depth": dict(rows),
+            "consumers": len(self._threads),
+            **counters
+        }
+
+
+class _Completion:
+    """Acks or fails one inbound entry when its handler and all holds are done"""
+
+    def __init__(self, queue, entry_id):
+        self.queue = queue
+        self.entry_id = entry_id
+        self._lock = threading.Lock()
+        self._pending = 1  # the handler itself
+        self._ok = True
+
+    def hold(self):
+        with self._lock:
+            self._pending += 1
+        released = []
+
+        def release(ok=True):
+            if not released:
+                released.append(True)
+                self.close(ok)
+        return release
+
+    def close(self, ok):
+        with self._lock:
+            self._pending -= 1
+            self._ok = self._ok and ok
+            if self._pending:
+                return
+        self.queue._finish(self.entry_id, self._ok)
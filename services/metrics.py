@@ -0,0 +1,43 @@
+import threading
+from collections import deque
+
+
+def _pick(samples, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    return round(samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))], 2)
+
+
+class LatencyRecorder:
+    """Keeps the most recent samples (in ms) and reports percentiles"""
+
+    def __init__(self, size=2000):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, value_ms):
+        with self._lock:
+            self._samples.append(value_ms)
+            self.count += 1
+            self.total += value_ms
+
+    def percentile(self, pct):
+        with self._lock:
+            samples = sorted(self._samples)
+        return _pick(samples, pct) if samples else None
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, total = self.count, self.total
+        if not samples:
+            return {"count": count}
+        return {
+            "count": count,
+            "avg": round(total / count, 2),
+            "p50": _pick(samples, 50),
+            "p95": _pick(samples, 95),
+            "p99": _pick(samples, 99),
+            "max": round(samples[-1], 2)
+        }
@@ -0,0 +1,131 @@
+import asyncio
+import threading
+import time
+from config import Config
+from services.metrics import LatencyRecorder
+
+
+class TokenBucket:
+    """Token bucket that hands out reservations.
+
+    reserve() always succeeds but may leave the bucket in debt; the caller
+    waits out the debt, so waiters are served in arrival order.
+    """
+
+    def __init__(self, rate, burst):
+        self.configured_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self):
+        """Take one token; returns how long to wait before using it"""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def slow_down(self, min_rate):
+        """Multiplicative decrease after a 429"""
+        self._refill(time.monotonic())
+        self.rate = max(min_rate, self.rate / 2)
+        self.tokens = min(self.tokens, 0)
+
+    def speed_up(self):
+        """Additive recovery towards the configured rate"""
+        if self.rate < self.configured_rate:
+            self._refill(time.monotonic())
+            self.rate = min(self.configured_rate, self.rate + self.configured_rate * 0.05)
+
+
+class OutboundRateLimiter:
+    """Per phone_number_id send throttling for the Graph API.
+
+    Sends over the limit wait for a token instead of failing, and a 429
+    halves that number's rate until successful sends recover it.
+    """
+
+    def __init__(self, default_rate=None, burst=None, overrides=None, min_rate=None):
+        self.default_rate = default_rate or Config.WHATSAPP_RATE_PER_SECOND
+        self.burst = burst or Config.WHATSAPP_RATE_BURST
+        self.min_rate = min_rate or Config.WHATSAPP_RATE_MIN
+        self.overrides = overrides if overrides is not None else parse_rate_limits(Config.WHATSAPP_RATE_LIMITS)
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._waiting = {}
+        self._throttled = 0
+        self.wait_times = LatencyRecorder()
+
+    def _bucket(self, phone_number_id):
+        bucket = self._buckets.get(phone_number_id)
+        if bucket is None:
+            with self._lock:
+                bucket = self._buckets.get(phone_number_id)
+                if bucket is None:
+                    rate = self.overrides.get(phone_number_id, self.default_rate)
+                    bucket = TokenBucket(rate, min(self.burst, rate) if rate >= 1 else 1)
+                    self._buckets[phone_number_id] = bucket
+                    self._waiting[phone_number_id] = 0
+        return bucket
+
+    async def acquire(self, phone_number_id):
+        """Wait until phone_number_id may send another message"""
+        bucket = self._bucket(phone_number_id)
+        with self._lock:
+            wait = bucket.reserve()
+        if wait > 0:
+            self._waiting[phone_number_id] += 1
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                self._waiting[phone_number_id] -= 1
+        self.wait_times.record(wait * 1000)
+
+    def on_throttled(self, phone_number_id):
+        with self._lock:
+            self._bucket(phone_number_id).slow_down(self.min_rate)
+            self._throttled += 1
+
+    def on_success(self, phone_number_id):
+        bucket = self._bucket(phone_number_id)
+        if bucket.rate < bucket.configured_rate:
+            with self._lock:
+                bucket.speed_up()
+
+    def stats(self):
+        with self._lock:
+            numbers = {
+                phone_number_id: {
+                    "rate": round(bucket.rate, 2),
+                    "configured_rate": bucket.configured_rate,
+                    "queue_depth": self._waiting.get(phone_number_id, 0)
+                }
+                for phone_number_id, bucket in self._buckets.items()
+            }
+            throttled = self._throttled
+        return {
+            "numbers": numbers,
+            "queue_depth": sum(n["queue_depth"] for n in numbers.values()),
+            "throttled": throttled,
+            "wait_ms": self.wait_times.summary()
+        }
+
+
+def parse_rate_limits(value):
+    """Parse 'phone_number_id:rate,...' into a dict"""
+    limits = {}
+    for item in (value or '').split(','):
+        if ':' in item:
+            phone_number_id, rate = item.split(':', 1)
+            limits[phone_number_id.strip()] = float(rate)
+    return limits
+
+
+# Shared by every outbound client in the process
+rate_limiter = OutboundRateLimiter()
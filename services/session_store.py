@@ -0,0 +1,124 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+
+
+class SessionStore:
+    """Conversation sessions with an LRU size cap and an idle TTL.
+
+    get() returns the session for a key, creating it with factory() on
+    first use. Sessions idle for longer than the TTL are dropped, and when
+    the store is full the least recently used session makes room.
+
+    With partition(key) (e.g. the business of a (business_id, number) key)
+    each partition also holds at most max_per_partition sessions, evicting
+    its own least recently used one, so one busy tenant cannot push every
+    other tenant's sessions out of the shared max_sessions.
+    """
+
+    def __init__(self, factory, max_sessions=None, ttl_seconds=None, sizeof=None,
+                 partition=None, max_per_partition=None):
+        self.factory = factory
+        self.max_sessions = max_sessions or Config.SESSION_MAX
+        self.ttl = ttl_seconds or Config.SESSION_TTL_SECONDS
+        self.sizeof = sizeof or sys.getsizeof
+        self.partition = partition
+        self.max_per_partition = max_per_partition or Config.SESSION_MAX_PER_TENANT
+
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # key -> [session, last used (monotonic)], least recent first
+        self._partitions = {}  # partition -> OrderedDict of its keys, least recent first
+        self._stats = {"created": 0, "hits": 0, "evicted_lru": 0, "evicted_idle": 0,
+                       "evicted_partition": 0, "reset": 0}
+
+    def _touch(self, key, entry, now):
+        entry[1] = now
+        self._sessions.move_to_end(key)
+        if self.partition:
+            self._partitions[self.partition(key)].move_to_end(key)
+
+    def _drop(self, key):
+        """Remove key; returns its entry, or None if it was not stored"""
+        entry = self._sessions.pop(key, None)
+        if entry is not None and self.partition:
+            name = self.partition(key)
+            keys = self._partitions[name]
+            del keys[key]
+            if not keys:
+                del self._partitions[name]
+        return entry
+
+    def _evict_idle(self, now):
+        # Least recently used first, so expired sessions are always at the front
+        while self._sessions:
+            key, entry = next(iter(self._sessions.items()))
+            if now - entry[1] < self.ttl:
+                break
+            self._drop(key)
+            self._stats["evicted_idle"] += 1
+
+    def get(self, key):
+        """Session for key, created if new or expired"""
+        now = time.monotonic()
+        with self._lock:
+            self._evict_idle(now)
+            entry = self._sessions.get(key)
+            if entry:
+                self._touch(key, entry, now)
+                self._stats["hits"] += 1
+                return entry[0]
+
+        session = self.factory()
+        with self._lock:
+            # Another thread may have created it meanwhile
+            entry = self._sessions.get(key)
+            if entry:
+                self._touch(key, entry, now)
+                return entry[0]
+
+            self._sessions[key] = [session, now]
+            self._stats["created"] += 1
+            if self.partition:
+                keys = self._partitions.setdefault(self.partition(key), OrderedDict())
+                keys[key] = None
+                while len(keys) > self.max_per_partition:
+                    self._drop(next(iter(keys)))
+                    self._stats["evicted_partition"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._drop(next(iter(self._sessions)))
+                self._stats["evicted_lru"] += 1
+        return session
+
+    def reset(self, key):
+        """Forget the session for key; returns False if there was none"""
+        with self._lock:
+            if self._drop(key) is None:
+                return False
+            self._stats["reset"] += 1
+            return True
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._sessions
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+            sessions = [entry[0] for entry in self._sessions.values()]
+            stats = dict(self._stats)
+        footprint = sum(self.sizeof(session) for session in sessions)
+        stats.update({
+            "sessions": len(sessions),
+            "max_sessions": self.max_sessions,
+            "max_per_partition": self.max_per_partition if self.partition else None,
+            "ttl_seconds": self.ttl,
+            "footprint_bytes": footprint,
+            "avg_session_bytes": round(footprint / len(sessions)) if sessions else 0
+        })
+        return stats
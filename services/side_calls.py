@@ -0,0 +1,64 @@
+import threading
+import time
+from services.event_loop import background_loop
+from services.metrics import LatencyRecorder
+
+
+class SideCallDispatcher:
+    """Fire-and-forget dispatch for read receipts and typing indicators.
+
+    Calls run on the background loop while the bot works on the reply.
+    A call still waiting when a reply to the same sender has gone out is
+    dropped, since it would only arrive after the answer.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._replied_at = {}
+        self.latency = LatencyRecorder()
+        self._stats = {"dispatched": 0, "completed": 0, "dropped": 0, "failed": 0}
+
+    def dispatch(self, key, coro_factory):
+        """Schedule coro_factory() for sender key without waiting for it"""
+        created = time.monotonic()
+        with self._lock:
+            self._pending[key] = self._pending.get(key, 0) + 1
+            self._stats["dispatched"] += 1
+        background_loop.submit(self._run(key, created, coro_factory))
+
+    def reply_sent(self, key):
+        """Mark that a reply to key is out; older pending side calls are dropped"""
+        with self._lock:
+            if key in self._pending:
+                self._replied_at[key] = time.monotonic()
+
+    async def _run(self, key, created, coro_factory):
+        outcome = "completed"
+        try:
+            with self._lock:
+                stale = self._replied_at.get(key, 0) > created
+            if stale:
+                outcome = "dropped"
+                return
+
+            started = time.perf_counter()
+            await coro_factory()
+            self.latency.record((time.perf_counter() - started) * 1000)
+        except Exception:
+            outcome = "failed"
+        finally:
+            with self._lock:
+                self._stats[outcome] += 1
+                self._pending[key] -= 1
+                if not self._pending[key]:
+                    del self._pending[key]
+                    self._replied_at.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        # Every completed side call is time that used to sit on the reply path
+        stats["off_critical_path_ms"] = round(self.latency.total, 1)
+        stats["latency_ms"] = self.latency.summary()
+        return stats
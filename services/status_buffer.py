@@ -0,0 +1,84 @@
+import atexit
+import logging
+import threading
+import time
+from sqlalchemy import insert
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class StatusBuffer:
+    """Buffer delivery status callbacks and write them in bulk.
+
+    Rows are flushed with a single executemany INSERT once batch_size
+    events are waiting or flush_ms has passed, whichever comes first.
+    """
+
+    def __init__(self, batch_size=None, flush_ms=None):
+        self.batch_size = batch_size or Config.WHATSAPP_STATUS_BATCH_SIZE
+        self.flush_interval = (flush_ms or Config.WHATSAPP_STATUS_FLUSH_MS) / 1000
+
+        self._app = None
+        self._rows = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stats = {"buffered": 0, "written": 0, "flushes": 0, "dropped": 0}
+
+    def start(self, app):
+        if self._thread:
+            return
+        self._app = app
+        self._thread = threading.Thread(target=self._run, name="status-flusher", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def add(self, row):
+        with self._lock:
+            self._rows.append(row)
+            self._stats["buffered"] += 1
+            full = len(self._rows) >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Write all buffered rows in one INSERT"""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows or not self._app:
+                return
+
+            from models import db, MessageStatus
+            started = time.perf_counter()
+            try:
+                with self._app.app_context():
+                    db.session.execute(insert(MessageStatus), rows)
+                    db.session.commit()
+            except Exception as e:
+                logger.error(f"Could not write {len(rows)} message statuses: {e}")
+                with self._lock:
+                    self._stats["dropped"] += len(rows)
+                return
+
+            with self._lock:
+                self._stats["written"] += len(rows)
+                self._stats["flushes"] += 1
+            logger.debug(f"Wrote {len(rows)} message statuses in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    def stats(self):
+        with self._lock:
+            flushes = self._stats["flushes"]
+            return {
+                "pending": len(self._rows),
+                "avg_batch": round(self._stats["written"] / flushes, 1) if flushes else 0,
+                **self._stats
+            }
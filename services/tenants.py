@@ -0,0 +1,100 @@
+import logging
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from config import Config
+from services.whatsapp import WhatsAppService
+
+logger = logging.getLogger(__name__)
+
+# Where an inbound message is answered from and how replies go out
+Tenant = namedtuple('Tenant', 'business_id phone_number_id token')
+
+class TenantIndex:
+    """In-memory routing of inbound phone_number_id to a tenant.
+
+    Every active WhatsAppNumber is read in one query, at most once per
+    TENANT_REFRESH_SECONDS, so routing a message never waits on the
+    database. Without any rows the deployment is single-tenant: every
+    number maps to DEFAULT_BUSINESS_ID with the WHATSAPP_* credentials.
+    """
+
+    def __init__(self, refresh_seconds=None, max_services=None):
+        self.refresh = refresh_seconds if refresh_seconds is not None else Config.TENANT_REFRESH_SECONDS
+        self.max_services = max_services or Config.BUSINESS_CACHE_MAX
+        self._lock = threading.Lock()
+        self._tenants = {}
+        self._loaded_at = None
+        self._services = OrderedDict()  # Tenant -> WhatsAppService (LRU)
+        self._stats = {"lookups": 0, "reloads": 0, "reload_errors": 0, "unknown": 0}
+
+    def _default(self):
+        return Tenant(Config.DEFAULT_BUSINESS_ID, Config.WHATSAPP_PHONE_NUMBER_ID, Config.WHATSAPP_TOKEN)
+
+    def _reload(self):
+        from models import WhatsAppNumber
+
+        rows = WhatsAppNumber.query.filter_by(active=True).all()
+        tenants = {
+            row.phone_number_id: Tenant(row.business_id, row.phone_number_id, row.access_token or Config.WHATSAPP_TOKEN)
+            for row in rows
+        }
+        with self._lock:
+            self._tenants = tenants
+            self._stats["reloads"] += 1
+
+    def _refresh_if_stale(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.refresh:
+                return
+            # Claimed before loading, so only one thread queries
+            self._loaded_at = now
+        try:
+            self._reload()
+        except Exception as e:
+            logger.warning(f"Could not reload tenants, keeping {len(self._tenants)} cached: {e}")
+            with self._lock:
+                self._stats["reload_errors"] += 1
+
+    def resolve(self, phone_number_id):
+        """Tenant for the number a message was sent to, or None if this deployment does not serve it"""
+        self._refresh_if_stale()
+        with self._lock:
+            self._stats["lookups"] += 1
+            tenant = self._tenants.get(phone_number_id)
+            if tenant:
+                return tenant
+            if not self._tenants or not phone_number_id or phone_number_id == Config.WHATSAPP_PHONE_NUMBER_ID:
+                return self._default()
+            self._stats["unknown"] += 1
+            return None
+
+    def invalidate(self):
+        """Re-read tenants on the next lookup (this worker) right after a local change"""
+        with self._lock:
+            self._loaded_at = None
+
+    def whatsapp(self, tenant):
+        """Outbound service with the tenant's credentials (instances share one connection pool)"""
+        with self._lock:
+            service = self._services.get(tenant)
+            if service is not None:
+                self._services.move_to_end(tenant)
+                return service
+            service = WhatsAppService(token=tenant.token, phone_number_id=tenant.phone_number_id)
+            self._services[tenant] = service
+            while len(self._services) > self.max_services:
+                self._services.popitem(last=False)
+            return service
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tenants": len(self._tenants),
+                "outbound_services": len(self._services),
+                "refresh_seconds": self.refresh,
+                **self._stats
+            }
+
+tenant_index = TenantIndex()
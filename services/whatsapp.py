@@ -1,106 +1,36 @@
-import requests
-import json
-from config import Config
+from services.event_loop import background_loop
+from services.whatsapp_async import AsyncWhatsAppService
 
 class WhatsAppService:
-    def __init__(self):
-        self.token = Config.WHATSAPP_TOKEN
-        self.phone_number_id = Config.WHATSAPP_PHONE_NUMBER_ID
-        self.api_version = Config.WHATSAPP_API_VERSION
-        self.base_url = f"https://graph.facebook.com/{self.api_version}/{self.phone_number_id}"
-        
+    """Blocking facade over AsyncWhatsAppService.
+
+    Each call runs on the shared background event loop, so sync callers
+    use the same connection pool and in-flight limit as async ones.
+    """
+
+    def __init__(self, token=None, phone_number_id=None):
+        self.client = AsyncWhatsAppService(token, phone_number_id)
+        self.token = self.client.token
+        self.phone_number_id = self.client.phone_number_id
+        self.api_version = self.client.api_version
+        self.base_url = self.client.base_url
+
+    @staticmethod
+    def pool_stats():
+        return AsyncWhatsAppService.pool_stats()
+
     def send_message(self, to_number, message):
         """Send a text message via WhatsApp"""
-        url = f"{self.base_url}/messages"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": to_number,
-            "type": "text",
-            "text": {
-                "preview_url": False,
-                "body": message
-            }
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending WhatsApp message: {e}")
-            return None
-    
+        return background_loop.run(self.client.send_message(to_number, message))
+
     def send_template_message(self, to_number, template_name, language_code="pt_BR"):
         """Send a template message (for initial contact)"""
-        url = f"{self.base_url}/messages"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "messaging_product": "whatsapp",
-            "to": to_number,
-            "type": "template",
-            "template": {
-                "name": template_name,
-                "language": {
-                    "code": language_code
-                }
-            }
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            return response.json()
-        except requests.exceptions.RequestException as e:
-            print(f"Error sending template message: {e}")
-            return None
-    
+        return background_loop.run(self.client.send_template_message(to_number, template_name, language_code))
+
     def mark_as_read(self, message_id):
         """Mark a message as read"""
-        url = f"{self.base_url}/messages"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "messaging_product": "whatsapp",
-            "status": "read",
-            "message_id": message_id
-        }
-        
-        try:
-            response = requests.post(url, headers=headers, json=data)
-            response.raise_for_status()
-            return True
-        except:
-            return False
-    
+        return background_loop.run(self.client.mark_as_read(message_id))
+
     def send_typing_indicator(self, to_number):
         """Show typing indicator"""
-        url = f"{self.base_url}/messages"
-        headers = {
-            'Authorization': f'Bearer {self.token}',
-            'Content-Type': 'application/json'
-        }
-        
-        data = {
-            "messaging_product": "whatsapp",
-            "recipient_type": "individual",
-            "to": to_number,
-            "typing": "on"
-        }
-        
-        try:
-            requests.post(url, headers=headers, json=data)
-        except:
-            pass
\ No newline at end of file
+        return background_loop.run(self.client.send_typing_indicator(to_number))
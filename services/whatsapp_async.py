@@ -0,0 +1,220 @@
+import asyncio
+import random
+import weakref
+import httpx
+from config import Config
+from services.rate_limiter import rate_limiter
+
+# Graph API responses worth another attempt
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Failures that happen before the request is sent, so retrying cannot send a message twice
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+class GraphAPIError(Exception):
+    """A failed Graph API call, with the error code and message Meta returned"""
+
+    def __init__(self, message, code=None):
+        super().__init__(f"(#{code}) {message}" if code is not None else message)
+        self.code = code
+        self.message = message
+
+    @classmethod
+    def from_http_error(cls, error):
+        if not isinstance(error, httpx.HTTPStatusError):
+            return cls(f"{type(error).__name__}: {error}")
+        response = error.response
+        try:
+            details = response.json().get('error') or {}
+        except (ValueError, AttributeError):
+            details = {}
+        return cls(details.get('message') or f"HTTP {response.status_code}", details.get('code', response.status_code))
+
+def backoff_delay(attempt, retry_after=None):
+    """Exponential backoff with jitter, honouring a Retry-After header"""
+    if retry_after:
+        try:
+            return min(float(retry_after), Config.WHATSAPP_BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = min(Config.WHATSAPP_BACKOFF_BASE * (2 ** attempt), Config.WHATSAPP_BACKOFF_MAX)
+    return delay * (0.5 + random.random() / 2)
+
+class AsyncWhatsAppService:
+    """Awaitable WhatsApp Cloud API client.
+
+    All instances on an event loop share one httpx.AsyncClient (keep-alive
+    pool) and a semaphore that caps the number of requests in flight.
+    """
+
+    _clients = weakref.WeakKeyDictionary()  # event loop -> (AsyncClient, Semaphore)
+    _stats = {"requests": 0, "retries": 0, "errors": 0, "in_flight": 0, "connections_opened": 0}
+
+    def __init__(self, token=None, phone_number_id=None):
+        self.token = token or Config.WHATSAPP_TOKEN
+        self.phone_number_id = phone_number_id or Config.WHATSAPP_PHONE_NUMBER_ID
+        self.api_version = Config.WHATSAPP_API_VERSION
+        self.base_url = f"{Config.WHATSAPP_API_BASE}/{self.api_version}/{self.phone_number_id}"
+        self.headers = {
+            'Authorization': f'Bearer {self.token}',
+            'Content-Type': 'application/json'
+        }
+        self.max_retries = Config.WHATSAPP_MAX_RETRIES
+
+    @classmethod
+    def _get_client(cls):
+        """(client, semaphore) for the running loop; an AsyncClient is bound to the loop it was created on"""
+        loop = asyncio.get_running_loop()
+        pair = cls._clients.get(loop)
+        if pair is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(Config.WHATSAPP_READ_TIMEOUT, connect=Config.WHATSAPP_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=Config.WHATSAPP_POOL_SIZE,
+                    max_keepalive_connections=Config.WHATSAPP_POOL_SIZE
+                )
+            )
+            pair = cls._clients[loop] = (client, asyncio.Semaphore(Config.WHATSAPP_MAX_IN_FLIGHT))
+        return pair
+
+    @classmethod
+    async def _trace(cls, event, info):
+        if event == "connection.connect_tcp.complete":
+            cls._stats["connections_opened"] += 1
+
+    async def _post(self, data, retries=None, throttle=True):
+        """POST to the messages endpoint, retrying 429/5xx and failed connections.
+
+        Errors after the request may have reached the API (e.g. a read
+        timeout) are not retried: the POST is not idempotent and a retry
+        could deliver the message twice. Message sends (throttle=True)
+        first wait for a token from the per-number rate limiter, and feed
+        429s back into it.
+        """
+        client, semaphore = self._get_client()
+        retries = self.max_retries if retries is None else retries
+        stats = self._stats
+
+        for attempt in range(retries + 1):
+            if throttle:
+                await rate_limiter.acquire(self.phone_number_id)
+
+            async with semaphore:
+                stats["requests"] += 1
+                stats["in_flight"] += 1
+                try:
+                    response = await client.post(
+                        f"{self.base_url}/messages",
+                        headers=self.headers,
+                        json=data,
+                        extensions={"trace": self._trace}
+                    )
+                except httpx.TransportError as e:
+                    if attempt == retries or not isinstance(e, RETRY_ERRORS):
+                        stats["errors"] += 1
+                        raise
+                    delay = backoff_delay(attempt)
+                else:
+                    if throttle:
+                        if response.status_code == 429:
+                            rate_limiter.on_throttled(self.phone_number_id)
+                        elif response.is_success:
+                            rate_limiter.on_success(self.phone_number_id)
+                    if response.status_code not in RETRY_STATUSES or attempt == retries:
+                        if response.is_error:
+                            stats["errors"] += 1
+                        response.raise_for_status()
+                        return response
+                    delay = backoff_delay(attempt, response.headers.get('Retry-After'))
+                finally:
+                    stats["in_flight"] -= 1
+
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    @classmethod
+    def pool_stats(cls):
+        """Connection reuse and in-flight counts for sizing the pool"""
+        stats = dict(cls._stats)
+        requests = stats["requests"]
+        stats.update({
+            "pool_size": Config.WHATSAPP_POOL_SIZE,
+            "max_in_flight": Config.WHATSAPP_MAX_IN_FLIGHT,
+            "reuse_rate": round(1 - stats["connections_opened"] / requests, 3) if requests else None
+        })
+        return stats
+
+    async def send_message(self, to_number, message):
+        """Send a text message via WhatsApp"""
+        data = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": to_number,
+            "type": "text",
+            "text": {
+                "preview_url": False,
+                "body": message
+            }
+        }
+
+        try:
+            response = await self._post(data)
+            return response.json()
+        except httpx.HTTPError as e:
+            print(f"Error sending WhatsApp message: {e}")
+            return None
+
+    async def send_template_message(self, to_number, template_name, language_code="pt_BR", raise_errors=False):
+        """Send a template message (for initial contact).
+
+        With raise_errors, a failure raises GraphAPIError instead of returning None.
+        """
+        data = {
+            "messaging_product": "whatsapp",
+            "to": to_number,
+            "type": "template",
+            "template": {
+                "name": template_name,
+                "language": {
+                    "code": language_code
+                }
+            }
+        }
+
+        try:
+            response = await self._post(data)
+            return response.json()
+        except httpx.HTTPError as e:
+            if raise_errors:
+                raise GraphAPIError.from_http_error(e)
+            print(f"Error sending template message: {e}")
+            return None
+
+    async def mark_as_read(self, message_id):
+        """Mark a message as read"""
+        data = {
+            "messaging_product": "whatsapp",
+            "status": "read",
+            "message_id": message_id
+        }
+
+        # Best effort: not worth retrying
+        try:
+            await self._post(data, retries=0, throttle=False)
+            return True
+        except httpx.HTTPError:
+            return False
+
+    async def send_typing_indicator(self, to_number):
+        """Show typing indicator"""
+        data = {
+            "messaging_product": "whatsapp",
+            "recipient_type": "individual",
+            "to": to_number,
+            "typing": "on"
+        }
+
+        try:
+            await self._post(data, retries=0, throttle=False)
+        except httpx.HTTPError:
+            pass
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+"""
+Equivalence tests for the compiled intent matcher (bot_logic/intents.py)
+against the keyword scans the bots used before it.
+
+    python -m pytest test_intents.py
+    python test_intents.py
+"""
+
+import random
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from bot_logic.intents import (fold, IntentMatcher, CORE_INTENTS, V1_INTENTS, V0_INTENTS,
+                               intent_matcher, intent_matcher_v1, intent_matcher_v0)
+
+def legacy_detect_intent(message, v1=False):
+    """chatbot.py / chatbot_v1.py _detect_intent as it was before the matcher"""
+    message_lower = message.lower()
+
+    greetings = ['oi', 'olá', 'ola', 'bom dia', 'boa tarde', 'boa noite', 'hello', 'hi', 'hey']
+    if any(greeting in message_lower.split() for greeting in greetings):
+        return 'greeting'
+    if any(word in message_lower for word in ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento', 'aberto']):
+        return 'hours'
+    if any(word in message_lower for word in ['quanto custa', 'preço', 'valor', 'precos', 'quanto é']):
+        return 'price'
+    if any(word in message_lower for word in ['serviço', 'servico', 'procedimento', 'oferece', 'fazem', 'disponível']):
+        return 'services'
+    if any(word in message_lower for word in ['contato', 'telefone', 'whatsapp', 'ligar', 'zap']):
+        return 'contact'
+    if any(word in message_lower for word in ['onde', 'endereço', 'endereco', 'localização', 'localizacao', 'fica']):
+        return 'location'
+    if any(word in message_lower for word in ['agendar', 'agendamento', 'marcar', 'horário disponível']):
+        return 'booking'
+    if v1:
+        if any(word in message_lower for word in ['ajuda', 'ajudar', 'help', 'dúvida', 'duvida']):
+            return 'help'
+        if any(word in message_lower for word in ['que dia', 'hoje', 'data']):
+            return 'date'
+    return 'unknown'
+
+def legacy_v0_intents(message):
+    """The separate keyword checks in chatbot_v0.py before the matcher"""
+    message_lower = message.lower()
+    checks = {
+        'greeting': ['oi', 'olá', 'bom dia', 'boa tarde', 'boa noite', 'ola'],
+        'hours': ['horário', 'horario', 'quando', 'abre', 'fecha', 'funcionamento'],
+        'price': ['quanto custa', 'preço', 'valor', 'precos'],
+        'contact': ['contato', 'telefone', 'whatsapp', 'ligar'],
+        'location': ['onde', 'endereço', 'endereco', 'localização'],
+    }
+    return {intent for intent, words in checks.items() if any(word in message_lower for word in words)}
+
+def folded_scan(table, message, whole_words=('greeting',)):
+    """The legacy priority scan over accent-folded message and keywords"""
+    folded = fold(message)
+    for intent, keywords in table:
+        if intent in whole_words:
+            if any(fold(keyword) in folded.split() for keyword in keywords):
+                return intent
+        elif any(fold(keyword) in folded for keyword in keywords):
+            return intent
+    return 'unknown'
+
+# Realistic messages; none rely on accent folding, so old and new must agree exactly
+CORPUS = [
+    "oi", "Oi", "OI tudo bem?", "olá", "Olá!", "ola, bom dia", "bom dia", "boa tarde!", "hello", "hi there",
+    "hey", "oi!", "oii", "oi, qual o horário?", "qual o horário de funcionamento", "que horas vocês abrem?",
+    "vocês fecham quando?", "está aberto hoje?", "quanto custa a henna?", "qual o preço do design",
+    "qual o valor", "precos por favor", "quanto é a micropigmentação?", "quais serviços vocês oferecem",
+    "que procedimentos fazem?", "tem serviço de lash?", "qual o contato", "me passa o telefone",
+    "tem whatsapp?", "posso ligar?", "manda o zap", "onde fica o studio", "qual o endereço?",
+    "endereco", "localização por favor", "quero agendar", "como faço agendamento",
+    "posso marcar pra amanhã?", "tem horário disponível?", "preciso de ajuda", "pode me ajudar",
+    "help", "tenho uma dúvida", "duvida rápida", "que dia é hoje", "qual a data", "hoje vocês atendem?",
+    "obrigada", "tchau", "aceitam cartão?", "", "   ", "😊", "quanto custa e onde fica",
+    "horário disponível para agendar", "oferece henna? quanto custa?", "Bom Dia! Quero Marcar",
+    "qual o horário e o valor?", "hiato", "boi", "hoje tem ajuda?", "fazem sobrancelha masculina?",
+]
+
+# Spellings the old scans missed because only one accent variant was listed
+ACCENT_VARIANTS = [
+    ("qual o preco?", 'price'),
+    ("PREÇO", 'price'),
+    ("tem horario disponivel?", 'hours'),
+    ("vocês fazem servicos de henna", 'services'),
+    ("ta disponivel amanha?", 'services'),
+    ("endereço por favor", 'location'),
+    ("localizaçao", 'location'),
+    ("tenho uma duvida", 'help'),
+    ("quanto e a henna", 'price'),
+]
+
+def test_fold():
+    assert fold("Preço  Serviço") == "preco servico"
+    assert fold("LOCALIZAÇÃO\tdo\nstudio") == "localizacao do studio"
+    assert fold("plain ascii") == "plain ascii"
+    assert fold("") == ""
+
+def test_corpus_matches_legacy():
+    for message in CORPUS:
+        assert intent_matcher.match(message) == legacy_detect_intent(message), message
+        assert intent_matcher_v1.match(message) == legacy_detect_intent(message, v1=True), message
+        assert intent_matcher_v0.match_all(message) == legacy_v0_intents(message), message
+
+def test_accent_variants():
+    for message, expected in ACCENT_VARIANTS:
+        assert intent_matcher_v1.match(message) == expected, message
+    assert intent_matcher_v0.match_all("localizacao") == {'location'}
+    # These are the cases the old scans got wrong
+    assert legacy_detect_intent("qual o preco?") == 'unknown'
+    assert legacy_detect_intent("ta disponivel amanha?") == 'unknown'
+    assert legacy_v0_intents("localizacao") == set()
+    # v0's substring greetings are not folded, so accented words don't hide one
+    assert intent_matcher_v0.match_all("dói?") == set()
+    assert intent_matcher_v0.match_all("Olá, onde fica?") == {'greeting', 'location'}
+    assert legacy_v0_intents("dói?") == set()
+
+def test_priority_order():
+    # Greeting beats everything, hours beats booking, price beats location
+    assert intent_matcher.match("oi quero agendar") == 'greeting'
+    # Greetings are whole tokens, punctuation included, as before
+    assert intent_matcher.match("oi, quero agendar") == 'booking'
+    assert intent_matcher.match("horário disponível") == 'hours'
+    assert intent_matcher.match("onde fica e quanto custa") == 'price'
+    assert intent_matcher_v1.match("hoje tem ajuda?") == 'help'
+
+def test_prefix_keywords_all_reported():
+    matcher = IntentMatcher([('short', ['abc']), ('long', ['abcdef']), ('other', ['xyz'])])
+    assert matcher.match_all("abcdef") == {'short', 'long'}
+    assert matcher.match("abcdef") == 'short'
+    assert matcher.match("abcde xyz") == 'short'
+    assert matcher.match_all("xyz") == {'other'}
+    assert matcher.match("nothing", default=None) is None
+
+def test_randomized_against_folded_scan():
+    rng = random.Random(1234)
+    vocabulary = [keyword for _, keywords in V1_INTENTS for keyword in keywords]
+    vocabulary += ["a", "de", "henna", "sobrancelha", "amanhã", "Quero", "por", "favor", "?", "!", "ÓTIMO"]
+    for _ in range(3000):
+        words = rng.sample(vocabulary, rng.randint(1, 5))
+        # Glue some words together so keywords also appear inside other words
+        message = "".join(word + rng.choice([" ", " ", "", "  ", ", "]) for word in words)
+        if rng.random() < 0.3:
+            message = message.upper()
+        assert intent_matcher.match(message) == folded_scan(CORE_INTENTS, message), message
+        assert intent_matcher_v1.match(message) == folded_scan(V1_INTENTS, message), message
+        # v0 greetings are substrings of the message as written, the rest are folded
+        expected_v0 = {intent for intent, keywords in V0_INTENTS
+                       if any(keyword in message.lower() if intent == 'greeting' else fold(keyword) in fold(message)
+                              for keyword in keywords)}
+        assert intent_matcher_v0.match_all(message) == expected_v0, message
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"✓ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
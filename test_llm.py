@@ -0,0 +1,122 @@
+#!/usr/bin/env python
+"""
+Tests for the async LLM path (bot_logic/llm.py) against a stubbed client:
+reply deadline, hedged requests and the per-loop client.
+
+    python -m pytest test_llm.py
+    python test_llm.py
+"""
+
+import asyncio
+import sys
+import os
+import time
+from contextlib import contextmanager
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from config import Config
+from bot_logic import llm
+
+class StubCompletions:
+    """Stands in for AsyncOpenAI: the nth request answers after delays[n] seconds"""
+
+    def __init__(self, *delays):
+        self.delays = list(delays)
+        self.started = 0
+        self.cancelled = []
+        self.chat = self
+        self.completions = self
+
+    def with_options(self, **options):
+        return self
+
+    async def create(self, **params):
+        n = self.started
+        self.started += 1
+        try:
+            await asyncio.sleep(self.delays[n])
+        except asyncio.CancelledError:
+            self.cancelled.append(n)
+            raise
+        message = type('Message', (), {'content': f"answer {n}"})
+        return type('Response', (), {'choices': [type('Choice', (), {'message': message})]})
+
+@contextmanager
+def stubbed(client, hedge_delay=None):
+    saved = llm.get_async_client, llm._hedge_delay
+    llm.get_async_client = lambda: client
+    llm._hedge_delay = lambda: hedge_delay
+    try:
+        yield client
+    finally:
+        llm.get_async_client, llm._hedge_delay = saved
+
+def test_answer_within_deadline():
+    with stubbed(StubCompletions(0.01)):
+        answer = asyncio.run(llm.complete_async([], time.monotonic() + 1))
+    assert answer == "answer 0"
+
+def test_deadline_exceeded():
+    with stubbed(StubCompletions(5)) as client:
+        started = time.monotonic()
+        try:
+            asyncio.run(llm.complete_async([], started + 0.3))
+            assert False, "expected DeadlineExceeded"
+        except llm.DeadlineExceeded:
+            pass
+        # Gave up at the deadline and did not leave the request running
+        assert time.monotonic() - started < 0.6
+        assert client.cancelled == [0]
+
+def test_no_budget_left():
+    with stubbed(StubCompletions(0.01)) as client:
+        try:
+            asyncio.run(llm.complete_async([], time.monotonic() + llm.MIN_CALL_SECONDS / 2))
+            assert False, "expected DeadlineExceeded"
+        except llm.DeadlineExceeded:
+            pass
+        assert client.started == 0
+
+def test_hedge_wins_and_first_is_cancelled():
+    # The first request stalls; the hedge sent after 50ms answers
+    with stubbed(StubCompletions(5, 0.01), hedge_delay=0.05) as client:
+        started = time.monotonic()
+        answer = asyncio.run(llm.complete_async([], started + 1))
+        assert answer == "answer 1"
+        assert time.monotonic() - started < 0.5
+        assert client.started == 2
+        assert client.cancelled == [0]
+
+def test_fast_first_request_is_not_hedged():
+    with stubbed(StubCompletions(0.01, 0.01), hedge_delay=0.2) as client:
+        answer = asyncio.run(llm.complete_async([], time.monotonic() + 1))
+    assert answer == "answer 0"
+    assert client.started == 1
+
+def test_one_async_client_per_loop():
+    saved = Config.AI_API_KEY
+    Config.AI_API_KEY = Config.AI_API_KEY or 'test-key'
+
+    async def clients():
+        return llm.get_async_client(), llm.get_async_client()
+
+    try:
+        first, again = asyncio.run(clients())
+        other, _ = asyncio.run(clients())
+    finally:
+        Config.AI_API_KEY = saved
+    assert first is again
+    assert other is not first
+
+if __name__ == "__main__":
+    tests = [(name, fn) for name, fn in sorted(globals().items()) if name.startswith('test_') and callable(fn)]
+    failed = 0
+    for name, fn in tests:
+        try:
+            fn()
+            print(f"✓ {name}")
+        except AssertionError as e:
+            failed += 1
+            print(f"✗ {name}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} passed")
+    sys.exit(1 if failed else 0)
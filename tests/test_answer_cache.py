@@ -0,0 +1,31 @@
+"""Answer cache keys and the classifier reading questions back out of the cache database"""
+
+from bot_logic.answer_cache import AnswerCache, normalize
+from bot_logic.classifier import read_messages
+
+def test_key_round_trip():
+    key = AnswerCache.key(7, '2026-10-18 16:36:32.525190', "Vocês fazem Lash Lifting?", day='2026-10-18')
+    assert AnswerCache.parse_key(key) == ('7', '2026-10-18 16:36:32.525190', '2026-10-18', 'voces fazem lash lifting')
+
+def test_key_changes_with_day():
+    message = "aceitam cartão?"
+    assert AnswerCache.key(1, 'v1', message, day='2026-10-18') != AnswerCache.key(1, 'v1', message, day='2026-10-19')
+    assert AnswerCache.key(1, 'v1', message, day='2026-10-18') == AnswerCache.key(1, 'v1', "Aceitam  cartao", day='2026-10-18')
+
+def test_get_returns_what_was_put(tmp_path):
+    cache = AnswerCache(path=str(tmp_path / 'answers.db'))
+    key = cache.key(1, 'v1', "tem estacionamento?")
+    cache.put(key, "Sim, na rua ao lado.", 850)
+    assert cache.get(key) == "Sim, na rua ao lado."
+
+    # A fresh instance (another worker) reads it from the database
+    assert AnswerCache(path=str(tmp_path / 'answers.db')).get(key) == "Sim, na rua ao lado."
+
+def test_classifier_reads_questions_from_cache_db(tmp_path):
+    path = str(tmp_path / 'answers.db')
+    cache = AnswerCache(path=path)
+    questions = ["Vocês fazem lash lifting?", "Tem estacionamento perto?"]
+    for question in questions:
+        cache.put(cache.key(1, '2026-10-18 16:36:32.525190', question), "...", 500)
+
+    assert sorted(read_messages(path)) == sorted(normalize(question) for question in questions)
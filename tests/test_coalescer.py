@@ -0,0 +1,86 @@
+"""Burst coalescing: merged parts, completion callbacks and per-sender order"""
+
+import threading
+import time
+from flask import Flask
+from services.coalescer import BurstCoalescer
+
+app = Flask(__name__)
+
+def started(handler, window_ms=50, max_messages=8):
+    coalescer = BurstCoalescer(window_ms=window_ms, max_messages=max_messages, workers=4)
+    coalescer.start(app, handler)
+    return coalescer
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_burst_is_one_turn_in_order():
+    turns = []
+    coalescer = started(lambda key, parts: turns.append((key, parts)) or True)
+    done = []
+    # Added out of order, as concurrent queue consumers can
+    coalescer.add('5511', "quanto custa", done.append, order=2)
+    coalescer.add('5511', "oi", done.append, order=1)
+    coalescer.add('5599', "onde fica?", done.append, order=1)
+
+    wait_for(lambda: len(done) == 3)
+    assert sorted(turns) == [('5511', ["oi", "quanto custa"]), ('5599', ["onde fica?"])]
+    assert coalescer.stats()['merged_messages'] == 1
+
+def test_max_messages_closes_the_burst():
+    turns = []
+    coalescer = started(lambda key, parts: turns.append(parts) or True, window_ms=10000, max_messages=2)
+    coalescer.add('5511', "a")
+    coalescer.add('5511', "b")
+    assert turns == [["a", "b"]]
+
+def test_callbacks_get_the_handler_result():
+    results = {'sent': True, 'unsent': False}
+    coalescer = started(lambda key, parts: results[key])
+    done = {}
+    for key in results:
+        for n in range(2):
+            coalescer.add(key, f"part {n}", lambda ok, key=key: done.setdefault(key, []).append(ok))
+
+    wait_for(lambda: sum(map(len, done.values())) == 4)
+    assert done == {'sent': [True, True], 'unsent': [False, False]}
+
+def test_handler_error_is_not_ok():
+    def handler(key, parts):
+        raise RuntimeError("send failed")
+
+    coalescer = started(handler, window_ms=0)
+    done = []
+    coalescer.add('5511', "oi", done.append)
+    assert done == [False]
+
+def test_one_burst_per_sender_at_a_time():
+    answering = set()
+    overlaps = []
+    turns = []
+
+    def handler(key, parts):
+        if key in answering:
+            overlaps.append(key)
+        answering.add(key)
+        time.sleep(0.02)
+        turns.append(parts[0])
+        answering.discard(key)
+        return True
+
+    # No window: every message is its own turn, dispatched by the thread that added it
+    coalescer = started(handler, window_ms=0)
+    with app.app_context():
+        threads = [threading.Thread(target=coalescer.add, args=('5511', f"m{n}")) for n in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert overlaps == []
+    assert sorted(turns) == [f"m{n}" for n in range(6)]
+    assert coalescer.stats()['queued_bursts'] == 0
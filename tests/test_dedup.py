@@ -0,0 +1,47 @@
+"""Deduplication of redelivered webhook messages"""
+
+from services.dedup import MessageDeduplicator
+
+def test_handled_message_is_a_duplicate(tmp_path):
+    dedup = MessageDeduplicator(path=str(tmp_path / 'seen.db'))
+    assert dedup.begin('wamid.1')
+    dedup.finish('wamid.1')
+
+    assert not dedup.begin('wamid.1')
+    assert dedup.stats()['duplicates'] == 1
+
+def test_unhandled_message_can_be_retried(tmp_path):
+    dedup = MessageDeduplicator(path=str(tmp_path / 'seen.db'))
+    assert dedup.begin('wamid.1')
+    # The reply was not sent: the redelivery must be handled again
+    dedup.finish('wamid.1', handled=False)
+
+    assert dedup.begin('wamid.1')
+    dedup.finish('wamid.1')
+    assert not dedup.begin('wamid.1')
+
+def test_message_in_flight_is_a_duplicate(tmp_path):
+    dedup = MessageDeduplicator(path=str(tmp_path / 'seen.db'))
+    assert dedup.begin('wamid.1')
+    assert not dedup.begin('wamid.1')
+    assert dedup.stats()['in_flight'] == 1
+
+def test_handled_messages_survive_a_restart(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    dedup = MessageDeduplicator(path=path)
+    dedup.begin('wamid.1')
+    dedup.finish('wamid.1')
+    dedup.begin('wamid.2')
+    dedup.finish('wamid.2', handled=False)
+
+    restarted = MessageDeduplicator(path=path)
+    assert not restarted.begin('wamid.1')
+    assert restarted.begin('wamid.2')
+
+def test_expired_entries_are_handled_again(tmp_path):
+    dedup = MessageDeduplicator(path=str(tmp_path / 'seen.db'), ttl_seconds=1)
+    dedup.begin('wamid.1')
+    dedup.finish('wamid.1')
+
+    dedup.ttl = -1  # everything recorded is now older than the TTL
+    assert dedup.begin('wamid.1')
@@ -0,0 +1,91 @@
+"""Inbound queue leases, retries and holds"""
+
+import threading
+import time
+from flask import Flask
+from services.inbound_queue import InboundQueue
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+def test_expired_lease_is_claimed_again(tmp_path):
+    queue = InboundQueue(path=str(tmp_path / 'queue.db'), lease_seconds=0.1)
+    queue.enqueue('{"n": 1}')
+
+    entry_id, payload = queue.claim()
+    assert payload == '{"n": 1}'
+    # Still leased: no other consumer gets it
+    assert queue.claim() is None
+
+    # The consumer died without ack or fail; once the lease expires the entry comes back
+    time.sleep(0.15)
+    assert queue.claim() == (entry_id, payload)
+
+def test_acked_entry_is_gone(tmp_path):
+    queue = InboundQueue(path=str(tmp_path / 'queue.db'), lease_seconds=0.1)
+    queue.enqueue('{}')
+    entry_id, _ = queue.claim()
+    queue.ack(entry_id)
+
+    time.sleep(0.15)
+    assert queue.claim() is None
+    assert queue.stats()['depth'] == {}
+
+def test_failed_entry_is_retried_then_parked(tmp_path):
+    queue = InboundQueue(path=str(tmp_path / 'queue.db'), max_attempts=2)
+    queue.enqueue('{}')
+
+    entry_id, _ = queue.claim()
+    queue.fail(entry_id)
+    assert queue.claim()[0] == entry_id
+
+    queue.fail(entry_id)
+    assert queue.claim() is None
+    stats = queue.stats()
+    assert stats['depth'] == {'failed': 1}
+    assert (stats['retried'], stats['failed']) == (1, 1)
+
+def test_hold_keeps_entry_until_released(tmp_path):
+    queue = InboundQueue(path=str(tmp_path / 'queue.db'), workers=1)
+    releases = []
+    handled = threading.Event()
+
+    def handler(payload):
+        # Hands the work off, like a message waiting in a burst window
+        releases.append(queue.hold())
+        handled.set()
+
+    queue.start(Flask(__name__), handler)
+    try:
+        queue.enqueue('{}')
+        assert handled.wait(5)
+        time.sleep(0.05)
+        assert queue.stats()['depth'] == {'processing': 1}
+
+        releases[0](True)
+        assert queue.stats()['depth'] == {}
+        assert queue.stats()['processed'] == 1
+    finally:
+        queue.stop()
+
+def test_released_not_ok_is_retried(tmp_path):
+    queue = InboundQueue(path=str(tmp_path / 'queue.db'), workers=1)
+    payloads = []
+
+    def handler(payload):
+        payloads.append(payload)
+        release = queue.hold()
+        # The first attempt's reply is not sent; the second one is
+        release(len(payloads) > 1)
+
+    queue.start(Flask(__name__), handler)
+    try:
+        queue.enqueue('{}')
+        wait_for(lambda: queue.stats()['processed'] == 1)
+        assert payloads == ['{}', '{}']
+        assert queue.stats()['retried'] == 1
+    finally:
+        queue.stop()
@@ -0,0 +1,45 @@
+"""Session store caps and idle expiry"""
+
+from operator import itemgetter
+from services.session_store import SessionStore
+
+def test_same_key_same_session():
+    store = SessionStore(dict, max_sessions=10, ttl_seconds=60)
+    assert store.get((1, '5511')) is store.get((1, '5511'))
+    assert store.get((1, '5511')) is not store.get((1, '5599'))
+
+def test_least_recently_used_is_evicted():
+    store = SessionStore(dict, max_sessions=2, ttl_seconds=60)
+    store.get('a')
+    store.get('b')
+    store.get('a')
+    store.get('c')
+
+    assert 'a' in store and 'c' in store and 'b' not in store
+    assert store.stats()['evicted_lru'] == 1
+
+def test_busy_tenant_evicts_only_its_own_sessions():
+    store = SessionStore(dict, max_sessions=10, ttl_seconds=60, partition=itemgetter(0), max_per_partition=3)
+    store.get(('quiet', '5511'))
+    for n in range(20):
+        store.get(('busy', n))
+
+    assert ('quiet', '5511') in store
+    assert [n for n in range(20) if ('busy', n) in store] == [17, 18, 19]
+    assert store.stats()['evicted_partition'] == 17
+
+def test_idle_sessions_expire():
+    store = SessionStore(dict, max_sessions=10, ttl_seconds=60, partition=itemgetter(0))
+    session = store.get((1, '5511'))
+    store.ttl = -1  # everything is now idle for longer than the TTL
+
+    assert store.get((1, '5511')) is not session
+    store.ttl = 60
+    assert store.stats()['evicted_idle'] == 1
+
+def test_reset_forgets_the_session():
+    store = SessionStore(dict, max_sessions=10, ttl_seconds=60, partition=itemgetter(0))
+    session = store.get((1, '5511'))
+    assert store.reset((1, '5511'))
+    assert not store.reset((1, '5511'))
+    assert store.get((1, '5511')) is not session
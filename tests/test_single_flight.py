@@ -0,0 +1,61 @@
+"""Single flight: concurrent identical calls share one upstream request"""
+
+import threading
+import time
+from bot_logic.llm import DeadlineExceeded
+from bot_logic.single_flight import SingleFlight
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def call():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.run('key', call, time.monotonic() + 5)))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["answer"] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "absorbed": 3, "failed": 0, "in_flight": 0}
+
+def test_follower_gives_up_at_its_deadline():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.run, args=('key', lambda: release.wait(5)))
+    leader.start()
+    time.sleep(0.02)
+
+    try:
+        flight.run('key', lambda: "unused", time.monotonic() + 0.05)
+        assert False, "expected DeadlineExceeded"
+    except DeadlineExceeded:
+        pass
+    finally:
+        release.set()
+        leader.join()
+
+def test_error_reaches_every_caller_and_is_not_kept():
+    flight = SingleFlight()
+
+    def call():
+        raise RuntimeError("upstream down")
+
+    try:
+        flight.run('key', call)
+        assert False, "expected RuntimeError"
+    except RuntimeError:
+        pass
+    # The failed call is not in flight any more: the next caller makes its own
+    assert flight.run('key', lambda: "answer") == "answer"
+    assert flight.stats()['failed'] == 1